@@ -47,6 +47,17 @@ interface Stats {
   total_jobs: number;
 }
 
+type Listing = 'jobs' | 'users' | 'recruiters';
+
+// Admin listings come one page at a time; the next page's cursor is in the X-Next-Cursor header
+const fetchListing = async <T,>(listing: Listing, params: Record<string, string>, cursor: string | null = null) => {
+  const query = new URLSearchParams(params);
+  if (cursor) query.set('cursor', cursor);
+  const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/admin/${listing}?${query}`);
+  if (!res.ok) return null;
+  return { items: (await res.json()) as T[], next: res.headers.get('X-Next-Cursor') };
+};
+
 export default function AdminDashboard() {
   const router = useRouter();
   
@@ -73,21 +84,53 @@ export default function AdminDashboard() {
   const [jobs, setJobs] = useState<Job[]>([]);
   const [users, setUsers] = useState<UserData[]>([]);
   const [recruiters, setRecruiters] = useState<RecruiterData[]>([]);
+  const [pendingRecruiters, setPendingRecruiters] = useState<RecruiterData[]>([]);
+  const [cursors, setCursors] = useState<Record<Listing, string | null>>({ jobs: null, users: null, recruiters: null });
+  const [appliedSearch, setAppliedSearch] = useState('');
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // Loads the first page (cursor = null) or appends the page after `cursor`
+  const loadPage = async <T,>(listing: Listing, setItems: React.Dispatch<React.SetStateAction<T[]>>, q: string, cursor: string | null = null) => {
+    const page = await fetchListing<T>(listing, q ? { q } : {}, cursor);
+    if (!page) return;
+    setItems(prev => (cursor ? [...prev, ...page.items] : page.items));
+    setCursors(prev => ({ ...prev, [listing]: page.next }));
+  };
+
+  // Search runs server-side (?q=) so it covers every row, not just the pages loaded so far
+  const fetchListings = async (q = appliedSearch) => {
+    setAppliedSearch(q);
+    await Promise.all([
+      loadPage('jobs', setJobs, q),
+      loadPage('users', setUsers, q),
+      loadPage('recruiters', setRecruiters, q)
+    ]);
+  };
+
+  // The verification queue is its own query, paged to the end, so no pending recruiter is missed
+  const fetchPendingRecruiters = async () => {
+    const pending: RecruiterData[] = [];
+    let cursor: string | null = null;
+    do {
+      const page: { items: RecruiterData[]; next: string | null } | null =
+        await fetchListing<RecruiterData>('recruiters', { verification_status: 'pending', limit: '500' }, cursor);
+      if (!page) return;
+      pending.push(...page.items);
+      cursor = page.next;
+    } while (cursor);
+    setPendingRecruiters(pending);
+  };
 
   const fetchData = async () => {
     setLoading(true);
     try {
-      const [statsRes, jobsRes, usersRes, recruitersRes] = await Promise.all([
+      const [statsRes] = await Promise.all([
         fetch(`${process.env.NEXT_PUBLIC_API_URL}/admin/stats`),
-        fetch(`${process.env.NEXT_PUBLIC_API_URL}/admin/jobs`),
-        fetch(`${process.env.NEXT_PUBLIC_API_URL}/admin/users`),
-        fetch(`${process.env.NEXT_PUBLIC_API_URL}/admin/recruiters`)
+        fetchListings(),
+        fetchPendingRecruiters()
       ]);
 
       if (statsRes.ok) setStats(await statsRes.json());
-      if (jobsRes.ok) setJobs(await jobsRes.json());
-      if (usersRes.ok) setUsers(await usersRes.json());
-      if (recruitersRes.ok) setRecruiters(await recruitersRes.json());
       
     } catch (error) {
       toast.error("Failed to load dashboard data");
@@ -96,10 +139,32 @@ export default function AdminDashboard() {
     }
   };
 
+  const loadMore = async (listing: Listing) => {
+    setLoadingMore(true);
+    try {
+      if (listing === 'jobs') await loadPage('jobs', setJobs, appliedSearch, cursors.jobs);
+      else if (listing === 'users') await loadPage('users', setUsers, appliedSearch, cursors.users);
+      else await loadPage('recruiters', setRecruiters, appliedSearch, cursors.recruiters);
+    } catch (error) {
+      toast.error("Failed to load more rows");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchData();
   }, []);
 
+  useEffect(() => {
+    const q = searchTerm.trim();
+    if (q === appliedSearch) return;
+    const timer = setTimeout(() => {
+      fetchListings(q).catch(() => toast.error("Search failed"));
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
   // --- NEW MARKETING ACTION ---
   const handleTriggerMarketing = async () => {
     if (!confirm("⚠️ Are you sure?\n\nThis will send 'Profile Completion' and 'Truth Score' reminder emails to all eligible candidates active in the last 7 days.")) return;
@@ -187,11 +252,6 @@ export default function AdminDashboard() {
     router.push('/admin/login');
   };
 
-  // --- FILTERING ---
-  const filteredJobs = jobs.filter(j => j.title.toLowerCase().includes(searchTerm.toLowerCase()) || j.company_name.toLowerCase().includes(searchTerm.toLowerCase()));
-  const filteredUsers = users.filter(u => u.name.toLowerCase().includes(searchTerm.toLowerCase()) || u.email.toLowerCase().includes(searchTerm.toLowerCase()));
-  const filteredRecruiters = recruiters.filter(r => r.name.toLowerCase().includes(searchTerm.toLowerCase()) || r.company_name.toLowerCase().includes(searchTerm.toLowerCase()));
-
   // Close sidebar when changing tabs on mobile
   const handleTabChange = (tab: typeof activeTab) => {
       setActiveTab(tab);
@@ -317,10 +377,10 @@ export default function AdminDashboard() {
                     <div className="bg-white p-6 rounded-xl border border-slate-200 shadow-sm">
                         <h3 className="font-bold text-slate-800 mb-4 flex items-center gap-2"><ShieldAlert size={18} className="text-amber-500"/> Pending Verification</h3>
                         <div className="space-y-3">
-                            {recruiters.filter(r => r.verification_status === 'pending').length === 0 ? (
+                            {pendingRecruiters.length === 0 ? (
                                 <p className="text-sm text-slate-400 italic py-2">No pending verifications</p>
                             ) : (
-                                recruiters.filter(r => r.verification_status === 'pending').slice(0, 5).map(r => (
+                                pendingRecruiters.slice(0, 5).map(r => (
                                     <div key={r.id} className="flex justify-between items-center p-3 bg-amber-50 border border-amber-100 rounded-lg">
                                         <div><p className="font-bold text-sm text-amber-900 line-clamp-1">{r.name}</p><p className="text-xs text-amber-700 line-clamp-1">{r.company_name}</p></div>
                                         <button onClick={() => setActiveTab('recruiters')} className="text-xs bg-white text-amber-600 border border-amber-200 px-3 py-1 rounded hover:bg-amber-50 font-medium ml-2 shrink-0">Review</button>
@@ -417,7 +477,7 @@ export default function AdminDashboard() {
                             </tr>
                         </thead>
                         <tbody className="divide-y divide-slate-100">
-                            {filteredJobs.map(job => (
+                            {jobs.map(job => (
                                 <tr key={job.id} className="hover:bg-slate-50">
                                     <td className="px-6 py-4 font-medium">{job.title}</td>
                                     <td className="px-6 py-4 text-slate-600">{job.company_name}</td>
@@ -434,6 +494,7 @@ export default function AdminDashboard() {
                         </tbody>
                     </table>
                 </div>
+                <LoadMore visible={!!cursors.jobs} loading={loadingMore} onClick={() => loadMore('jobs')} />
             </div>
         )}
 
@@ -452,7 +513,7 @@ export default function AdminDashboard() {
                             </tr>
                         </thead>
                         <tbody className="divide-y divide-slate-100">
-                            {filteredUsers.map(user => (
+                            {users.map(user => (
                                 <tr key={user.id} className="hover:bg-slate-50/80 transition-colors">
                                     <td className="px-6 py-4 font-medium text-slate-900">{user.name}</td>
                                     <td className="px-6 py-4 text-slate-600 text-sm">{user.email}</td>
@@ -470,6 +531,7 @@ export default function AdminDashboard() {
                         </tbody>
                     </table>
                 </div>
+                <LoadMore visible={!!cursors.users} loading={loadingMore} onClick={() => loadMore('users')} />
             </div>
         )}
 
@@ -487,7 +549,7 @@ export default function AdminDashboard() {
                             </tr>
                         </thead>
                         <tbody className="divide-y divide-slate-100">
-                            {filteredRecruiters.map(r => (
+                            {recruiters.map(r => (
                                 <tr key={r.id} className="hover:bg-slate-50/80 transition-colors">
                                     <td className="px-6 py-4">
                                         <div className="font-medium text-slate-900 text-sm">{r.name}</div>
@@ -523,6 +585,7 @@ export default function AdminDashboard() {
                         </tbody>
                     </table>
                 </div>
+                <LoadMore visible={!!cursors.recruiters} loading={loadingMore} onClick={() => loadMore('recruiters')} />
             </div>
         )}
 
@@ -620,6 +683,21 @@ function SidebarItem({ icon, label, active, onClick }: any) {
     );
 }
 
+function LoadMore({ visible, loading, onClick }: any) {
+    if (!visible) return null;
+    return (
+        <div className="border-t border-slate-100 p-4 flex justify-center">
+            <button
+                onClick={onClick}
+                disabled={loading}
+                className="text-sm font-medium text-blue-600 border border-blue-100 bg-blue-50 px-4 py-2 rounded-lg hover:bg-blue-100 transition-all disabled:opacity-50 flex items-center gap-2"
+            >
+                {loading && <Loader2 size={14} className="animate-spin" />} Load more
+            </button>
+        </div>
+    );
+}
+
 function StatCard({ title, value, icon, color }: any) {
     return (
         <div className="bg-white p-6 rounded-xl border border-slate-200 shadow-sm flex items-center gap-5 hover:shadow-md transition-shadow">
@@ -0,0 +1,214 @@
+# backend/admin_listings.py
+# Admin listings (jobs / users / recruiters): filtering, sorting and cursor pagination in SQL, plus
+# streaming CSV / NDJSON exports.
+#
+# The old endpoints loaded every ORM row with .all() and built the whole JSON list in memory, and the
+# recruiter list ran one COUNT per recruiter. Now:
+# - only the listed columns are selected, one page at a time (keyset pagination: the cursor carries
+#   the last row's sort value + id, so page N costs the same as page 1 - no OFFSET)
+# - recruiter job counts come from one GROUP BY over the page's ids
+# - exports iterate with yield_per (a server-side cursor on Postgres), write each batch out as CSV
+#   or NDJSON and drop it, so memory stays flat however many rows there are
+import base64
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+from backend.database import SessionLocal
+from backend.models import Job, Recruiter, User
+
+ADMIN_PAGE_DEFAULT = 100
+ADMIN_PAGE_MAX = 500
+EXPORT_BATCH_SIZE = 1000
+_EPOCH = datetime(1970, 1, 1)
+
+@dataclass
+class Listing:
+    columns: Dict[str, object]  # output name -> column
+    sorts: Dict[str, object]  # sort name -> non-null sort expression ("id" is always available)
+    search: Tuple  # columns matched by ?q=
+    filters: Dict[str, Callable]  # query param -> value -> where clause
+    row: Callable[[dict], dict]  # selected values -> response item
+
+def _like(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+LISTINGS = {
+    "jobs": Listing(
+        columns={"id": Job.id, "title": Job.title, "company_name": Job.company_name, "location": Job.location,
+                 "employment_type": Job.employment_type, "recruiter_id": Job.recruiter_id, "status": Job.status,
+                 "trust_score": Job.trust_score, "created_at": Job.created_at},
+        sorts={"created_at": func.coalesce(Job.created_at, _EPOCH), "title": func.coalesce(Job.title, ""),
+               "trust_score": func.coalesce(Job.trust_score, 0)},
+        search=(Job.title, Job.company_name),
+        filters={"status": lambda v: Job.status == v,
+                 "source": lambda v: Job.recruiter_id.isnot(None) if v.lower() == "recruiter" else Job.recruiter_id.is_(None)},
+        row=lambda r: {
+            "id": str(r["id"]), "title": r["title"], "company_name": r["company_name"], "location": r["location"],
+            "employment_type": r["employment_type"], "source": "Recruiter" if r["recruiter_id"] else "Admin",
+            "status": r["status"], "trust_score": r["trust_score"],
+            "created_at": str(r["created_at"]), "is_direct": r["recruiter_id"] is not None,
+        },
+    ),
+    "users": Listing(
+        columns={"id": User.id, "name": User.name, "email": User.email, "created_at": User.created_at,
+                 "avg_match_score": User.avg_match_score},
+        sorts={"created_at": func.coalesce(User.created_at, _EPOCH), "name": func.coalesce(User.name, ""),
+               "match_score": func.coalesce(User.avg_match_score, 0.0)},
+        search=(User.name, User.email),
+        filters={},
+        row=lambda r: {"id": r["id"], "name": r["name"], "email": r["email"], "created_at": str(r["created_at"]),
+                       "match_score": r["avg_match_score"]},
+    ),
+    "recruiters": Listing(
+        columns={"id": Recruiter.id, "name": Recruiter.name, "company_name": Recruiter.company_name,
+                 "official_email": Recruiter.official_email, "verification_status": Recruiter.verification_status,
+                 "linkedin_url": Recruiter.linkedin_url, "created_at": Recruiter.created_at},
+        sorts={"created_at": func.coalesce(Recruiter.created_at, _EPOCH), "name": func.coalesce(Recruiter.name, ""),
+               "company_name": func.coalesce(Recruiter.company_name, "")},
+        search=(Recruiter.name, Recruiter.company_name, Recruiter.official_email),
+        filters={"verification_status": lambda v: Recruiter.verification_status == v},
+        row=lambda r: {"id": r["id"], "name": r["name"], "company_name": r["company_name"],
+                       "official_email": r["official_email"], "verification_status": r["verification_status"],
+                       "linkedin_url": r["linkedin_url"], "job_count": r.get("job_count", 0),
+                       "created_at": str(r["created_at"])},
+    ),
+}
+
+# ===========================
+# 🔖 CURSORS
+# ===========================
+
+def _encode_cursor(sort: str, order: str, value, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    raw = json.dumps([sort, order, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str, sort: str, order: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, value, row_id = json.loads(raw)
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise HTTPException(status_code=400, detail="Cursor belongs to a different sort order")
+    return value, int(row_id)
+
+# ===========================
+# 🔎 QUERY
+# ===========================
+
+def _query(entity: str, q: Optional[str], filters: Dict[str, Optional[str]], sort: str, order: str):
+    listing = LISTINGS[entity]
+    model_id = listing.columns["id"]
+    if sort != "id" and sort not in listing.sorts:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: id, {', '.join(listing.sorts)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    sort_expr = model_id if sort == "id" else listing.sorts[sort]
+
+    stmt = select(*[column.label(name) for name, column in listing.columns.items()])
+    if sort != "id":
+        stmt = stmt.add_columns(sort_expr.label("_sort"))
+    if q:
+        stmt = stmt.where(or_(*[column.ilike(_like(q), escape="\\") for column in listing.search]))
+    for name, value in filters.items():
+        if value and name in listing.filters:
+            stmt = stmt.where(listing.filters[name](value))
+    if order == "desc":
+        stmt = stmt.order_by(sort_expr.desc(), model_id.desc()) if sort != "id" else stmt.order_by(model_id.desc())
+    else:
+        stmt = stmt.order_by(sort_expr.asc(), model_id.asc()) if sort != "id" else stmt.order_by(model_id.asc())
+    return stmt, sort_expr, model_id
+
+def _after(sort: str, order: str, sort_expr, model_id, value, row_id):
+    """Rows strictly after the cursor in (sort, id) order."""
+    if sort == "id":
+        return model_id < row_id if order == "desc" else model_id > row_id
+    # Compare against the cursor row's value as the database stores it (a value that went through
+    # Python can differ in format, e.g. SQLite timestamps); the cursor's copy covers a deleted row
+    anchor = func.coalesce(select(sort_expr).where(model_id == row_id).correlate(None).scalar_subquery(), value)
+    if order == "desc":
+        return or_(sort_expr < anchor, and_(sort_expr == anchor, model_id < row_id))
+    return or_(sort_expr > anchor, and_(sort_expr == anchor, model_id > row_id))
+
+def _job_counts(db: Session, recruiter_ids: List[int]) -> Dict[int, int]:
+    if not recruiter_ids:
+        return {}
+    rows = db.execute(select(Job.recruiter_id, func.count()).where(Job.recruiter_id.in_(recruiter_ids))
+                      .group_by(Job.recruiter_id))
+    return dict(rows.all())
+
+def list_page(db: Session, entity: str, q: Optional[str] = None, filters: Optional[Dict[str, Optional[str]]] = None,
+              sort: str = "id", order: str = "desc", limit: int = ADMIN_PAGE_DEFAULT,
+              cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """One page of an admin listing. Returns (items, next_cursor); next_cursor is None on the last page."""
+    limit = max(1, min(limit, ADMIN_PAGE_MAX))
+    stmt, sort_expr, model_id = _query(entity, q, filters or {}, sort, order)
+    if cursor:
+        value, row_id = _decode_cursor(cursor, sort, order)
+        stmt = stmt.where(_after(sort, order, sort_expr, model_id, value, row_id))
+
+    rows = [dict(row) for row in db.execute(stmt.limit(limit + 1)).mappings()]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if entity == "recruiters":
+        counts = _job_counts(db, [row["id"] for row in rows])
+        for row in rows:
+            row["job_count"] = counts.get(row["id"], 0)
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = _encode_cursor(sort, order, last["id"] if sort == "id" else last["_sort"], last["id"])
+    return [LISTINGS[entity].row(row) for row in rows], next_cursor
+
+# ===========================
+# 📤 STREAMING EXPORT
+# ===========================
+
+def export_rows(entity: str, fmt: str, q: Optional[str] = None, filters: Optional[Dict[str, Optional[str]]] = None,
+                sort: str = "id", order: str = "desc") -> Iterator[str]:
+    """
+    Every matching row as CSV or NDJSON text chunks (one chunk per EXPORT_BATCH_SIZE rows).
+    A sync generator with its own session: StreamingResponse runs it in a threadpool.
+    """
+    stmt, _, _ = _query(entity, q, filters or {}, sort, order)
+    if entity == "recruiters":
+        counts = select(Job.recruiter_id, func.count().label("job_count")).where(Job.recruiter_id.isnot(None))\
+            .group_by(Job.recruiter_id).subquery()
+        stmt = stmt.add_columns(func.coalesce(counts.c.job_count, 0).label("job_count"))\
+            .outerjoin(counts, counts.c.recruiter_id == Recruiter.id)
+    to_item = LISTINGS[entity].row
+
+    def generate():
+        db = SessionLocal()
+        try:
+            result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)).mappings()
+            writer, buffer = None, io.StringIO()
+            for batch in result.partitions():
+                for row in batch:
+                    item = to_item(dict(row))
+                    if fmt == "csv":
+                        if writer is None:
+                            writer = csv.DictWriter(buffer, fieldnames=list(item))
+                            writer.writeheader()
+                        writer.writerow(item)
+                    else:
+                        buffer.write(json.dumps(item, default=str) + "\n")
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        finally:
+            db.close()
+
+    return generate()
@@ -0,0 +1,42 @@
+# backend/ai_usage.py
+# Ledger of real LLM calls, one row per (subject, UTC day), shared by all workers.
+#
+# Every Groq call goes through record_ai_call() right before the request is sent, so cache hits
+# and early returns are never counted. With a limit, the increment only happens while the count is
+# below it (one conditional upsert), so parallel requests can't slip past the quota.
+import os
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+from backend.database import engine, dialect_insert
+from backend.models import AIUsage
+
+AI_DAILY_LIMIT = int(os.getenv("AI_DAILY_LIMIT", "20"))          # signed-in users
+AI_ANON_DAILY_LIMIT = int(os.getenv("AI_ANON_DAILY_LIMIT", "100"))  # per client IP
+
+def daily_limit_for(subject: str) -> int:
+    return AI_ANON_DAILY_LIMIT if subject.startswith("ip:") else AI_DAILY_LIMIT
+
+def record_ai_call(subject: str, limit: Optional[int] = None) -> int:
+    """
+    Counts one LLM call for `subject` today and returns the new count.
+    With `limit`, raises 429 instead of counting once the subject has used `limit` calls today.
+    """
+    now = datetime.utcnow()
+    today = now.date()
+    stmt = dialect_insert(engine)(AIUsage).values(subject=subject, day=today, calls=1, last_call_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AIUsage.subject, AIUsage.day],
+        set_={"calls": AIUsage.calls + 1, "last_call_at": now},
+        where=(AIUsage.calls < limit) if limit is not None else None,
+    ).returning(AIUsage.calls)
+
+    with engine.begin() as conn:
+        row = conn.execute(stmt).first()
+
+    if row is None:
+        raise HTTPException(
+            status_code=429,
+            detail="Daily limit reached. To ensure fair usage, please try again tomorrow."
+        )
+    return row[0]
@@ -0,0 +1,183 @@
+# backend/attachments.py
+# Email attachments (resumes) for the outbox workers.
+#
+# The old path read the whole file and turned it into list(bytes) — a Python list of ints, ~30x the
+# file size in memory — for every single email. Here a file is read in chunks, hashed and base64
+# encoded in the same pass, and the encoded result is cached by content hash, so a resume that is
+# attached to many applications is encoded once.
+#
+# Sources can be local paths (legacy static/resumes/...) or http(s) URLs (Supabase public URLs).
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlparse, unquote
+import httpx
+
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(10 * 1024 * 1024)))
+ATTACHMENT_CACHE_BYTES = int(os.getenv("ATTACHMENT_CACHE_BYTES", str(64 * 1024 * 1024)))
+ATTACHMENT_URL_TTL_SECONDS = 3600
+# Multiple of 3 so each chunk base64-encodes on its own without padding in the middle
+CHUNK_SIZE = 3 * 256 * 1024
+
+class AttachmentTooLarge(Exception):
+    pass
+
+@dataclass(frozen=True)
+class Attachment:
+    filename: str
+    content_b64: str
+    sha256: str
+    size: int
+
+    def as_resend(self) -> dict:
+        return {"filename": self.filename, "content": self.content_b64}
+
+class _EncodedCache:
+    """sha256 -> base64 text, LRU bounded by total encoded size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            value = self._items.get(digest)
+            if value is not None:
+                self._items.move_to_end(digest)
+            return value
+
+    def put(self, digest: str, value: str) -> str:
+        """Stores value and returns the cached copy (the same content from another source is shared)."""
+        if len(value) > self.max_bytes:
+            return value
+        with self._lock:
+            if digest in self._items:
+                self._items.move_to_end(digest)
+                return self._items[digest]
+            self._items[digest] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+            return value
+
+_encoded = _EncodedCache(ATTACHMENT_CACHE_BYTES)
+# source key (path+mtime+size, or URL) -> (expires_at, sha256, size, filename)
+_sources = OrderedDict()
+_sources_lock = threading.Lock()
+_http: Optional[httpx.Client] = None
+
+def _http_client() -> httpx.Client:
+    # The outbox workers are threads, so this is a sync pooled client (httpx.Client is thread-safe)
+    global _http
+    if _http is None:
+        _http = httpx.Client(timeout=httpx.Timeout(20.0, connect=5.0), follow_redirects=True,
+                             limits=httpx.Limits(max_connections=10, max_keepalive_connections=5))
+    return _http
+
+def _encode_stream(chunks) -> tuple:
+    """Hashes and base64-encodes an iterator of byte chunks in one pass. Returns (sha256, b64, size)."""
+    digest, parts, size, carry = hashlib.sha256(), [], 0, b""
+    for chunk in chunks:
+        size += len(chunk)
+        if size > ATTACHMENT_MAX_BYTES:
+            raise AttachmentTooLarge(f"Attachment exceeds {ATTACHMENT_MAX_BYTES} bytes")
+        digest.update(chunk)
+        data = carry + chunk
+        cut = len(data) - len(data) % 3
+        parts.append(base64.b64encode(data[:cut]))
+        carry = data[cut:]
+    parts.append(base64.b64encode(carry))
+    return digest.hexdigest(), b"".join(parts).decode("ascii"), size
+
+def _remember(key: str, ttl: Optional[float], digest: str, size: int, filename: str):
+    with _sources_lock:
+        _sources[key] = (time.monotonic() + ttl if ttl else None, digest, size, filename)
+        _sources.move_to_end(key)
+        while len(_sources) > 10000:
+            _sources.popitem(last=False)
+
+def _recall(key: str):
+    with _sources_lock:
+        item = _sources.get(key)
+        if item and item[0] is not None and item[0] <= time.monotonic():
+            del _sources[key]
+            return None
+        return item
+
+def _from_cache(key: str) -> Optional[Attachment]:
+    known = _recall(key)
+    if not known:
+        return None
+    _, digest, size, filename = known
+    encoded = _encoded.get(digest)
+    return Attachment(filename, encoded, digest, size) if encoded is not None else None
+
+def _load_file(path: str) -> Optional[Attachment]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = f"file:{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    cached = _from_cache(key)
+    if cached:
+        return cached
+    if stat.st_size > ATTACHMENT_MAX_BYTES:
+        raise AttachmentTooLarge(f"{path} is {stat.st_size} bytes (limit {ATTACHMENT_MAX_BYTES})")
+
+    def chunks():
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+    digest, encoded, size = _encode_stream(chunks())
+    filename = os.path.basename(path)
+    encoded = _encoded.put(digest, encoded)
+    _remember(key, None, digest, size, filename)
+    return Attachment(filename, encoded, digest, size)
+
+def _load_url(url: str) -> Optional[Attachment]:
+    key = f"url:{url}"
+    cached = _from_cache(key)
+    if cached:
+        return cached
+
+    with _http_client().stream("GET", url) as response:
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()  # other errors -> the outbox retries later
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > ATTACHMENT_MAX_BYTES:
+            raise AttachmentTooLarge(f"{url} is {declared} bytes (limit {ATTACHMENT_MAX_BYTES})")
+        digest, encoded, size = _encode_stream(response.iter_bytes(CHUNK_SIZE))
+
+    filename = os.path.basename(unquote(urlparse(url).path)) or "resume.pdf"
+    encoded = _encoded.put(digest, encoded)
+    _remember(key, ATTACHMENT_URL_TTL_SECONDS, digest, size, filename)
+    return Attachment(filename, encoded, digest, size)
+
+def load_attachment(source: str) -> Optional[Attachment]:
+    """
+    Returns the encoded attachment, or None if the source no longer exists (the email then goes out
+    without it, as before). Network errors propagate so the caller can retry.
+    """
+    if not source:
+        return None
+    if source.startswith(("http://", "https://")):
+        return _load_url(source)
+    return _load_file(source)
+
+def resume_source(resume_filename: Optional[str]) -> Optional[str]:
+    """What to attach for a user's stored resume: the Supabase URL itself, or the legacy local path."""
+    if not resume_filename:
+        return None
+    if resume_filename.startswith(("http://", "https://")):
+        return resume_filename
+    return os.path.join("static", "resumes", resume_filename)
@@ -0,0 +1,154 @@
+# backend/campaigns.py
+# Marketing nudge campaigns (profile completion / Truth Score), run off the request path.
+#
+# - Candidates are chosen by SQL predicates, not by loading users and checking them in Python.
+# - The result is read through a server-side cursor (stream_results) in MARKETING_BATCH_SIZE batches.
+# - Frequency cap: users nudged in the last MARKETING_FREQUENCY_CAP_DAYS are excluded by the query;
+#   users.last_nudge_at is set in the same transaction that queues their email.
+# - Send rate: each email gets its own outbox slot (next_attempt_at) MARKETING_SENDS_PER_MINUTE apart,
+#   so the outbox drains a campaign at a steady pace and transactional mail is never stuck behind it.
+# - Progress lives in campaign_runs (migration 0009) and is served by GET /admin/marketing/campaigns/{id}.
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import select, update, func, and_, or_
+from backend.database import engine
+from backend.email_templates import render_profile_completion_reminder, render_truth_score_nudge
+from backend.models import CampaignRun, EmailOutbox, User
+
+MARKETING_BATCH_SIZE = 500
+MARKETING_SENDS_PER_MINUTE = int(os.getenv("MARKETING_SENDS_PER_MINUTE", "120"))
+MARKETING_FREQUENCY_CAP_DAYS = int(os.getenv("MARKETING_FREQUENCY_CAP_DAYS", "7"))
+NUDGE_COHORT_DAYS = 7  # only users who joined recently, to avoid annoying old users
+RUN_STALE_SECONDS = 600
+
+# ===========================
+# 🎯 CANDIDATE SELECTION
+# ===========================
+
+def _blank(column):
+    return or_(column.is_(None), column == "")
+
+def nudge_candidates(now: datetime):
+    """
+    SELECT of users due a nudge, with the reasons as columns:
+    incomplete profile (no resume / no location / < 5 chars of skills) -> profile nudge,
+    otherwise a resume but no match score yet -> Truth Score nudge.
+    """
+    no_resume = and_(_blank(User.resume_filename), _blank(User.resume_text))
+    no_location = _blank(User.location)
+    few_skills = or_(User.skills.is_(None), func.length(User.skills) < 5)
+    unscored = and_(~_blank(User.resume_text), func.coalesce(User.avg_match_score, 0) == 0)
+
+    return (
+        select(User.id, User.name, User.email,
+               no_resume.label("no_resume"), no_location.label("no_location"), few_skills.label("few_skills"))
+        .where(
+            User.created_at >= datetime.now() - timedelta(days=NUDGE_COHORT_DAYS),
+            ~_blank(User.email),
+            or_(User.last_nudge_at.is_(None), User.last_nudge_at < now - timedelta(days=MARKETING_FREQUENCY_CAP_DAYS)),
+            or_(no_resume, no_location, few_skills, unscored),
+        )
+        .order_by(User.id)
+    )
+
+def _render_nudge(row) -> tuple:
+    missing = [label for flag, label in ((row.no_resume, "Resume"), (row.no_location, "Location"), (row.few_skills, "Key Skills")) if flag]
+    if missing:
+        return render_profile_completion_reminder(row.name, missing)
+    return render_truth_score_nudge(row.name)
+
+def _candidate_batches(now: datetime):
+    """Yields lists of candidate rows: a named (server-side) cursor on Postgres, id keyset pages elsewhere."""
+    query = nudge_candidates(now)
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(stream_results=True, yield_per=MARKETING_BATCH_SIZE) as conn:
+            yield from conn.execute(query).partitions()
+        return
+
+    # SQLite can't commit while another connection has a statement open, so page by id instead
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            batch = conn.execute(query.where(User.id > last_id).limit(MARKETING_BATCH_SIZE)).all()
+        if not batch:
+            return
+        last_id = batch[-1].id
+        yield batch
+
+# ===========================
+# 🏃 RUNNER
+# ===========================
+
+def start_nudge_campaign() -> dict:
+    """Registers a run and processes it on a background thread. 409 if one is already in progress."""
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        active = conn.execute(
+            select(CampaignRun.id).where(CampaignRun.kind == "nudges", CampaignRun.status == "running",
+                                         CampaignRun.heartbeat_at >= now - timedelta(seconds=RUN_STALE_SECONDS))
+        ).first()
+        if active:
+            raise HTTPException(status_code=409, detail=f"Campaign {active[0]} is still running")
+        conn.execute(
+            update(CampaignRun).where(CampaignRun.kind == "nudges", CampaignRun.status == "running")
+            .values(status="failed", last_error="stalled", finished_at=now)
+        )
+        candidates = conn.execute(select(func.count()).select_from(nudge_candidates(now).order_by(None).subquery())).scalar()
+        run_id = conn.execute(
+            CampaignRun.__table__.insert().values(kind="nudges", status="running", candidates=candidates,
+                                                  processed=0, emails_queued=0, heartbeat_at=now, started_at=now)
+            .returning(CampaignRun.id)
+        ).scalar()
+
+    threading.Thread(target=run_nudge_campaign, args=(run_id, now), name=f"campaign-{run_id}", daemon=True).start()
+    return {"campaign_id": run_id, "candidates": candidates}
+
+def run_nudge_campaign(run_id: int, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.utcnow()
+    interval = timedelta(seconds=60 / max(1, MARKETING_SENDS_PER_MINUTE))
+    # Continue after any campaign mail that is still scheduled, so back-to-back runs don't double the rate
+    with engine.connect() as conn:
+        previous = conn.execute(select(func.max(CampaignRun.send_until)).where(CampaignRun.kind == "nudges")).scalar()
+    slot = max(now, previous or now)
+    processed = queued = 0
+
+    try:
+        for batch in _candidate_batches(now):
+            messages = []
+            for row in batch:
+                subject, html = _render_nudge(row)
+                messages.append({"to_email": row.email, "subject": subject, "html": html, "status": "pending",
+                                 "attempts": 0, "next_attempt_at": slot, "created_at": now})
+                slot += interval
+            processed += len(batch)
+            queued += len(messages)
+
+            # Emails + frequency-cap watermark + progress in one transaction
+            with engine.begin() as conn:
+                conn.execute(EmailOutbox.__table__.insert(), messages)
+                conn.execute(update(User).where(User.id.in_([row.id for row in batch])).values(last_nudge_at=now))
+                conn.execute(update(CampaignRun).where(CampaignRun.id == run_id).values(
+                    processed=processed, emails_queued=queued, send_until=slot, heartbeat_at=datetime.utcnow()))
+    except Exception as e:
+        print(f"❌ Campaign {run_id} failed after {processed} users: {e}")
+        with engine.begin() as conn:
+            conn.execute(update(CampaignRun).where(CampaignRun.id == run_id).values(
+                status="failed", last_error=str(e)[:1000], finished_at=datetime.utcnow()))
+        raise
+
+    with engine.begin() as conn:
+        conn.execute(update(CampaignRun).where(CampaignRun.id == run_id).values(status="done", finished_at=datetime.utcnow()))
+    print(f"📢 Campaign {run_id}: queued {queued} nudges, sending until {slot:%Y-%m-%d %H:%M} UTC")
+    return {"processed": processed, "emails_queued": queued}
+
+def campaign_status(run_id: int) -> Optional[dict]:
+    with engine.connect() as conn:
+        row = conn.execute(select(CampaignRun).where(CampaignRun.id == run_id)).mappings().first()
+    if not row:
+        return None
+    status = {key: (value.isoformat() if isinstance(value, datetime) else value) for key, value in row.items()}
+    status["progress"] = round(row["processed"] / row["candidates"], 3) if row["candidates"] else 1.0
+    return status
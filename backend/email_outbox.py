@@ -0,0 +1,254 @@
+# backend/email_outbox.py
+# Durable email outbox.
+#
+# Request handlers only INSERT a row (enqueue_email); workers claim due rows in batches, send
+# them through the transport and record the delivery state. A crash or restart never loses mail:
+# unsent rows stay 'pending', and rows a dead worker was holding ('sending' past locked_until)
+# are claimed again.
+#
+#   python -m backend.email_outbox              # dedicated worker process (EMAIL_OUTBOX_WORKERS threads)
+#   EMAIL_OUTBOX_IN_APP=true                    # (default) also run one worker thread inside the API
+#   EMAIL_TRANSPORT=resend | local              # local = keep/write messages instead of sending (tests/dev)
+#
+# Retries back off exponentially (30s, 1m, 2m, ... capped at 1h) up to EMAIL_MAX_ATTEMPTS, then 'failed'.
+import hashlib
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+import resend
+from sqlalchemy import select, update, delete, func
+from backend.database import engine, SessionLocal
+from backend.models import EmailOutbox
+from backend.attachments import load_attachment, AttachmentTooLarge
+
+SENDER_IDENTITY = "TruthHire <no-reply@truthhire.in>"
+RESEND_BATCH_LIMIT = 100  # Resend's batch API maximum
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_LEASE_SECONDS = 120
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "2"))
+EMAIL_RETENTION_DAYS = 14
+
+# ===========================
+# 📮 TRANSPORTS
+# ===========================
+
+class ResendTransport:
+    """Plain messages go through Resend's batch API; messages with attachments (not supported by batch) one by one."""
+
+    def __init__(self):
+        resend.api_key = os.getenv("RESEND_API_KEY")
+
+    def _params(self, message: dict) -> dict:
+        params = {"from": SENDER_IDENTITY, "to": [message["to_email"]], "subject": message["subject"], "html": message["html"]}
+        attachment = _attachment_for(message)
+        if attachment:
+            params["attachments"] = [attachment.as_resend()]
+        return params
+
+    def send_batch(self, messages: List[dict]) -> List[Optional[str]]:
+        """Sends all messages or raises. Returns provider ids in the same order."""
+        if len(messages) == 1 or any(m.get("attachment_path") for m in messages):
+            ids = []
+            for m in messages:
+                response = resend.Emails.send(self._params(m), {"idempotency_key": f"outbox-{m['id']}"})
+                ids.append(response.get("id") if isinstance(response, dict) else None)
+            return ids
+
+        response = resend.Batch.send([self._params(m) for m in messages], {"idempotency_key": _batch_key(messages)})
+        data = response.get("data", []) if isinstance(response, dict) else []
+        return [item.get("id") for item in data] + [None] * (len(messages) - len(data))
+
+def _batch_key(messages: List[dict]) -> str:
+    # Fixed-length digest of the whole id set: a retry of the same batch gets the same key, and any
+    # other set of rows (e.g. a retry plus newly claimed ones) a different one
+    ids = ",".join(str(i) for i in sorted(m["id"] for m in messages))
+    return "outbox-" + hashlib.sha256(ids.encode("utf-8")).hexdigest()
+
+class LocalTransport:
+    """Stand-in for tests / local dev: keeps every message in `sent` (and writes .html files if a dir is given)."""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self.sent = []
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def send_batch(self, messages: List[dict]) -> List[Optional[str]]:
+        ids = []
+        for m in messages:
+            attachment = _attachment_for(m)
+            self.sent.append(dict(m, attachment=attachment.filename if attachment else None))
+            provider_id = f"local-{m['id']}"
+            if self.directory:
+                with open(os.path.join(self.directory, f"{m['id']:06d}.html"), "w", encoding="utf-8") as f:
+                    f.write(f"<!-- To: {m['to_email']} | Subject: {m['subject']} -->\n{m['html']}")
+            ids.append(provider_id)
+        return ids
+
+def _attachment_for(message: dict):
+    # Missing / oversized files: send the email without it (as before). Fetch errors raise -> retry.
+    try:
+        return load_attachment(message.get("attachment_path"))
+    except AttachmentTooLarge as e:
+        print(f"⚠️ Skipping attachment for email {message['id']}: {e}")
+        return None
+
+def build_transport():
+    if os.getenv("EMAIL_TRANSPORT", "resend").lower() == "local":
+        return LocalTransport(os.getenv("EMAIL_LOCAL_DIR"))
+    return ResendTransport()
+
+# ===========================
+# 📥 ENQUEUE
+# ===========================
+
+def enqueue_email(to_email: str, subject: str, html_content: str, attachment_path: str = None) -> Optional[int]:
+    """Queues one email (own short transaction, so it is durable before the response goes out)."""
+    if not to_email:
+        return None
+    try:
+        with engine.begin() as conn:
+            return conn.execute(
+                EmailOutbox.__table__.insert().values(
+                    to_email=to_email, subject=subject, html=html_content, attachment_path=attachment_path,
+                    status="pending", attempts=0, next_attempt_at=datetime.utcnow(), created_at=datetime.utcnow(),
+                ).returning(EmailOutbox.id)
+            ).scalar()
+    except Exception as e:
+        # Same contract as the old send helper: mail problems never fail the request
+        print(f"❌ Failed to queue email to {to_email}: {e}")
+        return None
+
+# ===========================
+# ⚙️ WORKER
+# ===========================
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(3600, 30 * 2 ** max(0, attempts - 1)))
+
+def claim_batch(limit: int = EMAIL_BATCH_SIZE) -> List[dict]:
+    """Marks up to `limit` due rows as 'sending' (leased) and returns them. Safe to run from many workers."""
+    now = datetime.utcnow()
+    due = (
+        ((EmailOutbox.status == "pending") & (EmailOutbox.next_attempt_at <= now))
+        | ((EmailOutbox.status == "sending") & (EmailOutbox.locked_until < now))
+    )
+    candidates = select(EmailOutbox.id).where(due).order_by(EmailOutbox.id).limit(limit)
+    if engine.dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    stmt = (
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(candidates.scalar_subquery()))
+        .values(status="sending", attempts=EmailOutbox.attempts + 1, locked_until=now + timedelta(seconds=EMAIL_LEASE_SECONDS))
+        .returning(EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.subject, EmailOutbox.html,
+                   EmailOutbox.attachment_path, EmailOutbox.attempts)
+    )
+    with engine.begin() as conn:
+        return sorted((dict(row) for row in conn.execute(stmt).mappings()), key=lambda m: m["id"])
+
+def _record(results: List[dict]):
+    if not results:
+        return
+    db = SessionLocal()
+    try:
+        db.execute(update(EmailOutbox), results)
+        db.commit()
+    finally:
+        db.close()
+
+def deliver(messages: List[dict], transport) -> int:
+    """Sends claimed messages in provider-sized batches and records sent / retry / failed. Returns # sent."""
+    sent = 0
+    plain = [m for m in messages if not m.get("attachment_path")]
+    with_files = [m for m in messages if m.get("attachment_path")]
+    groups = [plain[i:i + RESEND_BATCH_LIMIT] for i in range(0, len(plain), RESEND_BATCH_LIMIT)] + [[m] for m in with_files]
+
+    for group in groups:
+        now = datetime.utcnow()
+        try:
+            provider_ids = transport.send_batch(group)
+        except Exception as e:
+            error = str(e)[:1000]
+            print(f"⚠️ Email batch failed ({len(group)} messages): {error}")
+            _record([
+                {"id": m["id"], "status": "failed", "locked_until": None, "last_error": error}
+                if m["attempts"] >= EMAIL_MAX_ATTEMPTS else
+                {"id": m["id"], "status": "pending", "locked_until": None, "last_error": error,
+                 "next_attempt_at": now + _backoff(m["attempts"])}
+                for m in group
+            ])
+            continue
+
+        _record([
+            {"id": m["id"], "status": "sent", "locked_until": None, "last_error": None, "sent_at": now, "provider_id": pid}
+            for m, pid in zip(group, provider_ids)
+        ])
+        sent += len(group)
+    return sent
+
+def process_once(transport, limit: int = EMAIL_BATCH_SIZE) -> int:
+    messages = claim_batch(limit)
+    return deliver(messages, transport) if messages else 0
+
+def purge_sent(days: int = EMAIL_RETENTION_DAYS) -> int:
+    with engine.begin() as conn:
+        return conn.execute(
+            delete(EmailOutbox).where(EmailOutbox.status == "sent", EmailOutbox.sent_at < datetime.utcnow() - timedelta(days=days))
+        ).rowcount
+
+def outbox_stats() -> dict:
+    with engine.connect() as conn:
+        counts = dict(conn.execute(select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)).all())
+        oldest = conn.execute(select(func.min(EmailOutbox.created_at)).where(EmailOutbox.status == "pending")).scalar()
+    return {"counts": counts, "oldest_pending_at": str(oldest) if oldest else None}
+
+class OutboxWorkerPool:
+    """N threads that each claim and deliver batches until stopped."""
+
+    def __init__(self, workers: int = 1, transport=None):
+        self.workers = workers
+        self.transport = transport or build_transport()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _run(self, index: int):
+        last_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                if index == 0 and time.monotonic() - last_purge > 3600:
+                    last_purge = time.monotonic()
+                    purge_sent()
+                if process_once(self.transport):
+                    continue  # more may be waiting
+            except Exception as e:
+                print(f"⚠️ Email worker error: {e}")
+            self._stop.wait(EMAIL_POLL_SECONDS)
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(i,), name=f"email-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.getenv("EMAIL_OUTBOX_WORKERS", "2"))
+    print(f"📮 Email outbox worker running with {workers} thread(s). Ctrl+C to stop.")
+    pool = OutboxWorkerPool(workers).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
@@ -0,0 +1,871 @@
+# backend/email_templates.py
+# Email layouts, compiled once at import.
+#
+# A template is plain HTML with {{ name }} slots (HTML-escaped on render) and {{ name|raw }} slots
+# for fragments that are already HTML (other rendered templates, trusted content blocks).
+# compile_template() splits the source into static chunks + slots a single time, so rendering is
+# just a join: no re-parsing, no rebuilding the CSS/header/footer strings for every email.
+#
+#   python -m backend.email_templates bench 5000    # render 5000 daily digests, print emails/sec
+import html
+import re
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+
+_SLOT = re.compile(r"\{\{\s*(\w+)\s*(\|\s*raw\s*)?\}\}")
+
+def escape(value) -> str:
+    return html.escape("" if value is None else str(value), quote=True)
+
+class Template:
+    """Compiled template. render(**context) raises KeyError for a missing variable."""
+
+    __slots__ = ("name", "_ops", "_tail", "variables")
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self._ops = []
+        position = 0
+        for match in _SLOT.finditer(source):
+            self._ops.append((source[position:match.start()], match.group(1), bool(match.group(2))))
+            position = match.end()
+        self._tail = source[position:]
+        self.variables = frozenset(key for _, key, _ in self._ops)
+
+    def render(self, **context) -> str:
+        out = []
+        append = out.append
+        for static, key, raw in self._ops:
+            append(static)
+            append(context[key] if raw else escape(context[key]))
+        append(self._tail)
+        return "".join(out)
+
+def compile_template(name: str, source: str) -> Template:
+    return Template(name, source)
+
+# ===========================
+# 🧱 UNIFIED LAYOUT (all transactional emails)
+# ===========================
+
+BASE_LAYOUT = compile_template("base", """
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="utf-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <style>
+            body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; background-color: #f3f4f6; margin: 0; padding: 0; color: #1f2937; }
+            .container { max-width: 600px; margin: 0 auto; background-color: #ffffff; }
+            .header { padding: 24px; border-bottom: 1px solid #e5e7eb; text-align: left; }
+            .logo { font-size: 20px; font-weight: 800; color: #111827; letter-spacing: -0.5px; text-decoration: none; }
+            .logo span { color: #2563eb; }
+            .content { padding: 40px 24px; }
+            .footer { background-color: #f9fafb; padding: 24px; text-align: center; font-size: 12px; color: #6b7280; border-top: 1px solid #e5e7eb; }
+            .link { color: #2563eb; text-decoration: none; }
+            h1 { margin: 0 0 16px; font-size: 24px; color: #111827; font-weight: 700; }
+            p { margin: 0 0 16px; font-size: 16px; line-height: 1.6; color: #4b5563; }
+            ul { margin: 0 0 24px; padding-left: 20px; }
+            li { margin-bottom: 8px; font-size: 15px; color: #4b5563; line-height: 1.5; }
+            .info-box { background-color: #f9fafb; border: 1px solid #e5e7eb; border-radius: 8px; padding: 20px; margin: 24px 0; }
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <a href="http://localhost:3000" class="logo">TruthHire<span>.</span></a>
+            </div>
+
+            <div class="content">
+                <h1 style="margin: 0 0 16px; font-size: 24px; color: #111827;">{{ headline }}</h1>
+
+                {{ content_html|raw }}
+
+                {{ cta_section|raw }}
+            </div>
+
+            {{ footer|raw }}
+        </div>
+    </body>
+    </html>
+    """)
+
+BASE_FOOTER = compile_template("base_footer", """<div class="footer">
+                <p style="margin-bottom: 12px;">
+                    &copy; {{ year }} TruthHire Inc. &middot; Pune, Maharashtra, India
+                </p>
+                <p>
+                    <a href="#" class="link">Support</a> &middot; <a href="#" class="link">Privacy Policy</a>
+                </p>
+            </div>""")
+
+CTA_BUTTON = compile_template("cta_button", """
+        <div style="text-align: center; margin-top: 32px;">
+            <a href="{{ cta_link }}" style="display: inline-block; background-color: #2563eb; color: #ffffff; padding: 12px 24px; border-radius: 6px; text-decoration: none; font-weight: 600; font-size: 14px;">
+                {{ cta_text }}
+            </a>
+        </div>
+        """)
+
+@lru_cache(maxsize=8)
+def _base_footer(year: int) -> str:
+    return BASE_FOOTER.render(year=year)
+
+@lru_cache(maxsize=64)
+def _cta_section(cta_text: str, cta_link: str) -> str:
+    # A handful of fixed CTAs across all emails, so each is rendered once
+    return CTA_BUTTON.render(cta_text=cta_text, cta_link=cta_link)
+
+def get_base_email_template(headline, content_html, cta_text=None, cta_link=None):
+    """
+    Unified Design System based on the provided reference.
+    Used by all email functions to ensure 100% consistency.
+    `content_html` is inserted as-is; escape user input before building it.
+    """
+    return BASE_LAYOUT.render(
+        headline=headline,
+        content_html=content_html,
+        cta_section=_cta_section(cta_text, cta_link) if cta_text and cta_link else "",
+        footer=_base_footer(datetime.now().year),
+    )
+
+# ===========================
+# 🎨 BRANDED LAYOUT (with preheader)
+# ===========================
+
+BRANDED_LAYOUT = compile_template("branded", """
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="utf-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>{{ title }}</title>
+        <style>
+            body, table, td, a { -webkit-text-size-adjust: 100%; -ms-text-size-adjust: 100%; }
+            table, td { mso-table-lspace: 0pt; mso-table-rspace: 0pt; }
+            img { -ms-interpolation-mode: bicubic; border: 0; height: auto; line-height: 100%; outline: none; text-decoration: none; }
+            @media screen and (max-width: 600px) {
+                .email-container { width: 100% !important; }
+                .mobile-padding { padding-left: 20px !important; padding-right: 20px !important; }
+            }
+        </style>
+    </head>
+    <body style="margin: 0; padding: 0; background-color: #f7f9fc; font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; color: #333333;">
+        <div style="display: none; font-size: 1px; color: #f7f9fc; line-height: 1px; max-height: 0px; max-width: 0px; opacity: 0; overflow: hidden;">{{ preheader }}</div>
+        <table border="0" cellpadding="0" cellspacing="0" width="100%" style="background-color: #f7f9fc; padding: 40px 0;">
+            <tr><td align="center">
+                    <table class="email-container" border="0" cellpadding="0" cellspacing="0" width="600" style="background-color: #ffffff; border-radius: 16px; overflow: hidden; box-shadow: 0 4px 24px rgba(0,0,0,0.06); border: 1px solid #eaecf0;">
+                        <tr><td align="center" style="padding: 40px 0 30px 0; border-bottom: 1px solid #f0f2f5;">
+                                <a href="http://localhost:3000" style="text-decoration: none;">
+                                    <span style="font-size: 26px; font-weight: 800; color: #111827; letter-spacing: -0.5px;">TruthHire<span style="color: #2563eb;">.</span></span>
+                                </a>
+                            </td></tr>
+                        <tr><td class="mobile-padding" style="padding: 40px 50px;">{{ content|raw }}</td></tr>
+                        <tr><td style="background-color: #fafafa; padding: 30px 40px; border-top: 1px solid #f0f2f5; text-align: center;">
+                                <p style="margin: 0 0 10px; font-size: 12px; color: #6b7280; font-weight: 500; text-transform: uppercase; letter-spacing: 1px;">TruthHire Inc.</p>
+                                <p style="margin: 0 0 10px; font-size: 12px; color: #9ca3af; line-height: 1.5;">Hinjewadi Phase 1, Pune, MH, India.<br>Connecting Verified Talent with Verified Jobs.</p>
+                                <div style="margin-top: 15px;">
+                                    <a href="#" style="color: #2563eb; text-decoration: none; font-size: 12px; margin: 0 10px;">Privacy Policy</a>
+                                    <a href="#" style="color: #2563eb; text-decoration: none; font-size: 12px; margin: 0 10px;">Support</a>
+                                </div>
+                            </td></tr>
+                    </table>
+                    <table border="0" cellpadding="0" cellspacing="0" width="100%">
+                        <tr><td align="center" style="padding-top: 20px;"><p style="font-size: 12px; color: #9ca3af;">Sent with ❤️ to verify your career journey.</p></td></tr>
+                    </table>
+                </td></tr>
+        </table>
+    </body>
+    </html>
+    """)
+
+def get_email_template(title, content, preheader=""):
+    return BRANDED_LAYOUT.render(title=title, content=content, preheader=preheader)
+
+# ===========================
+# 📨 APPLICATION EMAIL (to the recruiter)
+# ===========================
+
+MAGIC_ACTIONS = compile_template("magic_actions", """
+        <div style="margin-top: 24px; padding-top: 24px; border-top: 1px solid #e5e7eb;">
+            <p style="margin: 0 0 12px; font-size: 11px; font-weight: 700; color: #6b7280; text-transform: uppercase; letter-spacing: 0.5px;">⚡ Quick Actions (No Login Required)</p>
+            <table width="100%" cellspacing="0" cellpadding="0">
+                <tr>
+                    <td width="48%" style="padding-right: 2%;">
+                        <a href="{{ approve_link }}" style="display: block; background-color: #16a34a; color: #ffffff; text-align: center; padding: 12px; border-radius: 6px; text-decoration: none; font-weight: 600; font-size: 14px;">✅ Shortlist</a>
+                    </td>
+                    <td width="48%" style="padding-left: 2%;">
+                        <a href="{{ reject_link }}" style="display: block; background-color: #ffffff; border: 1px solid #d1d5db; color: #dc2626; text-align: center; padding: 11px; border-radius: 6px; text-decoration: none; font-weight: 600; font-size: 14px;">❌ Reject</a>
+                    </td>
+                </tr>
+            </table>
+        </div>
+        """)
+
+APPLICATION_BODY = compile_template("application_body", """
+    <p>Hello,</p>
+    <p>We found a verified candidate for the <strong>{{ job_title }}</strong> position.</p>
+
+    <div style="border: 1px solid #e5e7eb; border-radius: 8px; padding: 24px; background-color: #ffffff; margin-bottom: 24px;">
+        <table width="100%" cellpadding="0" cellspacing="0" style="margin-bottom: 20px;">
+            <tr>
+                <td valign="middle">
+                    <h3 style="margin: 0 0 4px; font-size: 18px; color: #111827; font-weight: 700;">{{ name }}</h3>
+                    <p style="margin: 0; color: #6b7280; font-size: 14px;">{{ email }}</p>
+                </td>
+                <td valign="middle" align="right">
+                    <span style="background-color: {{ score_bg }}; color: {{ score_color }}; padding: 6px 12px; border-radius: 20px; font-weight: 700; font-size: 14px; border: 1px solid {{ score_color }}30;">
+                        {{ score }}% Match
+                    </span>
+                </td>
+            </tr>
+        </table>
+
+        <div style="border-top: 1px dashed #e5e7eb; padding-top: 16px; margin-bottom: 16px;">
+            <div style="margin-bottom: 12px;">
+                <p style="margin: 0 0 4px; font-size: 11px; font-weight: 700; color: #16a34a; text-transform: uppercase; letter-spacing: 0.5px;">✅ Verified Skills</p>
+                <p style="margin: 0; font-size: 14px; color: #374151; line-height: 1.5;">{{ matched }}</p>
+            </div>
+
+            <div>
+                <p style="margin: 0 0 4px; font-size: 11px; font-weight: 700; color: #dc2626; text-transform: uppercase; letter-spacing: 0.5px;">⚠️ Missing / Unverified</p>
+                <p style="margin: 0; font-size: 14px; color: #374151; line-height: 1.5;">{{ missing }}</p>
+            </div>
+        </div>
+
+        <div style="background-color: #f9fafb; padding: 12px; border-radius: 6px; border-left: 3px solid #e5e7eb;">
+            <p style="margin: 0 0 4px; font-size: 10px; font-weight: 700; color: #9ca3af; text-transform: uppercase;">MESSAGE FROM CANDIDATE</p>
+            <p style="margin: 0; font-style: italic; color: #4b5563; font-size: 14px; line-height: 1.5;">"{{ cover_note }}"</p>
+        </div>
+
+        {{ magic_actions|raw }}
+    </div>
+
+    <p style="font-size: 14px; color: #6b7280; margin-top: 24px;">The candidate's resume is attached to this email for your detailed review.</p>
+    """)
+
+def render_application_email(job_title: str, candidate_data: dict, cover_note: str, is_cold_outreach: bool = False,
+                             approve_link: str = None, reject_link: str = None) -> str:
+    score = candidate_data.get('score', 0)
+    matched_list = candidate_data.get('matched', [])
+    missing_list = candidate_data.get('missing', [])
+
+    magic_actions = ""
+    if approve_link and reject_link:
+        magic_actions = MAGIC_ACTIONS.render(approve_link=approve_link, reject_link=reject_link)
+
+    body = APPLICATION_BODY.render(
+        job_title=job_title,
+        name=candidate_data['name'],
+        email=candidate_data['email'],
+        score=score,
+        score_color="#16a34a" if score >= 75 else "#d97706",
+        score_bg="#f0fdf4" if score >= 75 else "#fffbeb",
+        matched=", ".join(matched_list) if matched_list else "General profile match.",
+        missing=", ".join(missing_list) if missing_list else "No critical skills missing.",
+        cover_note=cover_note,
+        magic_actions=magic_actions,
+    )
+    headline = "Candidate Match Found" if is_cold_outreach else "New Application Received"
+    return get_base_email_template(headline, body, "Login to View Full Profile", "https://truthhire.in/recruiter/login")
+
+# ===========================
+# 🔔 TRANSACTIONAL BODIES (account, OTP, application status)
+# ===========================
+# Every value is a {{ slot }}, so names, job titles and recruiter feedback are escaped.
+
+ADMIN_RECRUITER_ALERT_BODY = compile_template("admin_recruiter_alert", """
+    <p>Hello Admin,</p>
+    <p>A new recruiter has registered using a <strong>public email domain</strong> and has been placed in the verification queue.</p>
+    
+    <div style="background-color: #fff7ed; border-left: 4px solid #f97316; padding: 16px; border-radius: 4px; margin: 24px 0;">
+        <p style="margin: 0 0 12px; font-size: 14px; font-weight: 700; color: #9a3412; text-transform: uppercase;">Recruiter Details</p>
+        <ul style="margin: 0; padding-left: 20px; color: #431407;">
+            <li style="margin-bottom: 8px;"><strong>Name:</strong> {{ recruiter_name }}</li>
+            <li style="margin-bottom: 8px;"><strong>Email:</strong> {{ recruiter_email }}</li>
+            <li style="margin-bottom: 8px;"><strong>LinkedIn:</strong> <a href="{{ linkedin_url }}" style="color: #ea580c;">View Profile</a></li>
+            <li><strong>Status:</strong> <span style="background-color: #ffedd5; color: #c2410c; padding: 2px 6px; border-radius: 4px; font-size: 12px; font-weight: bold;">PENDING</span></li>
+        </ul>
+    </div>
+    
+    <p>Please review their LinkedIn profile to verify their employment details.</p>
+    """)
+
+def render_admin_recruiter_alert(recruiter_name: str, recruiter_email: str, linkedin_url: str) -> str:
+    body = ADMIN_RECRUITER_ALERT_BODY.render(recruiter_name=recruiter_name, recruiter_email=recruiter_email,
+                                             linkedin_url=linkedin_url)
+    return get_base_email_template("⚠️ Action Required: Verify Recruiter", body,
+                                   "Open Admin Dashboard", "https://truthhire.in/admin/recruiters")
+
+WELCOME_BODY = compile_template("welcome", """
+    <p>Hi {{ name }},</p>
+    <p>Your account has been successfully created. You now have access to India's first AI-powered platform designed to eliminate ghost jobs.</p>
+    
+    <div class="info-box">
+        <p style="margin: 0 0 12px; font-weight: 600; color: #1f2937;">Your Next Steps:</p>
+        <ol style="margin: 0; padding-left: 20px; color: #4b5563;">
+            <li style="margin-bottom: 8px;">Complete your profile to rank higher.</li>
+            <li style="margin-bottom: 8px;">Upload your resume for AI gap analysis.</li>
+            <li>Apply to "Verified" jobs with one click.</li>
+        </ol>
+    </div>
+    
+    <p>"The best way to predict the future is to create it." Let's get you hired.</p>
+    """)
+
+def render_welcome_email(name: str) -> str:
+    return get_base_email_template(f"Welcome, {name}! 🎉", WELCOME_BODY.render(name=name),
+                                   "Log In to Dashboard", "https://truthhire.in/login")
+
+OTP_BODY = compile_template("otp", """
+    <p>Hi {{ name }},</p>
+    <p>You requested to sign in to your TruthHire account. Use the verification code below to complete your login:</p>
+    
+    <div style="text-align: center; margin: 32px 0;">
+        <div style="display: inline-block; background: linear-gradient(135deg, #2563eb 0%, #4f46e5 100%); padding: 20px 40px; border-radius: 12px; box-shadow: 0 4px 20px rgba(37, 99, 235, 0.3);">
+            <p style="margin: 0; font-size: 32px; font-weight: 800; color: #ffffff; letter-spacing: 8px; font-family: 'Courier New', monospace;">{{ otp }}</p>
+        </div>
+    </div>
+    
+    <div style="background-color: #fef3c7; border-left: 4px solid #f59e0b; padding: 16px; border-radius: 8px; margin: 24px 0;">
+        <p style="margin: 0; font-size: 14px; color: #92400e; font-weight: 600;">⚠️ Security Notice</p>
+        <p style="margin: 4px 0 0; font-size: 13px; color: #b45309;">This code expires in 5 minutes. Never share this code with anyone.</p>
+    </div>
+    
+    <p style="font-size: 14px; color: #6b7280;">If you didn't request this code, please ignore this email or contact our support team.</p>
+    """)
+
+def render_otp_email(otp: str, name: str) -> str:
+    return get_base_email_template("Your Login Code", OTP_BODY.render(otp=otp, name=name))
+
+RECRUITER_OTP_BODY = compile_template("recruiter_otp", """
+    <p>Hi {{ name }},</p>
+    <p>You are setting up a recruiter account on <strong>TruthHire</strong>. To verify your corporate identity, please use the code below.</p>
+    
+    <div style="text-align: center; margin: 32px 0;">
+        <div style="display: inline-block; background-color: #f3f4f6; border: 1px solid #d1d5db; padding: 20px 40px; border-radius: 8px;">
+            <p style="margin: 0; font-size: 32px; font-weight: 700; color: #111827; letter-spacing: 6px; font-family: monospace;">{{ otp }}</p>
+        </div>
+    </div>
+    
+    <div style="background-color: #eff6ff; border-left: 4px solid #3b82f6; padding: 16px; border-radius: 4px; margin: 24px 0;">
+        <p style="margin: 0 0 4px; font-size: 14px; font-weight: 700; color: #1e40af;">🛡️ Security Check</p>
+        <p style="margin: 0; font-size: 14px; color: #1e3a8a;">
+            We use this step to ensure only verified employees from <strong>{{ domain }}</strong> can post jobs on TruthHire.
+        </p>
+    </div>
+    
+    <p style="font-size: 13px; color: #6b7280; margin-top: 24px;">
+        If you didn't request this code, please ignore this email. This code expires in 5 minutes.
+    </p>
+    """)
+
+def render_recruiter_otp_email(email: str, otp: str, name: str) -> str:
+    body = RECRUITER_OTP_BODY.render(otp=otp, name=name, domain=email.split('@')[1])
+    return get_base_email_template("Verify Your Corporate Account", body)
+
+LOGIN_SUCCESS_BODY = compile_template("login_success", """
+    <p>Hi {{ name }},</p>
+    <p>Your account was successfully accessed. Welcome back to TruthHire!</p>
+    
+    <div style="background-color: #f0fdf4; border-left: 4px solid #10b981; padding: 16px; border-radius: 8px; margin: 24px 0;">
+        <p style="margin: 0; font-size: 14px; color: #065f46; font-weight: 600;">✓ Login Successful</p>
+        <p style="margin: 4px 0 0; font-size: 13px; color: #047857;">Time: {{ time }}</p>
+    </div>
+    
+    <p style="font-size: 14px; color: #6b7280;">If this wasn't you, please secure your account immediately by changing your password.</p>
+    """)
+
+def render_login_success_email(name: str) -> str:
+    body = LOGIN_SUCCESS_BODY.render(name=name, time=datetime.now().strftime('%B %d, %Y at %I:%M %p'))
+    return get_base_email_template("Login Successful", body, "Go to Dashboard", "https://truthhire.in/dashboard")
+
+RESET_SUCCESS_BODY = compile_template("reset_success", """
+    <p>Hi {{ name }},</p>
+    <p>Your password has been successfully reset.</p>
+    
+    <div style="background-color: #f0fdf4; border-left: 4px solid #10b981; padding: 16px; border-radius: 8px; margin: 24px 0;">
+        <p style="margin: 0; font-size: 14px; color: #065f46; font-weight: 600;">✓ Security Update</p>
+        <p style="margin: 4px 0 0; font-size: 13px; color: #047857;">If you did not make this change, please contact support immediately.</p>
+    </div>
+    
+    <p style="font-size: 14px; color: #6b7280;">You can now log in with your new password.</p>
+    """)
+
+def render_reset_success_email(name: str) -> str:
+    return get_base_email_template("Password Changed", RESET_SUCCESS_BODY.render(name=name),
+                                   "Login Now", "https://truthhire.in/login")
+
+WAITLIST_BODY = compile_template("waitlist", """
+    <p>Hi there,</p>
+    <p>Thanks for your interest in <strong>{{ category }}</strong> jobs on TruthHire.</p>
+    <p>You have been added to our priority waitlist. We are currently verifying top employers in this sector to ensure you only see legitimate, high-quality opportunities.</p>
+    
+    <div style="background-color: #f0fdf4; border: 1px solid #bbf7d0; border-radius: 8px; padding: 20px; margin: 24px 0; text-align: center;">
+        <p style="margin: 0; font-size: 24px; font-weight: 800; color: #166534;">#{{ position }}</p>
+        <p style="margin: 4px 0 0; font-size: 13px; color: #15803d; font-weight: 600;">Your Priority Queue Position</p>
+    </div>
+    
+    <p>We will notify you as soon as the first batch of verified jobs goes live.</p>
+    """)
+
+def render_waitlist_confirmation_email(category: str, position: int) -> str:
+    return get_base_email_template(f"You are #{position} on the list!",
+                                   WAITLIST_BODY.render(category=category, position=position))
+
+RECRUITER_PENDING_BODY = compile_template("recruiter_pending", """
+        <p>Hi {{ name }},</p>
+        <p>Thank you for joining TruthHire. Since you signed up using a public email domain (Gmail/Yahoo), your account has been placed in our <strong>Trust & Safety Queue</strong>.</p>
+        
+        <div style="background-color: #fff7ed; border: 1px solid #ffedd5; border-radius: 8px; padding: 20px; margin: 24px 0;">
+            <h3 style="margin: 0 0 12px; font-size: 16px; color: #9a3412;">What happens next?</h3>
+            <ul style="margin: 0; padding-left: 20px; color: #7c2d12;">
+                <li style="margin-bottom: 8px;">Our team will review your LinkedIn profile to verify your employment.</li>
+                <li style="margin-bottom: 8px;">This process typically takes <strong>2-4 hours</strong> during business days.</li>
+                <li>You will receive an email immediately once approved.</li>
+            </ul>
+        </div>
+        
+        <p style="font-size: 14px; color: #6b7280;">While you wait, you can still log in and draft job posts, but they will not go live until verified.</p>
+        """)
+
+RECRUITER_VERIFIED_BODY = compile_template("recruiter_verified", """
+        <p>Hi {{ name }},</p>
+        <p>Great news! Your identity has been verified. You now have full access to TruthHire's recruitment suite.</p>
+        
+        <div style="margin: 24px 0;">
+            <p style="margin-bottom: 8px;"><strong>🚀 You can now:</strong></p>
+            <ul style="margin: 0; padding-left: 20px; color: #374151;">
+                <li style="margin-bottom: 6px;">Post unlimited "Verified" jobs.</li>
+                <li style="margin-bottom: 6px;">Access candidate contact details.</li>
+                <li>Use AI to rank applicants automatically.</li>
+            </ul>
+        </div>
+        """)
+
+RECRUITER_REJECTED_BODY = compile_template("recruiter_rejected", """
+        <p>Hi {{ name }},</p>
+        <p>We verified your profile but could not confirm your employment details based on the information provided.</p>
+        
+        <div style="background-color: #fef2f2; border-left: 4px solid #ef4444; padding: 16px; border-radius: 4px; margin: 24px 0;">
+            <p style="margin: 0; font-size: 14px; font-weight: 700; color: #991b1b;">Why?</p>
+            <p style="margin: 4px 0 0; font-size: 14px; color: #b91c1c;">
+                We require a LinkedIn profile that clearly matches the company name used during signup to prevent fraud.
+            </p>
+        </div>
+        
+        <p>If you believe this is a mistake, please reply to this email with your official ID card or an offer letter.</p>
+        """)
+
+# status -> (subject, headline, body, cta_text, cta_link)
+RECRUITER_STATUS_EMAILS = {
+    "pending": ("Action Required: Account Verification Pending", "Verification in Progress ⏳", RECRUITER_PENDING_BODY,
+                "Login to Dashboard", "https://truthhire.in/recruiter/login"),
+    "verified": ("Welcome! Your Recruiter Account is Verified", "You are Verified! ✅", RECRUITER_VERIFIED_BODY,
+                 "Post Your First Job", "https://truthhire.in/recruiter/dashboard"),
+    "rejected": ("Update on your TruthHire Account", "Verification Unsuccessful", RECRUITER_REJECTED_BODY, None, None),
+}
+
+def render_recruiter_status_email(name: str, status: str) -> tuple:
+    """(subject, html); an unknown status gets an empty email, as before."""
+    if status not in RECRUITER_STATUS_EMAILS:
+        return "", get_base_email_template("", "")
+    subject, headline, body, cta_text, cta_link = RECRUITER_STATUS_EMAILS[status]
+    return subject, get_base_email_template(headline, body.render(name=name), cta_text, cta_link)
+
+# --- Application status update (company-branded, sent on behalf of the recruiter) ---
+
+CANDIDATE_SHORTLISTED_BODY = compile_template("candidate_shortlisted", """
+        <p>Dear {{ candidate_name }},</p>
+        <p>We are pleased to inform you that your application for the <strong>{{ job_title }}</strong> position at <strong>{{ company_name }}</strong> has been shortlisted.</p>
+        <p>Our hiring team was impressed with your profile and we would like to move forward to the next stage of our selection process.</p>
+        
+        <div style="background-color: #f0fdf4; border-left: 4px solid #16a34a; padding: 16px; border-radius: 4px; margin: 24px 0;">
+            <p style="margin: 0; font-size: 14px; font-weight: 700; color: #166534;">What happens next?</p>
+            <p style="margin: 4px 0 0; font-size: 14px; color: #14532d;">
+                Our team will contact you shortly (via email or phone) to schedule an interview or share an assignment. Please keep an eye on your inbox.
+            </p>
+        </div>
+        
+        <p>In the meantime, feel free and practice for your upcoming interview or assignment.</p>
+        """)
+
+CANDIDATE_REJECTED_BODY = compile_template("candidate_rejected", """
+        <p>Dear {{ candidate_name }},</p>
+        <p>Thank you for giving us the opportunity to review your application for the <strong>{{ job_title }}</strong> role at {{ company_name }}.</p>
+        <p>After careful consideration, we regret to inform you that we will not be moving forward with your application at this time. We received many qualified applicants, making this a difficult decision.</p>
+        <p>We will keep your resume in our talent pool and reach out if a role better suited to your skills opens up in the future.</p>
+        {{ feedback_block|raw }}<p>We wish you the very best in your job search.</p>""")
+
+CANDIDATE_FEEDBACK_BLOCK = compile_template("candidate_feedback", """
+            <div style="margin-top: 24px; padding: 20px; background-color: #f8fafc; border-left: 4px solid {{ accent_color }}; border-radius: 4px;">
+                <p style="margin: 0 0 8px; font-size: 11px; font-weight: 700; color: #64748b; text-transform: uppercase; letter-spacing: 1px;">Feedback from Hiring Team</p>
+                <p style="margin: 0; font-style: italic; color: #334155; line-height: 1.6;">"{{ feedback }}"</p>
+            </div>
+            """)
+
+CANDIDATE_UPDATE_LAYOUT = compile_template("candidate_update", """
+    <!DOCTYPE html>
+    <html>
+    <body style="margin: 0; padding: 0; font-family: 'Segoe UI', Helvetica, Arial, sans-serif; background-color: #f4f4f5;">
+        <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #f4f4f5; padding: 40px 0;">
+            <tr>
+                <td align="center">
+                    <table width="600" cellpadding="0" cellspacing="0" style="background-color: #ffffff; border-radius: 8px; overflow: hidden; box-shadow: 0 4px 6px rgba(0,0,0,0.05);">
+                        <tr><td style="height: 6px; background-color: {{ accent_color }};"></td></tr>
+                        
+                        <tr><td style="padding: 40px 40px 20px 40px; text-align: center; border-bottom: 1px solid #f0f0f0;">
+                            <h2 style="margin: 0; color: #1e293b; font-size: 24px; font-weight: 700;">{{ company_name }}</h2>
+                            <p style="margin: 8px 0 0; color: {{ accent_color }}; font-size: 14px; font-weight: 600; text-transform: uppercase; letter-spacing: 1px;">{{ headline }}</p>
+                        </td></tr>
+                        
+                        <tr><td style="padding: 40px; color: #334155; font-size: 16px; line-height: 1.6;">
+                            {{ email_content|raw }}
+                            
+                            <div style="text-align: center; margin-top: 32px;">
+                                <a href="{{ cta_link }}" style="display: inline-block; background-color: {{ accent_color }}; color: #ffffff; padding: 12px 24px; border-radius: 6px; text-decoration: none; font-weight: 600; font-size: 14px;">{{ cta_text }}</a>
+                            </div>
+                        </td></tr>
+                        
+                        <tr><td style="padding: 0 40px 40px 40px;">
+                            <p style="margin: 0; font-weight: 600; color: #1e293b;">{{ hr_name }}</p>
+                            <p style="margin: 0; color: #64748b; font-size: 14px;">Talent Acquisition Team</p>
+                        </td></tr>
+                        
+                        <tr><td style="background-color: #f8fafc; padding: 20px; text-align: center; border-top: 1px solid #f0f0f0;">
+                            <p style="margin: 0; color: #94a3b8; font-size: 12px;">
+                                &copy; {{ year }} {{ company_name }} via TruthHire.
+                            </p>
+                        </td></tr>
+                    </table>
+                </td>
+            </tr>
+        </table>
+    </body>
+    </html>
+    """)
+
+def render_candidate_update_email(candidate_name: str, job_title: str, company_name: str, hr_name: str,
+                                  status: str, feedback: str = None) -> tuple:
+    """(subject, html) for a shortlisted / rejected application. `feedback` is the recruiter's note."""
+    context = {"candidate_name": candidate_name, "job_title": job_title, "company_name": company_name}
+    if status == "shortlisted":
+        subject = f"Great News: You've been shortlisted for {job_title}"
+        accent_color, headline = "#16A34A", "Congratulations! 🎉"  # Green
+        email_content = CANDIDATE_SHORTLISTED_BODY.render(**context)
+        cta_text, cta_link = "View Application Status", "https://truthhire.in/my-applications"
+    else:  # status == 'rejected'
+        subject = f"Update on your application for {job_title}"
+        accent_color, headline = "#64748B", "Application Status"  # Slate Grey
+        feedback_block = CANDIDATE_FEEDBACK_BLOCK.render(accent_color=accent_color, feedback=feedback) if feedback else ""
+        email_content = CANDIDATE_REJECTED_BODY.render(feedback_block=feedback_block, **context)
+        cta_text, cta_link = "Browse Other Jobs", "https://truthhire.in/jobs"
+
+    html_body = CANDIDATE_UPDATE_LAYOUT.render(
+        accent_color=accent_color, company_name=company_name, headline=headline, email_content=email_content,
+        cta_text=cta_text, cta_link=cta_link, hr_name=hr_name, year=datetime.now().year,
+    )
+    return subject, html_body
+
+# --- Application confirmation (to the candidate) ---
+
+CANDIDATE_CONFIRMATION_LAYOUT = compile_template("candidate_confirmation", """
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="utf-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Application Submitted</title>
+        <style>
+            body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; background-color: #f3f4f6; margin: 0; padding: 0; color: #1f2937; }
+            .container { max-width: 600px; margin: 0 auto; background-color: #ffffff; }
+            .header { padding: 24px; border-bottom: 1px solid #e5e7eb; text-align: left; }
+            .logo { font-size: 20px; font-weight: 800; color: #111827; letter-spacing: -0.5px; text-decoration: none; }
+            .logo span { color: #2563eb; }
+            .content { padding: 40px 24px; }
+            .job-card { border: 1px solid #e5e7eb; border-radius: 8px; padding: 20px; margin: 24px 0; background-color: #ffffff; display: flex; align-items: center; }
+            .company-logo { width: 48px; height: 48px; background-color: #f3f4f6; border-radius: 8px; display: flex; align-items: center; justify-content: center; font-size: 20px; font-weight: bold; color: #6b7280; margin-right: 16px; }
+            .btn { display: inline-block; background-color: #2563eb; color: #111827; padding: 12px 24px; border-radius: 6px; text-decoration: none; font-weight: 600; font-size: 14px; margin-top: 24px; }
+            .footer { background-color: #f9fafb; padding: 24px; text-align: center; font-size: 12px; color: #6b7280; border-top: 1px solid #e5e7eb; }
+            .link { color: #2563eb; text-decoration: none; }
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <a href="https://truthhire.in" class="logo">TruthHire<span>.</span></a>
+            </div>
+
+            <div class="content">
+                <h1 style="margin: 0 0 16px; font-size: 24px; color: #111827;">Application submitted!</h1>
+                <p style="margin: 0; font-size: 16px; line-height: 1.6; color: #4b5563;">
+                    Good news, {{ candidate_name }}. Your application for <strong>{{ job_title }}</strong> was successfully sent to the hiring team at <strong>{{ company_name }}</strong>.
+                </p>
+
+                <table width="100%" cellpadding="0" cellspacing="0" style="margin: 24px 0; border: 1px solid #e5e7eb; border-radius: 12px; overflow: hidden;">
+                    <tr>
+                        <td style="padding: 20px; background-color: #ffffff;">
+                            <table width="100%" cellpadding="0" cellspacing="0">
+                                <tr>
+                                    <td width="60" valign="middle">
+                                        <div style="width: 48px; height: 48px; background-color: #f3f4f6; border-radius: 8px; color: #6b7280; font-size: 20px; font-weight: bold; line-height: 48px; text-align: center;">
+                                            {{ company_initial }}
+                                        </div>
+                                    </td>
+                                    <td valign="middle">
+                                        <h3 style="margin: 0 0 4px; font-size: 16px; font-weight: 600; color: #111827;">{{ job_title }}</h3>
+                                        <p style="margin: 0; font-size: 14px; color: #6b7280;">{{ company_name }}</p>
+                                    </td>
+                                </tr>
+                            </table>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 12px 20px; background-color: #f9fafb; border-top: 1px solid #e5e7eb;">
+                            <p style="margin: 0; font-size: 13px; color: #6b7280;">
+                                <span style="color: #10b981; font-weight: 600;">✓ Sent</span> via TruthHire Easy Apply
+                            </p>
+                        </td>
+                    </tr>
+                </table>
+
+                <p style="margin: 0; font-size: 14px; color: #4b5563;">
+                    We will notify you if the recruiter views your application or shortlists you. Good luck!
+                </p>
+
+                <div style="text-align: center;">
+                    <a href="https://truthhire.in/jobs" class="btn">Browse Similar Jobs</a>
+                </div>
+            </div>
+
+            <div class="footer">
+                <p style="margin-bottom: 12px;">
+                    &copy; {{ year }} TruthHire Inc. &middot; Pune, Maharashtra, India
+                </p>
+                <p>
+                    You received this email because you applied to a job on TruthHire.
+                    <br>
+                    <a href="#" class="link">Job Seeker Support</a> &middot; <a href="#" class="link">Privacy Policy</a>
+                </p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """)
+
+def render_candidate_confirmation_email(candidate_name: str, job_title: str, company_name: str) -> str:
+    return CANDIDATE_CONFIRMATION_LAYOUT.render(
+        candidate_name=candidate_name, job_title=job_title, company_name=company_name,
+        company_initial=company_name[0].upper() if company_name else "C", year=datetime.now().year,
+    )
+
+# ===========================
+# 📢 MARKETING NUDGES (subject, html)
+# ===========================
+
+PROFILE_NUDGE_BODY = compile_template("profile_nudge", """
+    <p>Hi {{ name }},</p>
+    <p>We noticed you started setting up your profile on TruthHire but didn't finish. <strong>Recruiters search by skills and resumes</strong>, not just names.</p>
+
+    <div style="background-color: #fff1f2; border-left: 4px solid #f43f5e; padding: 16px; border-radius: 4px; margin: 24px 0;">
+        <p style="margin: 0 0 8px; font-size: 14px; font-weight: 700; color: #9f1239;">⚠️ Missing Information</p>
+        <p style="margin: 0; font-size: 14px; color: #881337;">
+            You are missing: <strong>{{ missing }}</strong>.
+        </p>
+    </div>
+
+    <p>Profiles with a resume and skills get <strong>5x more visibility</strong> and higher trust scores.</p>
+    """)
+
+TRUTH_SCORE_NUDGE_BODY = compile_template("truth_score_nudge", """
+    <p>Hi {{ name }},</p>
+    <p>We noticed you haven't checked your <strong>Truth Score</strong> yet. Applying to jobs without knowing if you match is the #1 reason candidates get rejected.</p>
+
+    <div style="background-color: #eff6ff; border: 1px solid #bfdbfe; border-radius: 8px; padding: 20px; margin: 24px 0; text-align: center;">
+        <p style="margin: 0 0 8px; font-size: 18px; font-weight: 700; color: #1e3a8a;">Your Truth Score: <span style="color: #9ca3af;">Pending...</span></p>
+        <p style="margin: 0; font-size: 13px; color: #1e40af;">
+            Upload your resume against any job description to see your % chance of hiring instantly.
+        </p>
+    </div>
+
+    <p>It takes 10 seconds and prevents "Ghost Jobs."</p>
+    """)
+
+def render_profile_completion_reminder(name: str, missing_fields: list) -> tuple:
+    name = name or "there"
+    subject = f"Recruiters are searching, but they can't find you, {name.split()[0]}"
+    body = PROFILE_NUDGE_BODY.render(name=name, missing=", ".join(missing_fields).title())
+    return subject, get_base_email_template("Your profile is getting invisible 👻", body,
+                                            "Complete Profile Now", "https://truthhire.in/dashboard/profile")
+
+def render_truth_score_nudge(name: str) -> tuple:
+    body = TRUTH_SCORE_NUDGE_BODY.render(name=name or "there")
+    return ("Why you might be getting ghosted (and how to fix it)",
+            get_base_email_template("Stop Applying Blindly 🛑", body, "Check My Score", "https://truthhire.in/jobs"))
+
+# ===========================
+# 📧 DAILY JOB ALERT DIGEST
+# ===========================
+
+SKILL_BADGE = compile_template("skill_badge", '<span style="display:inline-block; background-color:#f0f9ff; color:#0369a1; font-size:11px; padding:3px 8px; border-radius:4px; margin-right:5px; border:1px solid #bae6fd;">{{ skill }}</span>')
+
+DIGEST_JOB_CARD = compile_template("digest_job_card", """
+        <table width="100%" cellpadding="0" cellspacing="0" style="background-color:#ffffff; border:1px solid #e5e7eb; border-radius:8px; margin-bottom:16px; border-collapse:separate;">
+            <tr>
+                <td style="padding:20px;">
+                    <table width="100%" cellpadding="0" cellspacing="0">
+                        <tr>
+                            <td width="50" valign="top" style="padding-right:15px;">
+                                <div style="width:40px; height:40px; background-color:#f3f4f6; border-radius:6px; color:#6b7280; font-size:18px; font-weight:bold; line-height:40px; text-align:center;">
+                                    {{ company_initial }}
+                                </div>
+                            </td>
+                            <td valign="top">
+                                <h3 style="margin:0 0 4px 0; font-size:16px; font-weight:600; line-height:1.3;">
+                                    <a href="{{ apply_link }}" style="color:#2563eb; text-decoration:none;">{{ title }}</a>
+                                </h3>
+                                <p style="margin:0 0 8px 0; font-size:13px; color:#374151;">
+                                    <strong>{{ company }}</strong> &bull; <span style="color:#6b7280;">{{ location }}</span>
+                                </p>
+
+                                <div style="margin-bottom:12px;">
+                                    <span style="display:inline-block; font-size:12px; color:#4b5563; background-color:#f9fafb; padding:2px 6px; border-radius:4px; border:1px solid #e5e7eb; margin-right:5px;">
+                                        💰 {{ salary }}
+                                    </span>
+                                </div>
+                                <div style="margin-bottom:15px;">
+                                    {{ skill_badges|raw }}
+                                </div>
+                            </td>
+                        </tr>
+                        <tr>
+                            <td colspan="2" style="padding-top:10px; border-top:1px dashed #e5e7eb; text-align:right;">
+                                <a href="{{ apply_link }}" style="display:inline-block; background-color:#2563eb; color:#ffffff; font-size:13px; font-weight:600; padding:8px 20px; border-radius:4px; text-decoration:none;">View Job</a>
+                            </td>
+                        </tr>
+                    </table>
+                </td>
+            </tr>
+        </table>
+        """)
+
+DIGEST_LAYOUT = compile_template("digest", """
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="utf-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Daily Job Alerts</title>
+        <style type="text/css">
+            body { margin: 0; padding: 0; font-family: 'Segoe UI', Helvetica, Arial, sans-serif; background-color: #f3f4f6; color: #1f2937; }
+            a { color: #2563eb; text-decoration: none; }
+            .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+            .header { text-align: center; padding: 20px 0; }
+            .footer { text-align: center; padding: 20px 0; font-size: 12px; color: #9ca3af; }
+            .btn-primary { background-color: #2563eb; color: #ffffff; padding: 10px 20px; border-radius: 6px; font-weight: 600; text-decoration: none; }
+        </style>
+    </head>
+    <body style="background-color: #f3f4f6;">
+        <div class="container">
+
+            <div class="header">
+                <table width="100%" cellpadding="0" cellspacing="0">
+                    <tr>
+                        <td align="center">
+                            <span style="font-size: 22px; font-weight: 800; color: #111827; letter-spacing: -0.5px;">TruthHire<span style="color: #2563eb;">.</span></span>
+                        </td>
+                    </tr>
+                </table>
+            </div>
+
+            <div style="background-color: #ffffff; padding: 24px; border-radius: 8px; border: 1px solid #e5e7eb; margin-bottom: 20px; text-align: center;">
+                <h2 style="margin: 0 0 8px 0; font-size: 18px; color: #111827;">Jobs for you, {{ user_name }}</h2>
+                <p style="margin: 0; font-size: 14px; color: #6b7280;">
+                    We found <strong>{{ job_count }} new jobs</strong> matching your preferences based on your profile and activity.
+                </p>
+            </div>
+
+            {{ job_cards_html|raw }}
+
+            <div style="text-align: center; margin: 30px 0;">
+                <a href="http://localhost:3000/jobs" style="background-color: #111827; color: #ffffff; padding: 12px 24px; border-radius: 6px; font-weight: 600; font-size: 14px; text-decoration: none; display: inline-block;">
+                    See all matching jobs
+                </a>
+            </div>
+
+            <div class="footer">
+                <p style="margin-bottom: 10px;">
+                    <strong>Why am I getting this?</strong><br>
+                    You have job alerts enabled for your profile on TruthHire.
+                </p>
+                <p>
+                    <a href="#" style="color: #6b7280; text-decoration: underline;">Update Preferences</a> &bull;
+                    <a href="#" style="color: #6b7280; text-decoration: underline;">Unsubscribe</a>
+                </p>
+                <p style="margin-top: 20px;">&copy; 2026 TruthHire Inc. Pune, India.</p>
+            </div>
+
+        </div>
+    </body>
+    </html>
+    """)
+
+def render_job_card(job: dict) -> str:
+    """One digest card. The same job goes to many users, so callers may cache this per job id."""
+    company = job.get('company')
+    skills = [s.strip().title() for s in (job.get('skills') or '').split(',')[:3] if s.strip()]
+    return DIGEST_JOB_CARD.render(
+        company_initial=company[0].upper() if company else "C",
+        apply_link=f"http://localhost:3000/jobs/{job.get('id')}",
+        title=job.get('title'),
+        company=company,
+        location=job.get('location'),
+        salary=job.get('salary', 'Not disclosed'),
+        skill_badges="".join(SKILL_BADGE.render(skill=s) for s in skills),
+    )
+
+def generate_daily_jobs_email(user_name, jobs, card_cache: dict = None):
+    """
+    Generates a LinkedIn/Indeed-style Professional Job Alert Email.
+    Features: Card layout, Skill badges, clear CTAs, and responsive design.
+    Pass a dict as `card_cache` when rendering a batch so each job's card is rendered once.
+    """
+    cards = []
+    for job in jobs:
+        if card_cache is None:
+            cards.append(render_job_card(job))
+            continue
+        key = job.get('id')
+        card = card_cache.get(key)
+        if card is None:
+            card = card_cache[key] = render_job_card(job)
+        cards.append(card)
+    return DIGEST_LAYOUT.render(user_name=user_name, job_count=len(jobs), job_cards_html="".join(cards))
+
+# ===========================
+# ⏱️ BENCHMARK
+# ===========================
+
+def _bench(count: int):
+    jobs = [
+        {"id": i, "title": f"Backend Engineer {i}", "company": f"Company {i % 40}", "location": "Pune",
+         "salary": "₹12-18 LPA", "skills": "python, fastapi, postgres, docker"}
+        for i in range(200)
+    ]
+    for label, cache in (("cold", None), ("card cache", {})):
+        started = time.perf_counter()
+        total_bytes = 0
+        for n in range(count):
+            picks = [jobs[(n * 7 + k) % len(jobs)] for k in range(10)]
+            total_bytes += len(generate_daily_jobs_email(f"User {n}", picks, card_cache=cache))
+        elapsed = time.perf_counter() - started
+        print(f"📊 {label:>10}: {count} digests (10 jobs each) in {elapsed:.2f}s "
+              f"-> {count / elapsed:,.0f} emails/sec, avg {total_bytes // count:,} bytes")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        _bench(int(sys.argv[2]) if len(sys.argv) > 2 else 5000)
+    else:
+        print("Usage: python -m backend.email_templates bench [count]")
@@ -0,0 +1,168 @@
+# backend/http_client.py
+# One shared async HTTP client for outbound calls (Google userinfo, job URL fetching).
+#
+# - keep-alive pool: repeat calls to the same host skip the TCP + TLS handshake
+# - connect/read timeouts on every request (the old requests.get to Google had none)
+# - GETs are retried on connection errors, timeouts and 502/503/504 with backoff
+# - bodies are streamed and aborted once they pass max_bytes
+#
+# The client is opened/closed by the FastAPI lifespan (start_http_client / close_http_client).
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import httpx
+
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+HTTP_RETRIES = 2
+RETRY_STATUSES = {502, 503, 504}
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v3/userinfo"
+GOOGLE_TOKENINFO_URL = "https://oauth2.googleapis.com/tokeninfo"
+# Used when Google doesn't tell us how long the token has left
+GOOGLE_USERINFO_FALLBACK_TTL = 60
+GOOGLE_USERINFO_CACHE_SIZE = int(os.getenv("GOOGLE_USERINFO_CACHE_SIZE", "5000"))
+
+class ResponseTooLarge(Exception):
+    pass
+
+class FetchedResponse:
+    def __init__(self, status_code: int, headers: httpx.Headers, content: bytes, url: str, encoding: Optional[str]):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+_client: Optional[httpx.AsyncClient] = None
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        limits=HTTP_LIMITS,
+        follow_redirects=True,
+        max_redirects=5,
+    )
+
+async def start_http_client():
+    global _client
+    if _client is None:
+        _client = _new_client()
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        # Outside the app lifespan (scripts, tests): open lazily
+        _client = _new_client()
+    return _client
+
+async def fetch(url: str, headers: dict = None, params: dict = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                retries: int = HTTP_RETRIES) -> FetchedResponse:
+    """GET with retries and a hard cap on the body size. Raises ResponseTooLarge / httpx errors."""
+    client = get_http_client()
+    for attempt in range(retries + 1):
+        try:
+            async with client.stream("GET", url, headers=headers, params=params) as response:
+                if response.status_code in RETRY_STATUSES and attempt < retries:
+                    await asyncio.sleep(0.25 * 2 ** attempt)
+                    continue
+
+                declared = response.headers.get("content-length")
+                if declared and declared.isdigit() and int(declared) > max_bytes:
+                    raise ResponseTooLarge(f"Response is {declared} bytes (limit {max_bytes})")
+
+                chunks, size = [], 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ResponseTooLarge(f"Response exceeded {max_bytes} bytes")
+                    chunks.append(chunk)
+                return FetchedResponse(response.status_code, response.headers, b"".join(chunks),
+                                       str(response.url), response.charset_encoding)
+        except (httpx.TimeoutException, httpx.TransportError):
+            if attempt >= retries:
+                raise
+            await asyncio.sleep(0.25 * 2 ** attempt)
+
+# ===========================
+# 🔑 GOOGLE USERINFO (cached per access token)
+# ===========================
+
+class _TTLCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if not item:
+                return None
+            if item[0] <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key, value, ttl: float):
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+_userinfo_cache = _TTLCache(GOOGLE_USERINFO_CACHE_SIZE)
+
+async def get_google_userinfo(access_token: str) -> Optional[dict]:
+    """
+    Returns Google's userinfo for an access token, or None if Google rejects it.
+    userinfo and tokeninfo are fetched in parallel on a miss; the result is cached until the
+    token's own expiry (tokeninfo's expires_in), so repeat logins with the same token are free.
+    """
+    key = hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+    cached = _userinfo_cache.get(key)
+    if cached:
+        return cached
+
+    auth = {"Authorization": f"Bearer {access_token}"}
+    userinfo, tokeninfo = await asyncio.gather(
+        fetch(GOOGLE_USERINFO_URL, headers=auth, max_bytes=64 * 1024),
+        fetch(GOOGLE_TOKENINFO_URL, params={"access_token": access_token}, max_bytes=64 * 1024),
+        return_exceptions=True,
+    )
+    if isinstance(userinfo, Exception):
+        raise userinfo
+    if userinfo.status_code != 200:
+        return None
+
+    ttl = GOOGLE_USERINFO_FALLBACK_TTL
+    if not isinstance(tokeninfo, Exception) and tokeninfo.status_code == 200:
+        try:
+            ttl = int(tokeninfo.json().get("expires_in", ttl))
+        except (ValueError, TypeError):
+            pass
+
+    data = userinfo.json()
+    if ttl > 0:
+        _userinfo_cache.put(key, data, ttl)
+    return data
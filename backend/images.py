@@ -0,0 +1,119 @@
+# backend/images.py
+# Profile image pipeline: validate -> strip metadata -> square thumbnails -> content-addressed storage.
+#
+# Uploads used to be stored as-is (camera originals of several MB, EXIF/GPS included) and downloaded
+# full-size for 40px avatars. Now the upload is decoded with Pillow (which also rejects non-images,
+# truncated files and decompression bombs), rotated per its EXIF orientation, cropped square and
+# re-encoded at PROFILE_IMAGE_SIZES as WebP, plus one JPEG fallback. Re-encoding drops all metadata.
+# The original is never stored.
+#
+# Variant keys derive from the upload's sha256 ("<sha[:2]>/<sha>-<size>.webp"), so they never change
+# once written: they are stored with an immutable cache-control, and re-uploading the same picture
+# stores nothing new.
+import asyncio
+import io
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from PIL import Image, ImageOps
+from starlette.concurrency import run_in_threadpool
+from backend.storage import storage, PROFILE_IMAGE_BUCKET
+from backend.uploads import ReceivedUpload
+
+PROFILE_IMAGE_SIZES = tuple(int(s) for s in os.getenv("PROFILE_IMAGE_SIZES", "64,128,256").split(","))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000)))  # ~ a 48MP phone photo
+ALLOWED_IMAGE_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+class InvalidImage(ValueError):
+    pass
+
+@dataclass
+class ImageVariant:
+    size: int
+    extension: str
+    content_type: str
+    data: bytes
+
+def variant_key(sha256: str, size: int, extension: str) -> str:
+    return f"{sha256[:2]}/{sha256}-{size}.{extension}"
+
+# ===========================
+# 🖼️ PROCESSING (blocking; call it in a threadpool)
+# ===========================
+
+def _open(content: bytes) -> Image.Image:
+    try:
+        image = Image.open(io.BytesIO(content))
+        if image.format not in ALLOWED_IMAGE_FORMATS:
+            raise InvalidImage(f"Unsupported image format: {image.format}")
+        # The header is enough to refuse oversized images before decoding any pixels
+        if image.width * image.height > IMAGE_MAX_PIXELS:
+            raise InvalidImage("Image dimensions are too large")
+        # JPEG can decode straight at 1/2, 1/4 or 1/8 scale; far cheaper than decoding then resizing
+        image.draft("RGB", (max(PROFILE_IMAGE_SIZES), max(PROFILE_IMAGE_SIZES)))
+        image.load()
+    except InvalidImage:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidImage("File is not a readable image") from e
+    return image
+
+def process_profile_image(content: bytes) -> List[ImageVariant]:
+    image = ImageOps.exif_transpose(_open(content))
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    variants = []
+    largest = max(PROFILE_IMAGE_SIZES)
+    square = ImageOps.fit(image, (largest, largest), Image.Resampling.LANCZOS)
+    for size in sorted(PROFILE_IMAGE_SIZES, reverse=True):
+        thumb = square if size == largest else square.resize((size, size), Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        thumb.save(out, "WEBP", quality=WEBP_QUALITY, method=4)  # no exif/icc passed -> none written
+        variants.append(ImageVariant(size, "webp", "image/webp", out.getvalue()))
+
+    # JPEG fallback at the largest size (no alpha in JPEG: flatten onto white)
+    if has_alpha:
+        flat = Image.new("RGB", square.size, (255, 255, 255))
+        flat.paste(square, mask=square.getchannel("A"))
+        square = flat
+    out = io.BytesIO()
+    square.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    variants.append(ImageVariant(largest, "jpg", "image/jpeg", out.getvalue()))
+    return variants
+
+# ===========================
+# 💾 STORE + URLS
+# ===========================
+
+async def store_profile_image(upload: ReceivedUpload) -> Dict:
+    """Processes and stores every variant; returns the reference to save on the user and the URLs."""
+    content = await run_in_threadpool(upload.read)
+    variants = await run_in_threadpool(process_profile_image, content)
+    stored = await asyncio.gather(*(
+        storage.put(PROFILE_IMAGE_BUCKET, variant_key(upload.sha256, v.size, v.extension), v.data, v.content_type)
+        for v in variants
+    ))
+    main = stored[0]  # largest WebP
+    return {
+        "reference": main.reference,
+        "urls": profile_image_urls(main.reference),
+        "bytes": {f"{v.size}.{v.extension}": len(v.data) for v in variants},
+        "original_bytes": upload.size,
+    }
+
+_VARIANT_SUFFIX = re.compile(r"-(\d+)\.webp$")
+
+def profile_image_urls(reference: Optional[str]) -> Optional[Dict[str, str]]:
+    """Size -> URL for a stored profile image (plus "jpg"); None for legacy single-file images."""
+    if not reference or not _VARIANT_SUFFIX.search(reference):
+        return None
+    url = reference if reference.startswith(("http://", "https://")) else storage.public_url(PROFILE_IMAGE_BUCKET, reference)
+    urls = {str(size): _VARIANT_SUFFIX.sub(f"-{size}.webp", url) for size in PROFILE_IMAGE_SIZES}
+    urls["jpg"] = _VARIANT_SUFFIX.sub(f"-{max(PROFILE_IMAGE_SIZES)}.jpg", url)
+    return urls
@@ -1,12 +1,9 @@
 # backend/init_db.py
-from backend.database import engine
-from backend.models import Base
-# Make sure to import all models so they are registered with Base
-import models 
+from backend.migrations import run_migrations
 
-print("⏳ Creating database tables...")
+print("⏳ Creating / migrating database tables...")
 try:
-    Base.metadata.create_all(bind=engine)
+    run_migrations()
     print("✅ Database tables created successfully.")
 except Exception as e:
-    print(f"❌ Error creating tables: {e}")
\ No newline at end of file
+    print(f"❌ Error creating tables: {e}")
@@ -0,0 +1,226 @@
+# backend/job_alerts.py
+# Daily job-alert digests.
+#
+# 1. Load the active jobs posted in the lookback window once and index them by skill and location.
+# 2. Stream users in id order, DIGEST_CHUNK_SIZE at a time (keyset pagination, only the columns needed).
+# 3. Match each user against the index (jobs newer than their last digest), render the digest with a
+#    per-run card cache, and queue it in the email outbox — one bulk INSERT per chunk. Delivery,
+#    batching and retries are the outbox workers' job (backend/email_outbox.py).
+# 4. The outbox rows, the users' last_job_digest_at and the run's cursor are written in ONE
+#    transaction per chunk, so a crashed run resumes at the next chunk without double-sending.
+#
+#   python -m backend.job_alerts          # run today's digest now (resumes an interrupted run)
+#   DAILY_JOB_ALERTS_ENABLED=true         # schedule it inside the API at DAILY_JOB_ALERTS_HOUR_UTC
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import select, update
+from backend.database import engine, dialect_insert
+from backend.email_templates import generate_daily_jobs_email
+from backend.models import DigestRun, EmailOutbox, Job, User
+from backend.skills import normalize_skills
+
+DIGEST_CHUNK_SIZE = int(os.getenv("DIGEST_CHUNK_SIZE", "500"))
+DIGEST_MAX_JOBS = 10
+DIGEST_LOOKBACK_DAYS = 7
+DIGEST_FIRST_WINDOW_HOURS = 24  # users who never had a digest get the last day's jobs
+RUN_STALE_SECONDS = 600  # a 'running' run without a heartbeat for this long is taken over
+
+_LOCATION_SPLIT = re.compile(r"[,/|;]")
+_GENERIC_LOCATIONS = {"", "india", "in", "anywhere"}
+
+# ===========================
+# 🔎 JOB INDEX
+# ===========================
+
+def _as_list(value) -> List[str]:
+    """User skills / locations are stored as a JSON list or a comma-separated string."""
+    if not value:
+        return []
+    items = value
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            items = parsed if isinstance(parsed, list) else [parsed]
+        except ValueError:
+            items = value.split(",")
+    return [str(i.get("name", "")) if isinstance(i, dict) else str(i) for i in items if i]
+
+def _skill_keys(names) -> set:
+    return {name.lower() for name in normalize_skills(names)}
+
+def _location_tokens(values) -> set:
+    tokens = set()
+    for value in values:
+        for part in _LOCATION_SPLIT.split(value or ""):
+            part = part.strip().lower()
+            if part not in _GENERIC_LOCATIONS:
+                tokens.add(part)
+    return tokens
+
+def _naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is not None and dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def _salary(job) -> str:
+    if job.salary_min and job.salary_max:
+        return f"{job.currency or 'INR'} {job.salary_min:,} - {job.salary_max:,}"
+    if job.salary_min or job.salary_max:
+        return f"{job.currency or 'INR'} {(job.salary_min or job.salary_max):,}"
+    return "Not disclosed"
+
+class JobIndex:
+    """Inverted index over the window's jobs: canonical skill -> job positions, location token -> positions."""
+
+    def __init__(self, jobs: List[dict]):
+        self.jobs = jobs
+        self.by_skill = defaultdict(list)
+        self.by_location = defaultdict(set)
+        self.remote = set()
+        for position, job in enumerate(jobs):
+            for key in job["skill_keys"]:
+                self.by_skill[key].append(position)
+            for token in job["location_tokens"]:
+                self.by_location[token].add(position)
+            if job["remote"]:
+                self.remote.add(position)
+
+    @classmethod
+    def load(cls, since: datetime) -> "JobIndex":
+        columns = (Job.id, Job.title, Job.company_name, Job.location, Job.location_type, Job.skills_required,
+                   Job.salary_min, Job.salary_max, Job.currency, Job.created_at)
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(*columns).where(Job.status == "active", Job.created_at >= since).order_by(Job.created_at.desc())
+            ).all()
+
+        jobs = []
+        for row in rows:
+            location = row.location or ""
+            jobs.append({
+                "id": row.id, "title": row.title, "company": row.company_name, "location": location,
+                "salary": _salary(row), "skills": row.skills_required or "",
+                "created_at": _naive_utc(row.created_at),
+                "skill_keys": _skill_keys((row.skills_required or "").split(",")),
+                "location_tokens": _location_tokens([location]),
+                "remote": (row.location_type or "").lower() == "remote" or "remote" in location.lower(),
+            })
+        return cls(jobs)
+
+    def match(self, skill_keys: set, location_tokens: set, newer_than: datetime, limit: int = DIGEST_MAX_JOBS) -> List[dict]:
+        """Jobs sharing at least one skill, in the user's locations (or remote), best overlap first."""
+        scores = defaultdict(int)
+        for key in skill_keys:
+            for position in self.by_skill.get(key, ()):
+                scores[position] += 1
+        if not scores:
+            return []
+
+        allowed = None
+        if location_tokens:
+            allowed = set(self.remote)
+            for token in location_tokens:
+                allowed |= self.by_location.get(token, set())
+
+        picked = [
+            p for p in scores
+            if (allowed is None or p in allowed) and self.jobs[p]["created_at"] and self.jobs[p]["created_at"] > newer_than
+        ]
+        # jobs are stored newest first, so position breaks ties in favour of newer postings
+        picked.sort(key=lambda p: (-scores[p], p))
+        return [self.jobs[p] for p in picked[:limit]]
+
+# ===========================
+# 🏃 RUN (checkpointed)
+# ===========================
+
+def _claim_run(now: datetime) -> Optional[dict]:
+    """Creates today's run or takes over a stalled one. Returns None if another worker is on it / it's done."""
+    stale = now - timedelta(seconds=RUN_STALE_SECONDS)
+    with engine.begin() as conn:
+        conn.execute(
+            dialect_insert(engine)(DigestRun).values(
+                run_date=now.date(), status="running", jobs_since=now - timedelta(days=DIGEST_LOOKBACK_DAYS),
+                cursor_user_id=0, users_scanned=0, emails_queued=0, heartbeat_at=stale - timedelta(seconds=1),
+                started_at=now,
+            ).on_conflict_do_nothing(index_elements=[DigestRun.run_date])
+        )
+        row = conn.execute(
+            update(DigestRun)
+            .where(DigestRun.run_date == now.date(), DigestRun.status == "running", DigestRun.heartbeat_at < stale)
+            .values(heartbeat_at=now)
+            .returning(DigestRun.id, DigestRun.jobs_since, DigestRun.cursor_user_id, DigestRun.users_scanned, DigestRun.emails_queued)
+        ).mappings().first()
+    return dict(row) if row else None
+
+def _digest_for(user, index: JobIndex, snapshot_at: datetime, card_cache: dict) -> Optional[dict]:
+    skill_keys = _skill_keys(_as_list(user.skills))
+    if not skill_keys or not user.email:
+        return None
+    locations = _location_tokens(_as_list(user.preferred_locations) + [user.location or ""])
+    newer_than = _naive_utc(user.last_job_digest_at) or (snapshot_at - timedelta(hours=DIGEST_FIRST_WINDOW_HOURS))
+
+    jobs = index.match(skill_keys, locations, newer_than)
+    if not jobs:
+        return None
+    first_name = (user.name or "there").split()[0]
+    return {
+        "to_email": user.email,
+        "subject": f"{len(jobs)} new {'job' if len(jobs) == 1 else 'jobs'} matching your skills",
+        "html": generate_daily_jobs_email(first_name, jobs, card_cache=card_cache),
+    }
+
+def run_daily_digest(chunk_size: int = DIGEST_CHUNK_SIZE) -> dict:
+    """Runs (or resumes) today's digest. Safe to call from every worker: only one gets the run."""
+    started = time.perf_counter()
+    snapshot_at = datetime.utcnow()
+    run = _claim_run(snapshot_at)
+    if run is None:
+        return {"status": "skipped", "reason": "already done or running elsewhere"}
+
+    index = JobIndex.load(run["jobs_since"])
+    print(f"📬 Job alerts: {len(index.jobs)} jobs in window, resuming after user {run['cursor_user_id']}")
+    cursor, scanned, queued = run["cursor_user_id"], run["users_scanned"], run["emails_queued"]
+    card_cache = {}
+    columns = (User.id, User.name, User.email, User.skills, User.preferred_locations, User.location, User.last_job_digest_at)
+
+    while index.jobs:
+        with engine.connect() as conn:
+            users = conn.execute(select(*columns).where(User.id > cursor).order_by(User.id).limit(chunk_size)).all()
+        if not users:
+            break
+
+        messages, emailed = [], []
+        for user in users:
+            digest = _digest_for(user, index, snapshot_at, card_cache)
+            if digest:
+                messages.append(dict(digest, status="pending", attempts=0, next_attempt_at=snapshot_at, created_at=snapshot_at))
+                emailed.append(user.id)
+
+        cursor = users[-1].id
+        scanned += len(users)
+        queued += len(messages)
+        # Checkpoint: emails, per-user watermark and cursor commit together
+        with engine.begin() as conn:
+            if messages:
+                conn.execute(EmailOutbox.__table__.insert(), messages)
+                conn.execute(update(User).where(User.id.in_(emailed)).values(last_job_digest_at=snapshot_at))
+            conn.execute(
+                update(DigestRun).where(DigestRun.id == run["id"])
+                .values(cursor_user_id=cursor, users_scanned=scanned, emails_queued=queued, heartbeat_at=datetime.utcnow())
+            )
+
+    with engine.begin() as conn:
+        conn.execute(update(DigestRun).where(DigestRun.id == run["id"]).values(status="done", finished_at=datetime.utcnow()))
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Job alerts: scanned {scanned} users, queued {queued} digests in {elapsed:.1f}s")
+    return {"status": "done", "users_scanned": scanned, "emails_queued": queued, "jobs_in_window": len(index.jobs)}
+
+if __name__ == "__main__":
+    print(run_daily_digest())
@@ -0,0 +1,313 @@
+# backend/job_import.py
+# Bulk import of external jobs (POST /admin/jobs/import), instead of create_job_admin one at a time.
+#
+# Input: a list of URLs and/or a CSV / JSON file whose columns are AdminJobPost fields ("url" is
+# accepted for apply_link). A row with a link but no title or description is filled from the page:
+# schema.org JobPosting JSON-LD when the page has it (most job boards and ATS pages do), else the
+# page title / og: tags and the page text.
+#
+# - pages are fetched concurrently (JOB_IMPORT_CONCURRENCY overall, JOB_IMPORT_PER_HOST per host, so
+#   one board isn't hammered) through backend/page_fetcher.py, which caches and caps them
+# - links already posted, or repeated in the import, are skipped (compared as normalized URLs; the
+#   link itself is stored as given, since ATS params can be part of the posting)
+# - ready rows are trust-scored JOB_IMPORT_TRUST_BATCH at a time (one LLM call per batch) and each
+#   batch is inserted with a single INSERT ... RETURNING
+# - import_jobs() yields one result per row as it finishes, then a summary; the endpoint streams them
+#   as NDJSON
+import asyncio
+import csv
+import html
+import io
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from typing import AsyncIterator, Callable, List, Optional
+from urllib.parse import urlsplit
+from sqlalchemy import insert, or_, select
+from starlette.concurrency import run_in_threadpool
+from backend.database import SessionLocal
+from backend.models import Job
+from backend.page_fetcher import PageText, fetch_page_text, html_to_text, normalize_url
+from backend.skills import find_known_skills
+
+JOB_IMPORT_MAX_ROWS = int(os.getenv("JOB_IMPORT_MAX_ROWS", "500"))
+JOB_IMPORT_CONCURRENCY = int(os.getenv("JOB_IMPORT_CONCURRENCY", "8"))
+JOB_IMPORT_PER_HOST = int(os.getenv("JOB_IMPORT_PER_HOST", "2"))
+JOB_IMPORT_TRUST_BATCH = int(os.getenv("JOB_IMPORT_TRUST_BATCH", "10"))
+
+JOB_FIELDS = ("title", "company_name", "description", "location", "employment_type", "apply_link", "location_type",
+              "salary_min", "salary_max", "currency", "salary_frequency", "experience_level", "skills_required", "equity")
+FIELD_ALIASES = {"url": "apply_link", "link": "apply_link", "company": "company_name", "skills": "skills_required"}
+
+# schema.org values -> the labels the job forms use
+EMPLOYMENT_TYPES = {"FULL_TIME": "Full-time", "PART_TIME": "Part-time", "CONTRACTOR": "Contract",
+                    "INTERN": "Internship", "TEMPORARY": "Contract", "PER_DIEM": "Freelance"}
+SALARY_FREQUENCIES = {"MONTH": "Monthly", "YEAR": "Yearly"}
+
+class ImportRowError(ValueError):
+    pass
+
+# ===========================
+# 📥 INPUT
+# ===========================
+
+def _normalize_row(raw: dict) -> dict:
+    row = {}
+    for key, value in raw.items():
+        key = FIELD_ALIASES.get(str(key or "").strip().lower(), str(key or "").strip().lower())
+        if key in JOB_FIELDS and value not in (None, ""):
+            row[key] = value.strip() if isinstance(value, str) else value
+    return row
+
+def parse_import_file(content: bytes, filename: str = "") -> List[dict]:
+    """CSV (header row) or JSON (a list of objects, or {"jobs": [...]}) -> rows of AdminJobPost fields."""
+    text = content.decode("utf-8-sig", errors="replace")
+    if filename.lower().endswith(".json") or text.lstrip()[:1] in ("[", "{"):
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise ImportRowError(f"Invalid JSON: {e}")
+        if isinstance(data, dict):
+            data = data.get("jobs", [])
+        if not isinstance(data, list):
+            raise ImportRowError("JSON must be a list of jobs or {\"jobs\": [...]}")
+        return [_normalize_row(item) if isinstance(item, dict) else {"apply_link": str(item)} for item in data]
+    try:
+        return [_normalize_row(item) for item in csv.DictReader(io.StringIO(text))]
+    except csv.Error as e:
+        raise ImportRowError(f"Invalid CSV: {e}")
+
+def parse_url_list(text: str) -> List[dict]:
+    return [{"apply_link": url} for url in re.split(r"[\s,]+", text or "") if url]
+
+# ===========================
+# 🔎 FIELDS FROM A FETCHED PAGE
+# ===========================
+
+def _first(value):
+    return value[0] if isinstance(value, list) and value else value
+
+def _name(value) -> str:
+    value = _first(value)
+    if isinstance(value, dict):
+        return str(value.get("name") or "").strip()
+    return str(value or "").strip()
+
+def _location(posting: dict) -> Optional[str]:
+    place = _first(posting.get("jobLocation"))
+    address = place.get("address") if isinstance(place, dict) else None
+    if isinstance(address, str):
+        return address.strip() or None
+    if isinstance(address, dict):
+        parts = [address.get("addressLocality"), address.get("addressRegion"), _name(address.get("addressCountry"))]
+        parts = [str(part).strip() for part in parts if part]
+        return ", ".join(dict.fromkeys(parts)) or None
+    return None
+
+def _salary(posting: dict) -> dict:
+    salary = posting.get("baseSalary")
+    if not isinstance(salary, dict):
+        return {}
+    value = salary.get("value") if isinstance(salary.get("value"), dict) else salary
+    frequency = SALARY_FREQUENCIES.get(str(value.get("unitText") or salary.get("unitText") or "").upper())
+    try:
+        low = int(float(value.get("minValue") or value.get("value") or 0))
+        high = int(float(value.get("maxValue") or value.get("value") or 0))
+    except (TypeError, ValueError):
+        return {}
+    if not (frequency and low and high):
+        return {}  # hourly / daily pay doesn't fit the Monthly / Yearly fields
+    return {"salary_min": low, "salary_max": high, "salary_frequency": frequency,
+            "currency": salary.get("currency") or "INR"}
+
+def _experience(posting: dict) -> Optional[str]:
+    requirement = posting.get("experienceRequirements")
+    months = requirement.get("monthsOfExperience") if isinstance(requirement, dict) else None
+    if months is None:
+        return None
+    try:
+        years = float(months) / 12
+    except (TypeError, ValueError):
+        return None
+    if years < 1:
+        return "Fresher (0-1y)"
+    if years < 3:
+        return "Junior (1-3y)"
+    if years < 5:
+        return "Mid-level (3-5y)"
+    return "Senior (5+y)"
+
+def fields_from_page(page: PageText) -> dict:
+    posting = page.job_posting or {}
+    meta = page.meta or {}
+    fields = {"title": _name(posting.get("title")) or meta.get("og:title") or meta.get("twitter:title") or page.title,
+              "company_name": _name(posting.get("hiringOrganization")) or meta.get("og:site_name")}
+
+    description = posting.get("description")
+    if isinstance(description, str):
+        # JSON-LD descriptions are HTML, sometimes entity-escaped a second time
+        fields["description"] = html_to_text(html.unescape(description) if "&lt;" in description else description)
+    else:
+        fields["description"] = page.text[:10000]
+    fields["location"] = _location(posting)
+    if posting.get("jobLocationType") == "TELECOMMUTE":
+        fields["location_type"] = "Remote"
+    employment = _first(posting.get("employmentType"))
+    fields["employment_type"] = EMPLOYMENT_TYPES.get(str(employment or "").upper().replace("-", "_"))
+    fields["experience_level"] = _experience(posting)
+    fields.update(_salary(posting))
+
+    skills = posting.get("skills")
+    if isinstance(skills, list):
+        skills = ", ".join(_name(skill) for skill in skills)
+    fields["skills_required"] = skills if isinstance(skills, str) and skills else \
+        ", ".join(find_known_skills(fields["description"])) or None
+    return {key: value for key, value in fields.items() if value}
+
+# ===========================
+# 🧱 ROW -> JOB VALUES
+# ===========================
+
+def _int(value) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    try:
+        return int(float(str(value).replace(",", "")))
+    except ValueError:
+        raise ImportRowError(f"Not a number: {value!r}")
+
+def job_values(row: dict) -> dict:
+    missing = [field for field in ("title", "company_name", "description") if not row.get(field)]
+    if missing:
+        raise ImportRowError(f"Missing {', '.join(missing)}")
+    if len(str(row["description"])) < 100:
+        raise ImportRowError("Description too short or page blocked")
+    return {
+        "title": str(row["title"])[:300], "company_name": str(row["company_name"])[:300],
+        "description": str(row["description"]), "location": row.get("location"),
+        "employment_type": row.get("employment_type") or "Full-time",
+        "location_type": row.get("location_type") or "On-site",
+        "apply_link": str(row["apply_link"]).strip() if row.get("apply_link") else None,
+        "salary_min": _int(row.get("salary_min")), "salary_max": _int(row.get("salary_max")),
+        "currency": row.get("currency") or "INR", "salary_frequency": row.get("salary_frequency") or "Monthly",
+        "experience_level": row.get("experience_level"), "skills_required": row.get("skills_required"),
+        "equity": str(row.get("equity", "")).strip().lower() in ("1", "true", "yes"),
+        "recruiter_id": None,  # Admin / external job
+        "is_verified": True, "views": 0,
+    }
+
+def trust_status(values: dict, analysis: dict) -> tuple:
+    """Same rules as recruiter posts: salary bonus, < 50 blocked, >= 75 active, else pending review."""
+    trust_score = analysis["trust_score"]
+    if values.get("salary_min") and values.get("salary_max"):
+        trust_score = min(100, trust_score + 10)
+    if trust_score < 50:
+        return trust_score, None
+    return trust_score, "active" if trust_score >= 75 else "pending_review"
+
+def _existing_links(links: List[str]) -> set:
+    """Normalized forms of the stored apply links that any of `links` could match."""
+    # Links are stored as given, so match on everything before the query (raw and normalized) and
+    # compare the normalized forms here: a stored ...?utm_source=x still matches a bare re-import
+    bases = sorted({form.split("#")[0].split("?")[0] for link in links for form in (link.strip(), normalize_url(link))})
+    if not bases:
+        return set()
+    with SessionLocal() as db:
+        found = set()
+        for i in range(0, len(bases), 200):
+            found.update(db.scalars(select(Job.apply_link).where(
+                or_(*[Job.apply_link.startswith(base, autoescape=True) for base in bases[i:i + 200]]))))
+        return {normalize_url(link) for link in found if link}
+
+def _insert_jobs(rows: List[dict]) -> List[int]:
+    with SessionLocal() as db:
+        ids = list(db.scalars(insert(Job).returning(Job.id, sort_by_parameter_order=True), rows))
+        db.commit()
+        return ids
+
+# ===========================
+# 🚚 IMPORT
+# ===========================
+
+async def import_jobs(rows: List[dict], analyze_batch: Callable[[List[dict]], List[dict]]) -> AsyncIterator[dict]:
+    """
+    Yields {"row": i, "status": created | skipped | blocked | error, ...} per row as each one is settled,
+    then {"summary": {...}}. analyze_batch is the blocking batch trust analyzer (one call per batch).
+    """
+    counts = Counter()
+    seen, duplicates = set(), {}
+    for i, row in enumerate(rows):
+        link = row.get("apply_link")
+        if link:
+            key = normalize_url(link)
+            if key in seen:
+                duplicates[i] = "Duplicate link in this import"
+            seen.add(key)
+    posted = await run_in_threadpool(_existing_links, [row["apply_link"] for row in rows if row.get("apply_link")])
+
+    overall = asyncio.Semaphore(JOB_IMPORT_CONCURRENCY)
+    per_host = defaultdict(lambda: asyncio.Semaphore(JOB_IMPORT_PER_HOST))
+
+    async def prepare(i: int, row: dict) -> tuple:
+        try:
+            if i in duplicates:
+                return i, "skipped", duplicates[i]
+            link = row.get("apply_link")
+            if link and normalize_url(link) in posted:
+                return i, "skipped", "Already posted"
+            if link and not (row.get("title") and row.get("description")):
+                async with overall, per_host[urlsplit(normalize_url(link)).hostname]:
+                    page = await fetch_page_text(link)
+                row = {**fields_from_page(page), **row}  # values given in the file win
+            return i, "ready", job_values(row)
+        except Exception as e:
+            return i, "error", str(e) or e.__class__.__name__
+
+    async def settle(batch: List[tuple]) -> List[dict]:
+        try:
+            return await _settle(batch)
+        except Exception as e:
+            print(f"⚠️ Job import batch failed: {e}")
+            return [{"row": i, "status": "error", "error": "Could not save this batch", "title": job["title"]}
+                    for i, job in batch]
+
+    async def _settle(batch: List[tuple]) -> List[dict]:
+        values = [item[1] for item in batch]
+        analyses = await run_in_threadpool(analyze_batch, values)
+        results, to_insert = [], []
+        for (i, job), analysis in zip(batch, analyses):
+            trust_score, status = trust_status(job, analysis)
+            if status is None:
+                results.append({"row": i, "status": "blocked", "title": job["title"], "trust_score": trust_score,
+                                "verdict": analysis.get("verdict"), "reason": analysis.get("reason")})
+            else:
+                to_insert.append((i, {**job, "trust_score": trust_score, "status": status}))
+        if to_insert:
+            ids = await run_in_threadpool(_insert_jobs, [job for _, job in to_insert])
+            for (i, job), job_id in zip(to_insert, ids):
+                results.append({"row": i, "status": "created", "job_id": job_id, "title": job["title"],
+                                "trust_score": job["trust_score"], "job_status": job["status"]})
+        return results
+
+    batch = []
+    for finished in asyncio.as_completed([prepare(i, row) for i, row in enumerate(rows)]):
+        i, outcome, detail = await finished
+        if outcome == "ready":
+            batch.append((i, detail))
+            if len(batch) < JOB_IMPORT_TRUST_BATCH:
+                continue
+            ready, batch = batch, []
+            for result in await settle(ready):
+                counts[result["status"]] += 1
+                yield result
+        else:
+            counts[outcome] += 1
+            yield {"row": i, "status": outcome, "error" if outcome == "error" else "reason": detail,
+                   "url": rows[i].get("apply_link")}
+    if batch:
+        for result in await settle(batch):
+            counts[result["status"]] += 1
+            yield result
+
+    yield {"summary": {"rows": len(rows), **{status: counts[status] for status in ("created", "blocked", "skipped", "error")}}}
@@ -1,71 +1,74 @@
-from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, BackgroundTasks, status, Query, Header
+from fastapi import FastAPI, Depends, UploadFile, File, Form, HTTPException, status, Query, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 from groq import Groq
 from pydantic import BaseModel, field_validator
-import pdfplumber
-import io
 import os
 import json
 import hashlib
-import bcrypt
+import hmac
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import smtplib
-from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
-from typing import Union, List, Optional, Any
-from fastapi.staticfiles import StaticFiles
-from backend.database import SessionLocal, engine
-from backend.models import Job, Recruiter, User, Application, SavedJob, JobApplication, Admin, Project, Achievement, Certification, SkillGap, AIFeedback, Waitlist
+from typing import Union, List, Optional, Any, Literal
+from backend.static_files import CachedStaticFiles
+from backend.database import engine, get_db
+from backend.models import Job, Recruiter, User, SavedJob, JobApplication, Admin, Project, SkillGap, AIFeedback, Waitlist
+from backend.scores import record_application_score, forget_applications
+from backend.skills import upsert_skill_gaps
+from backend.passwords import hash_password_async, verify_password_async, rehash_if_needed_async, password_hash_stats
+from backend.otp_store import otp_store
+from backend.http_client import start_http_client, close_http_client, get_google_userinfo
+from backend.page_fetcher import fetch_page_text, fetch_stats
+from backend.email_outbox import enqueue_email, outbox_stats, OutboxWorkerPool
+from backend.attachments import resume_source
+from backend.job_alerts import run_daily_digest
+from backend.campaigns import start_nudge_campaign, campaign_status
+from backend.resume_extraction import extract_resume_text, extraction_stats, shutdown_extraction_pool
+from backend.uploads import UploadLimitMiddleware, receive_upload, RESUME_MAX_UPLOAD_BYTES, IMAGE_MAX_UPLOAD_BYTES, IMPORT_MAX_UPLOAD_BYTES
+from backend.admin_listings import list_page, export_rows, LISTINGS, ADMIN_PAGE_DEFAULT, ADMIN_PAGE_MAX
+from backend.job_import import import_jobs, parse_import_file, parse_url_list, ImportRowError, JOB_IMPORT_MAX_ROWS
+from backend.storage import put_content, RESUME_BUCKET
+from backend.images import store_profile_image, profile_image_urls, InvalidImage
+from backend.resume_profile import build_resume_profile, apply_profile_defaults, load_profile, resume_for_ai
+from backend.email_templates import escape, render_application_email, render_profile_completion_reminder, render_truth_score_nudge, \
+    render_admin_recruiter_alert, render_candidate_update_email, render_welcome_email, render_otp_email, \
+    render_recruiter_otp_email, render_login_success_email, render_candidate_confirmation_email, \
+    render_waitlist_confirmation_email, render_recruiter_status_email, render_reset_success_email
+from backend.principals import SECRET_KEY, ALGORITHM, security, Principal, get_principal, get_optional_principal, get_student_principal, get_recruiter_principal, principal_from_token, invalidate_principal
 import random
-import string, requests
-from bs4 import BeautifulSoup
+import string
+from starlette.concurrency import run_in_threadpool
 import re
 import backend.models
 import sys
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from contextlib import asynccontextmanager
 import asyncio
 import aiosmtplib
 from email.message import EmailMessage
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import HTTPAuthorizationCredentials
 import jwt
-from sqlalchemy import or_
+from sqlalchemy import or_, func, select
+from sqlalchemy.exc import IntegrityError
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
-from supabase import create_client, Client
-import resend
 from starlette.requests import Request
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+from backend.rate_limit import RateLimiter, client_ip
+from backend.ai_usage import record_ai_call, daily_limit_for, AI_DAILY_LIMIT
 import logging
 
 # --- CONFIGURATION ---
-OTP_STORE = {} 
-OTP_EXPIRY_SECONDS = 300  # 5 minutes
 base_url = os.getenv("NEXT_PUBLIC_API_URL", "https://truthhire-api.onrender.com")
-# --- CONFIGURATION (Add this near the top with other configs) ---
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY") # Ensure this is the SERVICE_ROLE key
-
-resend.api_key = os.getenv("RESEND_API_KEY")
-
-# Initialize Supabase Client
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as e:
-    print(f"Warning: Supabase client failed to initialize. Check env vars. Error: {e}")
+# Supabase (SUPABASE_URL / SUPABASE_SERVICE_KEY) is configured in backend/storage.py
 
 load_dotenv()
 
 GOOGLE_CLIENT_ID = "156178217038-72bv7qfb4o2an9b0o8qdsbq5uekecnu9.apps.googleusercontent.com"
 
-SECRET_KEY = os.getenv("SECRET_KEY", "your_super_secret_key_change_this")
-ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 43200
 
 def create_access_token(data: dict):
@@ -75,11 +78,27 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-security = HTTPBearer()
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await start_http_client()
+    # Small in-process email sender; set EMAIL_OUTBOX_IN_APP=false when running `python -m backend.email_outbox` separately
+    email_workers = None
+    if os.getenv("EMAIL_OUTBOX_IN_APP", "true").lower() == "true":
+        email_workers = OutboxWorkerPool(int(os.getenv("EMAIL_OUTBOX_IN_APP_WORKERS", "1"))).start()
+    # Daily job-alert digests; every worker schedules it, the first to claim the day's run does it
+    scheduler = None
+    if os.getenv("DAILY_JOB_ALERTS_ENABLED", "false").lower() == "true":
+        scheduler = AsyncIOScheduler(timezone="UTC")
+        scheduler.add_job(run_in_threadpool, "cron", args=[run_daily_digest],
+                          hour=int(os.getenv("DAILY_JOB_ALERTS_HOUR_UTC", "3")), minute=30)
+        scheduler.start()
     yield
+    if scheduler:
+        scheduler.shutdown(wait=False)
+    if email_workers:
+        email_workers.stop()
+    shutdown_extraction_pool()
+    await close_http_client()
 
 # 🛡️ SECURITY FIX: Hide docs if in Production
 # Add ENVIRONMENT=production to your Render Environment Variables
@@ -89,10 +108,8 @@ redoc_url = "/redoc" if os.getenv("ENVIRONMENT") != "production" else None
 app = FastAPI(docs_url=docs_url, redoc_url=redoc_url, lifespan=lifespan)
 
 # --- 🛡️ SECURITY: CONFIGURE LIMITER ---
-# This identifies users by their IP address
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# This identifies users by their IP address; buckets are shared by all workers (backend/rate_limit.py)
+limiter = RateLimiter(key_func=client_ip)
 
 # This overrides any other setting and forces SQLAlchemy to be silent
 logging.basicConfig()
@@ -106,6 +123,9 @@ logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 
 os.makedirs("static/resumes", exist_ok=True)
 
+# Body size caps for upload routes (added first so CORS headers still wrap its 413s)
+app.add_middleware(UploadLimitMiddleware)
+
 # Allow Frontend
 app.add_middleware(
     CORSMiddleware,
@@ -117,97 +137,95 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # admin listing pagination
 )
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 ai_client = Groq(api_key=GROQ_API_KEY)
 
 ANALYSIS_CACHE = {}
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # --- ADD THIS PYDANTIC MODEL ---
 class GoogleAuthRequest(BaseModel):
     access_token: str
 
 # --- ADD THIS NEW ENDPOINT ---
 @app.post("/users/google-auth")
-def google_auth(
+async def google_auth(
     data: GoogleAuthRequest, 
-    background_tasks: BackgroundTasks, 
     db: Session = Depends(get_db)
 ):
     try:
-        # 1. Verify Token with Google
-        google_res = requests.get(
-            "https://www.googleapis.com/oauth2/v3/userinfo",
-            headers={"Authorization": f"Bearer {data.access_token}"}
-        )
+        # 1. Verify Token with Google (pooled async client, cached per access token)
+        google_data = await get_google_userinfo(data.access_token)
         
-        if google_res.status_code != 200:
+        if not google_data:
             raise HTTPException(status_code=400, detail="Invalid Google Token")
             
-        google_data = google_res.json()
         email = google_data.get("email")
         name = google_data.get("name")
         
         if not email:
             raise HTTPException(status_code=400, detail="Google account has no email")
 
-        # 2. Check if user exists
-        user = db.query(User).filter(User.email == email).first()
-        is_new_user = False
-        
+        # 2-3. DB work runs in the threadpool; a new account's password hash is awaited on the
+        # bcrypt executor, so it holds no threadpool thread while it waits
+        user = await run_in_threadpool(db.query(User).filter(User.email == email).first)
+        password_hash = None
         if not user:
-            # --- CASE A: REGISTER NEW USER ---
-            is_new_user = True
-            
             # Generate a random strong password
             random_password = ''.join(random.choices(string.ascii_letters + string.digits, k=24))
-            password_hash = bcrypt.hashpw(random_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            
-            user = User(
-                name=name,
-                email=email,
-                password_hash=password_hash,
-                is_student_verified=True 
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-            
-            # 📧 Send Welcome Email (New User)
-            
-            background_tasks.add_task(send_welcome_email, email, name)
-
-        else:
-            # --- CASE B: EXISTING USER LOGIN (The Fix) ---
-            # 📧 Send Login Success Email (Consistent with OTP flow)
-            
-            background_tasks.add_task(send_login_success_email, email, user.name)
-
-        # 3. --- GENERATE TOKEN ---
-        access_token = create_access_token(data={"sub": str(user.id), "role": "student"})
-        
-        return {
-            "access_token": access_token,
-            "token_type": "bearer",
-            "user_id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "is_new_user": is_new_user 
-        }
+            password_hash = await hash_password_async(random_password)
+        return await run_in_threadpool(_google_login_or_register, db, user, email, name, password_hash)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Google Auth Error: {e}")
         raise HTTPException(status_code=500, detail="Authentication failed")    
 
+def _google_login_or_register(db: Session, user: Optional[User], email: str, name: str,
+                              password_hash: Optional[str]) -> dict:
+    # 2. Register the user if they don't exist yet
+    is_new_user = False
+    
+    if not user:
+        # --- CASE A: REGISTER NEW USER ---
+        is_new_user = True
+        
+        user = User(
+            name=name,
+            email=email,
+            password_hash=password_hash,
+            is_student_verified=True 
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        
+        # 📧 Send Welcome Email (New User)
+        
+        send_welcome_email(email, name)
+
+    else:
+        # --- CASE B: EXISTING USER LOGIN (The Fix) ---
+        # 📧 Send Login Success Email (Consistent with OTP flow)
+        
+        send_login_success_email(email, user.name)
+
+    # 3. --- GENERATE TOKEN ---
+    access_token = create_access_token(data={"sub": str(user.id), "role": "student"})
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user_id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "is_new_user": is_new_user 
+    }
+
 # --- 🧠 THE TRUTH ENGINE (Robust AI Analysis) ---
 def clean_text_for_ai(text: str) -> str:
     """
@@ -227,7 +245,8 @@ def clean_text_for_ai(text: str) -> str:
     return " ".join(text.split())
 
 # --- UPDATED: get_ai_gap_analysis with job_id support ---
-def get_ai_gap_analysis(resume_text: str, job_description: str, candidate_id: str = "anon", job_id: str = "general") -> dict:
+def get_ai_gap_analysis(resume_text: str, job_description: str, candidate_id: str = "anon", job_id: str = "general",
+                        usage_subject: str = None, enforce_quota: bool = False) -> dict:
     # 1. Sanitize Inputs
     clean_resume = clean_text_for_ai(resume_text)
     clean_jd = clean_text_for_ai(job_description)
@@ -253,6 +272,10 @@ def get_ai_gap_analysis(resume_text: str, job_description: str, candidate_id: st
     if not os.getenv("GROQ_API_KEY"):
         return { "score": 0, "matched_skills": [], "missing_skills": ["Config Error"], "defense_strategies": {}, "coach_message": "API Key missing." }
 
+    # Count the real LLM call (cache hits above are free). Raises 429 when enforce_quota and over the daily limit.
+    usage_subject = usage_subject or (f"user:{candidate_id}" if candidate_id and candidate_id != "anon" else "anon")
+    record_ai_call(usage_subject, daily_limit_for(usage_subject) if enforce_quota else None)
+
     try:
         # 3. THE UNIVERSAL RECRUITER PROMPT (Unchanged Logic)
         prompt = f"""
@@ -353,7 +376,35 @@ def get_ai_gap_analysis(resume_text: str, job_description: str, candidate_id: st
         }
 
 # --- 🛡️ TRUTH ENGINE: JOB GUARD AI (Professional Grade) ---
-def analyze_job_trust(title: str, description: str, salary_min: int = None, salary_max: int = None, currency: str = "INR", location_type: str = "On-site") -> dict:
+JOB_TRUST_RUBRIC = """
+### SCORING CRITERIA (0 - 100)
+
+**1. FATAL RED FLAGS (Score: 0-30 | Verdict: SCAM)**
+- Mentions "Telegram", "WhatsApp", or personal emails (gmail/yahoo) for contact.
+- Requests for money, security deposits, or "ID card fees".
+- "Easy money", "No experience needed" for high-paying roles.
+- MLM, Pyramid Schemes, or "Investment" roles disguising as jobs.
+- Unrealistic Salary: e.g., "Data Entry" paying ₹1,00,000/month or $50/hr for unskilled work.
+
+**2. WARNING SIGNS (Score: 40-70 | Verdict: SUSPICIOUS)**
+- Vague responsibilities (e.g., "Do whatever required").
+- Excessive grammar/spelling errors suggesting unprofessionalism.
+- All caps text or excessive emojis.
+- Title does not match the description (e.g., Title: "Manager", Desc: "Door-to-door sales").
+
+**3. PROFESSIONAL STANDARDS (Score: 71-100 | Verdict: SAFE)**
+- Clear "About", "Responsibilities", and "Requirements" sections.
+- Specific tech stack or hard skills listed.
+- Professional tone and formatting.
+- Salary is market-standard for the role title.
+
+### INSTRUCTIONS
+- Be strict on Remote/Data Entry jobs (high scam risk).
+- Be lenient on Sales jobs mentioning "commissions" (normal industry practice).
+- If Salary is provided, cross-reference it with the Job Title for realism.
+"""
+
+def analyze_job_trust(title: str, description: str, salary_min: int = None, salary_max: int = None, currency: str = "INR", location_type: str = "On-site", usage_subject: str = "system") -> dict:
     """
     Advanced AI analysis to detect scams, low-quality posts, and unrealistic offers.
     Now considers Salary Realism and Work Mode context.
@@ -369,6 +420,8 @@ def analyze_job_trust(title: str, description: str, salary_min: int = None, sala
     if not os.getenv("GROQ_API_KEY"):
         return {"trust_score": 85, "reason": "AI Config Missing", "verdict": "SAFE"} 
 
+    record_ai_call(usage_subject)
+
     try:
         # 3. The Professional Auditor Prompt
         prompt = f"""
@@ -381,32 +434,7 @@ def analyze_job_trust(title: str, description: str, salary_min: int = None, sala
         - Work Mode: {location_type}
         - Description Snippet: {clean_text[:5000]}
 
-        ### SCORING CRITERIA (0 - 100)
-        
-        **1. FATAL RED FLAGS (Score: 0-30 | Verdict: SCAM)**
-        - Mentions "Telegram", "WhatsApp", or personal emails (gmail/yahoo) for contact.
-        - Requests for money, security deposits, or "ID card fees".
-        - "Easy money", "No experience needed" for high-paying roles.
-        - MLM, Pyramid Schemes, or "Investment" roles disguising as jobs.
-        - Unrealistic Salary: e.g., "Data Entry" paying ₹1,00,000/month or $50/hr for unskilled work.
-
-        **2. WARNING SIGNS (Score: 40-70 | Verdict: SUSPICIOUS)**
-        - Vague responsibilities (e.g., "Do whatever required").
-        - Excessive grammar/spelling errors suggesting unprofessionalism.
-        - All caps text or excessive emojis.
-        - Title does not match the description (e.g., Title: "Manager", Desc: "Door-to-door sales").
-
-        **3. PROFESSIONAL STANDARDS (Score: 71-100 | Verdict: SAFE)**
-        - Clear "About", "Responsibilities", and "Requirements" sections.
-        - Specific tech stack or hard skills listed.
-        - Professional tone and formatting.
-        - Salary is market-standard for the role title.
-
-        ### INSTRUCTIONS
-        - Be strict on Remote/Data Entry jobs (high scam risk).
-        - Be lenient on Sales jobs mentioning "commissions" (normal industry practice).
-        - If Salary is provided, cross-reference it with the Job Title for realism.
-
+        {JOB_TRUST_RUBRIC}
         ### OUTPUT JSON ONLY
         {{
             "trust_score": <int 0-100>,
@@ -436,40 +464,91 @@ def analyze_job_trust(title: str, description: str, salary_min: int = None, sala
         # Fallback mechanism
         return {"trust_score": 80, "reason": "AI Service Unavailable", "verdict": "SAFE"}
 
+JOB_TRUST_BATCH_SNIPPET = 2500  # chars of description per job when several share one prompt
+
+def analyze_jobs_trust_batch(jobs: List[dict], usage_subject: str = "system") -> List[dict]:
+    """
+    analyze_job_trust for several jobs with ONE Groq call (used by bulk import).
+    jobs: dicts with title, description and optionally salary_min/salary_max/currency/location_type.
+    Jobs the model skips are analyzed one by one.
+    """
+    if not os.getenv("GROQ_API_KEY"):
+        return [{"trust_score": 85, "reason": "AI Config Missing", "verdict": "SAFE"} for _ in jobs]
+
+    listings = []
+    for i, job in enumerate(jobs):
+        salary_info = "Not Disclosed"
+        if job.get("salary_min") and job.get("salary_max"):
+            salary_info = f"{job.get('currency') or 'INR'} {job['salary_min']:,} - {job['salary_max']:,}"
+        listings.append(f"""
+        [JOB {i}]
+        - Title: {job.get('title')}
+        - Salary Offered: {salary_info}
+        - Work Mode: {job.get('location_type') or 'On-site'}
+        - Description Snippet: {clean_text_for_ai(job.get('description') or '')[:JOB_TRUST_BATCH_SNIPPET]}""")
+
+    results = {}
+    record_ai_call(usage_subject)
+    try:
+        prompt = f"""
+        Role: Elite Job Board Compliance Auditor & Fraud Analyst.
+        Task: Analyze EACH of the {len(jobs)} job postings below, independently, for SCAMS, UNREALISTIC PROMISES, or LOW QUALITY content.
+
+        ### JOBS
+        {"".join(listings)}
+
+        {JOB_TRUST_RUBRIC}
+        ### OUTPUT JSON ONLY (one entry per job, same index as [JOB n])
+        {{
+            "results": [
+                {{"index": 0, "trust_score": <int 0-100>, "flagged_issues": ["Specific Issue 1"], "verdict": "SAFE" or "SUSPICIOUS" or "SCAM"}}
+            ]
+        }}
+        """
+
+        response = ai_client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+        for item in json.loads(response.choices[0].message.content).get("results", []):
+            try:
+                results[int(item["index"])] = {
+                    "trust_score": int(item.get("trust_score", 60)),
+                    "reason": ", ".join(item.get("flagged_issues", [])),
+                    "verdict": item.get("verdict", "SUSPICIOUS")
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+    except Exception as e:
+        print(f"⚠️ Batch Job Analysis Failed: {e}")
+        # Same fallback as analyze_job_trust; retrying job by job would only fail N more times
+        return [{"trust_score": 80, "reason": "AI Service Unavailable", "verdict": "SAFE"} for _ in jobs]
+
+    return [
+        results.get(i) or analyze_job_trust(job.get("title"), job.get("description") or "", job.get("salary_min"),
+                                            job.get("salary_max"), job.get("currency") or "INR",
+                                            job.get("location_type") or "On-site", usage_subject=usage_subject)
+        for i, job in enumerate(jobs)
+    ]
+
 class UrlRequest(BaseModel):
     url: str
 
 @app.post("/fetch-job-content")
-def fetch_job_content(data: UrlRequest):
+async def fetch_job_content(data: UrlRequest):
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Referer": "[https://www.google.com/](https://www.google.com/)"
-        }
-        
-        response = requests.get(data.url, headers=headers, timeout=10)
+        # Cached per normalized URL, revalidated with ETag / Last-Modified, streamed and size-capped
+        page = await fetch_page_text(data.url)
         
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail=f"Site returned status {response.status_code}")
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        for script in soup(["script", "style", "nav", "footer", "header", "iframe", "svg"]):
-            script.extract()
-            
-        text = soup.get_text(separator=' ')
-        
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        clean_text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        if len(clean_text) < 100:
+        if len(page.text) < 100:
              raise HTTPException(status_code=400, detail="Content too short or blocked by site security.")
 
-        return {"content": clean_text[:5000]}
+        return {"content": page.text[:5000]}
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Scrape Error: {e}")
         raise HTTPException(status_code=400, detail=f"Error scraping URL: {str(e)}")
@@ -479,67 +558,18 @@ def fetch_job_content(data: UrlRequest):
 # 📧 EMAIL FUNCTIONS
 # ===========================
 
-# --- 📧 MASTER EMAIL FUNCTION (RESEND) ---
-def send_email_via_resend(to_email: str, subject: str, html_content: str, attachment_path: str = None):
-    try:
-        # Define the sender. Since you verified 'truthhire.in', you can use ANY name!
-        # Examples: "TruthHire Admin <admin@truthhire.in>", "TruthHire Team <no-reply@truthhire.in>"
-        sender_identity = "TruthHire <no-reply@truthhire.in>" 
-
-        params = {
-            "from": sender_identity,
-            "to": [to_email],
-            "subject": subject,
-            "html": html_content,
-        }
-
-        # Handle Attachment (for Resend)
-        if attachment_path and os.path.exists(attachment_path):
-            with open(attachment_path, "rb") as f:
-                file_bytes = list(f.read()) # Convert bytes to list of integers for Resend
-                params["attachments"] = [{
-                    "filename": os.path.basename(attachment_path),
-                    "content": file_bytes
-                }]
-
-        email = resend.Emails.send(params)
-       
-        return True
-        
-    except Exception as e:
-        print(f"❌ Failed to send email via Resend: {e}")
-        return False
+# --- 📧 MASTER EMAIL FUNCTION ---
+# Emails are written to the outbox table and sent by the outbox workers (backend/email_outbox.py),
+# so request latency never depends on the email provider and nothing is lost on a restart.
 
 def send_admin_recruiter_alert(recruiter_name: str, recruiter_email: str, linkedin_url: str):
     # Change this to your actual admin email or set ADMIN_EMAIL in your .env file
     admin_email = os.getenv("ADMIN_EMAIL", "hrtruthhire@gmail.com") 
 
-    headline = "⚠️ Action Required: Verify Recruiter"
-    
-    content_html = f"""
-    <p>Hello Admin,</p>
-    <p>A new recruiter has registered using a <strong>public email domain</strong> and has been placed in the verification queue.</p>
-    
-    <div style="background-color: #fff7ed; border-left: 4px solid #f97316; padding: 16px; border-radius: 4px; margin: 24px 0;">
-        <p style="margin: 0 0 12px; font-size: 14px; font-weight: 700; color: #9a3412; text-transform: uppercase;">Recruiter Details</p>
-        <ul style="margin: 0; padding-left: 20px; color: #431407;">
-            <li style="margin-bottom: 8px;"><strong>Name:</strong> {recruiter_name}</li>
-            <li style="margin-bottom: 8px;"><strong>Email:</strong> {recruiter_email}</li>
-            <li style="margin-bottom: 8px;"><strong>LinkedIn:</strong> <a href="{linkedin_url}" style="color: #ea580c;">View Profile</a></li>
-            <li><strong>Status:</strong> <span style="background-color: #ffedd5; color: #c2410c; padding: 2px 6px; border-radius: 4px; font-size: 12px; font-weight: bold;">PENDING</span></li>
-        </ul>
-    </div>
-    
-    <p>Please review their LinkedIn profile to verify their employment details.</p>
-    """
-    
-    # You can update this link to point to your actual admin dashboard URL
-    cta_link = "https://truthhire.in/admin/recruiters" 
-    
-    final_html = get_base_email_template(headline, content_html, "Open Admin Dashboard", cta_link)
+    final_html = render_admin_recruiter_alert(recruiter_name, recruiter_email, linkedin_url)
 
     # ✅ UPDATED: Send via Resend
-    send_email_via_resend(admin_email, f"New Verification Request: {recruiter_name}", final_html)
+    enqueue_email(admin_email, f"New Verification Request: {recruiter_name}", final_html)
 
 # --- UPDATED MAGIC LINK ENDPOINT ---
 @app.get("/public/magic-status", response_class=HTMLResponse)
@@ -547,7 +577,6 @@ def magic_status_update(
     app_id: int, 
     status: str, 
     token: str, 
-    background_tasks: BackgroundTasks, # <--- Added this to send email
     db: Session = Depends(get_db)
 ):
     # 1. Verify Application
@@ -561,7 +590,7 @@ def magic_status_update(
     if app.status in ['shortlisted', 'rejected']:
         color = "#3b82f6" # Blue
         title = "Status Already Updated"
-        message = f"You have already marked <strong>{app.applicant_name}</strong> as <strong>{app.status.title()}</strong>."
+        message = f"You have already marked <strong>{escape(app.applicant_name)}</strong> as <strong>{escape(app.status.title())}</strong>."
         
         return f"""
         <html>
@@ -593,8 +622,7 @@ def magic_status_update(
             if rec: hr_name = rec.name
 
         if job:
-            background_tasks.add_task(
-                send_candidate_update_email,
+            send_candidate_update_email(
                 candidate_email=app.applicant_email, 
                 candidate_name=app.applicant_name, 
                 job_title=job.title,
@@ -609,7 +637,7 @@ def magic_status_update(
     # 5. Success Page UI
     color = "#16a34a" if new_status == 'shortlisted' else "#dc2626"
     title = "Candidate Shortlisted! 🎉" if new_status == 'shortlisted' else "Candidate Rejected."
-    message = f"You have successfully marked <strong>{app.applicant_name}</strong> as <strong>{new_status.title()}</strong>."
+    message = f"You have successfully marked <strong>{escape(app.applicant_name)}</strong> as <strong>{escape(new_status.title())}</strong>."
     
     return f"""
     <html>
@@ -628,601 +656,73 @@ def magic_status_update(
     """
 
 def send_application_email(hr_email: str, job_title: str, candidate_data: dict, cover_note: str, resume_path: str = None, is_cold_outreach: bool = False, app_id: int = None):
-    # 1. Prepare Data
-    score = candidate_data.get('score', 0)
-    score_color = "#16a34a" if score >= 75 else "#d97706"
-    score_bg = "#f0fdf4" if score >= 75 else "#fffbeb"
-    
-    matched_list = candidate_data.get('matched', [])
-    matched_str = ", ".join(matched_list) if matched_list else "General profile match."
-    
-    missing_list = candidate_data.get('missing', [])
-    missing_str = ", ".join(missing_list) if missing_list else "No critical skills missing."
-
-    headline = "Candidate Match Found" if is_cold_outreach else "New Application Received"
-    
-    # 2. Generate Magic Links
+    # Magic links let the recruiter shortlist/reject straight from the email
     base_url = f"{os.getenv('NEXT_PUBLIC_API_URL', 'https://truthhire-api.onrender.com')}"
     dummy_token = "secure_token_123"
-    
-    magic_actions_html = ""
+    approve_link = reject_link = None
     if app_id:
         approve_link = f"{base_url}/public/magic-status?app_id={app_id}&status=shortlisted&token={dummy_token}"
         reject_link = f"{base_url}/public/magic-status?app_id={app_id}&status=rejected&token={dummy_token}"
-        
-        magic_actions_html = f"""
-        <div style="margin-top: 24px; padding-top: 24px; border-top: 1px solid #e5e7eb;">
-            <p style="margin: 0 0 12px; font-size: 11px; font-weight: 700; color: #6b7280; text-transform: uppercase; letter-spacing: 0.5px;">⚡ Quick Actions (No Login Required)</p>
-            <table width="100%" cellspacing="0" cellpadding="0">
-                <tr>
-                    <td width="48%" style="padding-right: 2%;">
-                        <a href="{approve_link}" style="display: block; background-color: #16a34a; color: #ffffff; text-align: center; padding: 12px; border-radius: 6px; text-decoration: none; font-weight: 600; font-size: 14px;">✅ Shortlist</a>
-                    </td>
-                    <td width="48%" style="padding-left: 2%;">
-                        <a href="{reject_link}" style="display: block; background-color: #ffffff; border: 1px solid #d1d5db; color: #dc2626; text-align: center; padding: 11px; border-radius: 6px; text-decoration: none; font-weight: 600; font-size: 14px;">❌ Reject</a>
-                    </td>
-                </tr>
-            </table>
-        </div>
-        """
 
-    # 3. Build the Candidate Card HTML
-    candidate_card = f"""
-    <div style="border: 1px solid #e5e7eb; border-radius: 8px; padding: 24px; background-color: #ffffff; margin-bottom: 24px;">
-        <table width="100%" cellpadding="0" cellspacing="0" style="margin-bottom: 20px;">
-            <tr>
-                <td valign="middle">
-                    <h3 style="margin: 0 0 4px; font-size: 18px; color: #111827; font-weight: 700;">{candidate_data['name']}</h3>
-                    <p style="margin: 0; color: #6b7280; font-size: 14px;">{candidate_data['email']}</p>
-                </td>
-                <td valign="middle" align="right">
-                    <span style="background-color: {score_bg}; color: {score_color}; padding: 6px 12px; border-radius: 20px; font-weight: 700; font-size: 14px; border: 1px solid {score_color}30;">
-                        {score}% Match
-                    </span>
-                </td>
-            </tr>
-        </table>
-        
-        <div style="border-top: 1px dashed #e5e7eb; padding-top: 16px; margin-bottom: 16px;">
-            <div style="margin-bottom: 12px;">
-                <p style="margin: 0 0 4px; font-size: 11px; font-weight: 700; color: #16a34a; text-transform: uppercase; letter-spacing: 0.5px;">✅ Verified Skills</p>
-                <p style="margin: 0; font-size: 14px; color: #374151; line-height: 1.5;">{matched_str}</p>
-            </div>
-            
-            <div>
-                <p style="margin: 0 0 4px; font-size: 11px; font-weight: 700; color: #dc2626; text-transform: uppercase; letter-spacing: 0.5px;">⚠️ Missing / Unverified</p>
-                <p style="margin: 0; font-size: 14px; color: #374151; line-height: 1.5;">{missing_str}</p>
-            </div>
-        </div>
-        
-        <div style="background-color: #f9fafb; padding: 12px; border-radius: 6px; border-left: 3px solid #e5e7eb;">
-            <p style="margin: 0 0 4px; font-size: 10px; font-weight: 700; color: #9ca3af; text-transform: uppercase;">MESSAGE FROM CANDIDATE</p>
-            <p style="margin: 0; font-style: italic; color: #4b5563; font-size: 14px; line-height: 1.5;">"{cover_note}"</p>
-        </div>
-
-        {magic_actions_html}
-    </div>
-    """
-
-    body_content = f"""
-    <p>Hello,</p>
-    <p>We found a verified candidate for the <strong>{job_title}</strong> position.</p>
-    
-    {candidate_card}
-    
-    <p style="font-size: 14px; color: #6b7280; margin-top: 24px;">The candidate's resume is attached to this email for your detailed review.</p>
-    """
-
-    final_html = get_base_email_template(headline, body_content, "Login to View Full Profile", "https://truthhire.in/recruiter/login")
+    final_html = render_application_email(job_title, candidate_data, cover_note, is_cold_outreach, approve_link, reject_link)
 
     # ✅ UPDATED: Send via Resend (Handles Attachment)
-    send_email_via_resend(hr_email, f"Action Required: {candidate_data['name']} for {job_title}", final_html, resume_path)
+    enqueue_email(hr_email, f"Action Required: {candidate_data['name']} for {job_title}", final_html, resume_path)
 
 
 def send_candidate_update_email(candidate_email: str, candidate_name: str, job_title: str, company_name: str, hr_name: str, status: str, feedback: str = None):
-    current_year = datetime.now().year
-    
-    # --- A. SHORTLISTED TEMPLATE (Green/Positive) ---
-    if status == "shortlisted":
-        subject = f"Great News: You've been shortlisted for {job_title}"
-        accent_color = "#16A34A" # Green
-        headline = "Congratulations! 🎉"
-        email_content = f"""
-        <p>Dear {candidate_name},</p>
-        <p>We are pleased to inform you that your application for the <strong>{job_title}</strong> position at <strong>{company_name}</strong> has been shortlisted.</p>
-        <p>Our hiring team was impressed with your profile and we would like to move forward to the next stage of our selection process.</p>
-        
-        <div style="background-color: #f0fdf4; border-left: 4px solid #16a34a; padding: 16px; border-radius: 4px; margin: 24px 0;">
-            <p style="margin: 0; font-size: 14px; font-weight: 700; color: #166534;">What happens next?</p>
-            <p style="margin: 4px 0 0; font-size: 14px; color: #14532d;">
-                Our team will contact you shortly (via email or phone) to schedule an interview or share an assignment. Please keep an eye on your inbox.
-            </p>
-        </div>
-        
-        <p>In the meantime, feel free and practice for your upcoming interview or assignment.</p>
-        """
-        cta_text = "View Application Status"
-        cta_link = "https://truthhire.in/my-applications"
-
-    # --- B. REJECTED TEMPLATE (Grey/Professional) ---
-    else: # status == 'rejected'
-        subject = f"Update on your application for {job_title}"
-        accent_color = "#64748B" # Slate Grey
-        headline = "Application Status"
-        email_content = f"""
-        <p>Dear {candidate_name},</p>
-        <p>Thank you for giving us the opportunity to review your application for the <strong>{job_title}</strong> role at {company_name}.</p>
-        <p>After careful consideration, we regret to inform you that we will not be moving forward with your application at this time. We received many qualified applicants, making this a difficult decision.</p>
-        <p>We will keep your resume in our talent pool and reach out if a role better suited to your skills opens up in the future.</p>
-        """
-        
-        # Add Specific Feedback if provided by Recruiter
-        if feedback:
-            email_content += f"""
-            <div style="margin-top: 24px; padding: 20px; background-color: #f8fafc; border-left: 4px solid {accent_color}; border-radius: 4px;">
-                <p style="margin: 0 0 8px; font-size: 11px; font-weight: 700; color: #64748b; text-transform: uppercase; letter-spacing: 1px;">Feedback from Hiring Team</p>
-                <p style="margin: 0; font-style: italic; color: #334155; line-height: 1.6;">"{feedback}"</p>
-            </div>
-            """
-            
-        email_content += "<p>We wish you the very best in your job search.</p>"
-        cta_text = "Browse Other Jobs"
-        cta_link = "https://truthhire.in/jobs"
-
-    # --- SHARED HTML WRAPPER ---
-    html_body = f"""
-    <!DOCTYPE html>
-    <html>
-    <body style="margin: 0; padding: 0; font-family: 'Segoe UI', Helvetica, Arial, sans-serif; background-color: #f4f4f5;">
-        <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #f4f4f5; padding: 40px 0;">
-            <tr>
-                <td align="center">
-                    <table width="600" cellpadding="0" cellspacing="0" style="background-color: #ffffff; border-radius: 8px; overflow: hidden; box-shadow: 0 4px 6px rgba(0,0,0,0.05);">
-                        <tr><td style="height: 6px; background-color: {accent_color};"></td></tr>
-                        
-                        <tr><td style="padding: 40px 40px 20px 40px; text-align: center; border-bottom: 1px solid #f0f0f0;">
-                            <h2 style="margin: 0; color: #1e293b; font-size: 24px; font-weight: 700;">{company_name}</h2>
-                            <p style="margin: 8px 0 0; color: {accent_color}; font-size: 14px; font-weight: 600; text-transform: uppercase; letter-spacing: 1px;">{headline}</p>
-                        </td></tr>
-                        
-                        <tr><td style="padding: 40px; color: #334155; font-size: 16px; line-height: 1.6;">
-                            {email_content}
-                            
-                            <div style="text-align: center; margin-top: 32px;">
-                                <a href="{cta_link}" style="display: inline-block; background-color: {accent_color}; color: #ffffff; padding: 12px 24px; border-radius: 6px; text-decoration: none; font-weight: 600; font-size: 14px;">{cta_text}</a>
-                            </div>
-                        </td></tr>
-                        
-                        <tr><td style="padding: 0 40px 40px 40px;">
-                            <p style="margin: 0; font-weight: 600; color: #1e293b;">{hr_name}</p>
-                            <p style="margin: 0; color: #64748b; font-size: 14px;">Talent Acquisition Team</p>
-                        </td></tr>
-                        
-                        <tr><td style="background-color: #f8fafc; padding: 20px; text-align: center; border-top: 1px solid #f0f0f0;">
-                            <p style="margin: 0; color: #94a3b8; font-size: 12px;">
-                                &copy; {current_year} {company_name} via TruthHire.
-                            </p>
-                        </td></tr>
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
-    """
+    # Shortlisted (green) / rejected (grey, with the recruiter's feedback if any)
+    subject, html_body = render_candidate_update_email(candidate_name, job_title, company_name, hr_name, status, feedback)
     
     # ✅ UPDATED: Send via Resend
-    send_email_via_resend(candidate_email, subject, html_body)
-
-def get_email_template(title, content, preheader=""):
-    return f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{title}</title>
-        <style>
-            body, table, td, a {{ -webkit-text-size-adjust: 100%; -ms-text-size-adjust: 100%; }}
-            table, td {{ mso-table-lspace: 0pt; mso-table-rspace: 0pt; }}
-            img {{ -ms-interpolation-mode: bicubic; border: 0; height: auto; line-height: 100%; outline: none; text-decoration: none; }}
-            @media screen and (max-width: 600px) {{
-                .email-container {{ width: 100% !important; }}
-                .mobile-padding {{ padding-left: 20px !important; padding-right: 20px !important; }}
-            }}
-        </style>
-    </head>
-    <body style="margin: 0; padding: 0; background-color: #f7f9fc; font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; color: #333333;">
-        <div style="display: none; font-size: 1px; color: #f7f9fc; line-height: 1px; max-height: 0px; max-width: 0px; opacity: 0; overflow: hidden;">{preheader}</div>
-        <table border="0" cellpadding="0" cellspacing="0" width="100%" style="background-color: #f7f9fc; padding: 40px 0;">
-            <tr><td align="center">
-                    <table class="email-container" border="0" cellpadding="0" cellspacing="0" width="600" style="background-color: #ffffff; border-radius: 16px; overflow: hidden; box-shadow: 0 4px 24px rgba(0,0,0,0.06); border: 1px solid #eaecf0;">
-                        <tr><td align="center" style="padding: 40px 0 30px 0; border-bottom: 1px solid #f0f2f5;">
-                                <a href="http://localhost:3000" style="text-decoration: none;">
-                                    <span style="font-size: 26px; font-weight: 800; color: #111827; letter-spacing: -0.5px;">TruthHire<span style="color: #2563eb;">.</span></span>
-                                </a>
-                            </td></tr>
-                        <tr><td class="mobile-padding" style="padding: 40px 50px;">{content}</td></tr>
-                        <tr><td style="background-color: #fafafa; padding: 30px 40px; border-top: 1px solid #f0f2f5; text-align: center;">
-                                <p style="margin: 0 0 10px; font-size: 12px; color: #6b7280; font-weight: 500; text-transform: uppercase; letter-spacing: 1px;">TruthHire Inc.</p>
-                                <p style="margin: 0 0 10px; font-size: 12px; color: #9ca3af; line-height: 1.5;">Hinjewadi Phase 1, Pune, MH, India.<br>Connecting Verified Talent with Verified Jobs.</p>
-                                <div style="margin-top: 15px;">
-                                    <a href="#" style="color: #2563eb; text-decoration: none; font-size: 12px; margin: 0 10px;">Privacy Policy</a>
-                                    <a href="#" style="color: #2563eb; text-decoration: none; font-size: 12px; margin: 0 10px;">Support</a>
-                                </div>
-                            </td></tr>
-                    </table>
-                    <table border="0" cellpadding="0" cellspacing="0" width="100%">
-                        <tr><td align="center" style="padding-top: 20px;"><p style="font-size: 12px; color: #9ca3af;">Sent with ❤️ to verify your career journey.</p></td></tr>
-                    </table>
-                </td></tr>
-        </table>
-    </body>
-    </html>
-    """
+    enqueue_email(candidate_email, subject, html_body)
 
 def send_welcome_email(email: str, name: str):
-    content_html = f"""
-    <p>Hi {name},</p>
-    <p>Your account has been successfully created. You now have access to India's first AI-powered platform designed to eliminate ghost jobs.</p>
-    
-    <div class="info-box">
-        <p style="margin: 0 0 12px; font-weight: 600; color: #1f2937;">Your Next Steps:</p>
-        <ol style="margin: 0; padding-left: 20px; color: #4b5563;">
-            <li style="margin-bottom: 8px;">Complete your profile to rank higher.</li>
-            <li style="margin-bottom: 8px;">Upload your resume for AI gap analysis.</li>
-            <li>Apply to "Verified" jobs with one click.</li>
-        </ol>
-    </div>
-    
-    <p>"The best way to predict the future is to create it." Let's get you hired.</p>
-    """
-
-    final_html = get_base_email_template(f"Welcome, {name}! 🎉", content_html, "Log In to Dashboard", "https://truthhire.in/login")
+    final_html = render_welcome_email(name)
 
     # ✅ UPDATED: Send via Resend
-    send_email_via_resend(email, "Welcome to the TruthHire Community", final_html)
+    enqueue_email(email, "Welcome to the TruthHire Community", final_html)
 
 def send_otp_email(email: str, otp: str, name: str = "User"):
-    content_html = f"""
-    <p>Hi {name},</p>
-    <p>You requested to sign in to your TruthHire account. Use the verification code below to complete your login:</p>
-    
-    <div style="text-align: center; margin: 32px 0;">
-        <div style="display: inline-block; background: linear-gradient(135deg, #2563eb 0%, #4f46e5 100%); padding: 20px 40px; border-radius: 12px; box-shadow: 0 4px 20px rgba(37, 99, 235, 0.3);">
-            <p style="margin: 0; font-size: 32px; font-weight: 800; color: #ffffff; letter-spacing: 8px; font-family: 'Courier New', monospace;">{otp}</p>
-        </div>
-    </div>
-    
-    <div style="background-color: #fef3c7; border-left: 4px solid #f59e0b; padding: 16px; border-radius: 8px; margin: 24px 0;">
-        <p style="margin: 0; font-size: 14px; color: #92400e; font-weight: 600;">⚠️ Security Notice</p>
-        <p style="margin: 4px 0 0; font-size: 13px; color: #b45309;">This code expires in 5 minutes. Never share this code with anyone.</p>
-    </div>
-    
-    <p style="font-size: 14px; color: #6b7280;">If you didn't request this code, please ignore this email or contact our support team.</p>
-    """
-
-    final_html = get_base_email_template("Your Login Code", content_html)
+    final_html = render_otp_email(otp, name)
 
     # ✅ UPDATED: Send via Resend
-    send_email_via_resend(email, f"Your TruthHire Login Code: {otp}", final_html)
+    enqueue_email(email, f"Your TruthHire Login Code: {otp}", final_html)
 
 def send_recruiter_otp_email(email: str, otp: str, name: str = "Recruiter"):
-    headline = "Verify Your Corporate Account"
-    
-    content_html = f"""
-    <p>Hi {name},</p>
-    <p>You are setting up a recruiter account on <strong>TruthHire</strong>. To verify your corporate identity, please use the code below.</p>
-    
-    <div style="text-align: center; margin: 32px 0;">
-        <div style="display: inline-block; background-color: #f3f4f6; border: 1px solid #d1d5db; padding: 20px 40px; border-radius: 8px;">
-            <p style="margin: 0; font-size: 32px; font-weight: 700; color: #111827; letter-spacing: 6px; font-family: monospace;">{otp}</p>
-        </div>
-    </div>
-    
-    <div style="background-color: #eff6ff; border-left: 4px solid #3b82f6; padding: 16px; border-radius: 4px; margin: 24px 0;">
-        <p style="margin: 0 0 4px; font-size: 14px; font-weight: 700; color: #1e40af;">🛡️ Security Check</p>
-        <p style="margin: 0; font-size: 14px; color: #1e3a8a;">
-            We use this step to ensure only verified employees from <strong>{email.split('@')[1]}</strong> can post jobs on TruthHire.
-        </p>
-    </div>
-    
-    <p style="font-size: 13px; color: #6b7280; margin-top: 24px;">
-        If you didn't request this code, please ignore this email. This code expires in 5 minutes.
-    </p>
-    """
-
-    final_html = get_base_email_template(headline, content_html)
+    final_html = render_recruiter_otp_email(email, otp, name)
 
     # ✅ UPDATED: Send via Resend
-    send_email_via_resend(email, f"{otp} is your verification code", final_html)
+    enqueue_email(email, f"{otp} is your verification code", final_html)
 
 def send_login_success_email(email: str, name: str):
-    content_html = f"""
-    <p>Hi {name},</p>
-    <p>Your account was successfully accessed. Welcome back to TruthHire!</p>
-    
-    <div style="background-color: #f0fdf4; border-left: 4px solid #10b981; padding: 16px; border-radius: 8px; margin: 24px 0;">
-        <p style="margin: 0; font-size: 14px; color: #065f46; font-weight: 600;">✓ Login Successful</p>
-        <p style="margin: 4px 0 0; font-size: 13px; color: #047857;">Time: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
-    </div>
-    
-    <p style="font-size: 14px; color: #6b7280;">If this wasn't you, please secure your account immediately by changing your password.</p>
-    """
-
-    final_html = get_base_email_template("Login Successful", content_html, "Go to Dashboard", "https://truthhire.in/dashboard")
+    final_html = render_login_success_email(name)
 
     # ✅ UPDATED: Send via Resend
-    send_email_via_resend(email, "Login Successful - TruthHire", final_html)
+    enqueue_email(email, "Login Successful - TruthHire", final_html)
 
 def send_candidate_confirmation_email(candidate_email: str, candidate_name: str, job_title: str, company_name: str):
-    # Current Year for Footer
-    year = datetime.now().year
-    company_initial = company_name[0].upper() if company_name else "C"
-
-    html_body = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Application Submitted</title>
-        <style>
-            body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; background-color: #f3f4f6; margin: 0; padding: 0; color: #1f2937; }}
-            .container {{ max-width: 600px; margin: 0 auto; background-color: #ffffff; }}
-            .header {{ padding: 24px; border-bottom: 1px solid #e5e7eb; text-align: left; }}
-            .logo {{ font-size: 20px; font-weight: 800; color: #111827; letter-spacing: -0.5px; text-decoration: none; }}
-            .logo span {{ color: #2563eb; }}
-            .content {{ padding: 40px 24px; }}
-            .job-card {{ border: 1px solid #e5e7eb; border-radius: 8px; padding: 20px; margin: 24px 0; background-color: #ffffff; display: flex; align-items: center; }}
-            .company-logo {{ width: 48px; height: 48px; background-color: #f3f4f6; border-radius: 8px; display: flex; align-items: center; justify-content: center; font-size: 20px; font-weight: bold; color: #6b7280; margin-right: 16px; }}
-            .btn {{ display: inline-block; background-color: #2563eb; color: #111827; padding: 12px 24px; border-radius: 6px; text-decoration: none; font-weight: 600; font-size: 14px; margin-top: 24px; }}
-            .footer {{ background-color: #f9fafb; padding: 24px; text-align: center; font-size: 12px; color: #6b7280; border-top: 1px solid #e5e7eb; }}
-            .link {{ color: #2563eb; text-decoration: none; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <a href="https://truthhire.in" class="logo">TruthHire<span>.</span></a>
-            </div>
-
-            <div class="content">
-                <h1 style="margin: 0 0 16px; font-size: 24px; color: #111827;">Application submitted!</h1>
-                <p style="margin: 0; font-size: 16px; line-height: 1.6; color: #4b5563;">
-                    Good news, {candidate_name}. Your application for <strong>{job_title}</strong> was successfully sent to the hiring team at <strong>{company_name}</strong>.
-                </p>
-
-                <table width="100%" cellpadding="0" cellspacing="0" style="margin: 24px 0; border: 1px solid #e5e7eb; border-radius: 12px; overflow: hidden;">
-                    <tr>
-                        <td style="padding: 20px; background-color: #ffffff;">
-                            <table width="100%" cellpadding="0" cellspacing="0">
-                                <tr>
-                                    <td width="60" valign="middle">
-                                        <div style="width: 48px; height: 48px; background-color: #f3f4f6; border-radius: 8px; color: #6b7280; font-size: 20px; font-weight: bold; line-height: 48px; text-align: center;">
-                                            {company_initial}
-                                        </div>
-                                    </td>
-                                    <td valign="middle">
-                                        <h3 style="margin: 0 0 4px; font-size: 16px; font-weight: 600; color: #111827;">{job_title}</h3>
-                                        <p style="margin: 0; font-size: 14px; color: #6b7280;">{company_name}</p>
-                                    </td>
-                                </tr>
-                            </table>
-                        </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 12px 20px; background-color: #f9fafb; border-top: 1px solid #e5e7eb;">
-                            <p style="margin: 0; font-size: 13px; color: #6b7280;">
-                                <span style="color: #10b981; font-weight: 600;">✓ Sent</span> via TruthHire Easy Apply
-                            </p>
-                        </td>
-                    </tr>
-                </table>
-
-                <p style="margin: 0; font-size: 14px; color: #4b5563;">
-                    We will notify you if the recruiter views your application or shortlists you. Good luck!
-                </p>
-
-                <div style="text-align: center;">
-                    <a href="https://truthhire.in/jobs" class="btn">Browse Similar Jobs</a>
-                </div>
-            </div>
-
-            <div class="footer">
-                <p style="margin-bottom: 12px;">
-                    &copy; {year} TruthHire Inc. &middot; Pune, Maharashtra, India
-                </p>
-                <p>
-                    You received this email because you applied to a job on TruthHire.
-                    <br>
-                    <a href="#" class="link">Job Seeker Support</a> &middot; <a href="#" class="link">Privacy Policy</a>
-                </p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    html_body = render_candidate_confirmation_email(candidate_name, job_title, company_name)
     
     # ✅ UPDATED: Send via Resend
-    send_email_via_resend(candidate_email, f"Application sent: {job_title}", html_body)
+    enqueue_email(candidate_email, f"Application sent: {job_title}", html_body)
 
 def send_waitlist_confirmation_email(email: str, category: str, position: int):
-    headline = f"You are #{position} on the list!"
-    
-    content_html = f"""
-    <p>Hi there,</p>
-    <p>Thanks for your interest in <strong>{category}</strong> jobs on TruthHire.</p>
-    <p>You have been added to our priority waitlist. We are currently verifying top employers in this sector to ensure you only see legitimate, high-quality opportunities.</p>
-    
-    <div style="background-color: #f0fdf4; border: 1px solid #bbf7d0; border-radius: 8px; padding: 20px; margin: 24px 0; text-align: center;">
-        <p style="margin: 0; font-size: 24px; font-weight: 800; color: #166534;">#{position}</p>
-        <p style="margin: 4px 0 0; font-size: 13px; color: #15803d; font-weight: 600;">Your Priority Queue Position</p>
-    </div>
-    
-    <p>We will notify you as soon as the first batch of verified jobs goes live.</p>
-    """
-
-    final_html = get_base_email_template(headline, content_html)
+    final_html = render_waitlist_confirmation_email(category, position)
 
     # ✅ UPDATED: Send via Resend
-    send_email_via_resend(email, f"You're #{position} on the list! ({category} Jobs)", final_html)
+    enqueue_email(email, f"You're #{position} on the list! ({category} Jobs)", final_html)
         
 
-# ===========================
-# 📧 UNIFIED EMAIL TEMPLATE SYSTEM
-# ===========================
-
-def get_base_email_template(headline, content_html, cta_text=None, cta_link=None):
-    """
-    Unified Design System based on the provided reference.
-    Used by all email functions to ensure 100% consistency.
-    """
-    
-    # CTA Button Logic
-    cta_section = ""
-    if cta_text and cta_link:
-        cta_section = f"""
-        <div style="text-align: center; margin-top: 32px;">
-            <a href="{cta_link}" style="display: inline-block; background-color: #2563eb; color: #ffffff; padding: 12px 24px; border-radius: 6px; text-decoration: none; font-weight: 600; font-size: 14px;">
-                {cta_text}
-            </a>
-        </div>
-        """
-
-    return f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <style>
-            body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; background-color: #f3f4f6; margin: 0; padding: 0; color: #1f2937; }}
-            .container {{ max-width: 600px; margin: 0 auto; background-color: #ffffff; }}
-            .header {{ padding: 24px; border-bottom: 1px solid #e5e7eb; text-align: left; }}
-            .logo {{ font-size: 20px; font-weight: 800; color: #111827; letter-spacing: -0.5px; text-decoration: none; }}
-            .logo span {{ color: #2563eb; }}
-            .content {{ padding: 40px 24px; }}
-            .footer {{ background-color: #f9fafb; padding: 24px; text-align: center; font-size: 12px; color: #6b7280; border-top: 1px solid #e5e7eb; }}
-            .link {{ color: #2563eb; text-decoration: none; }}
-            h1 {{ margin: 0 0 16px; font-size: 24px; color: #111827; font-weight: 700; }}
-            p {{ margin: 0 0 16px; font-size: 16px; line-height: 1.6; color: #4b5563; }}
-            ul {{ margin: 0 0 24px; padding-left: 20px; }}
-            li {{ margin-bottom: 8px; font-size: 15px; color: #4b5563; line-height: 1.5; }}
-            .info-box {{ background-color: #f9fafb; border: 1px solid #e5e7eb; border-radius: 8px; padding: 20px; margin: 24px 0; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <a href="http://localhost:3000" class="logo">TruthHire<span>.</span></a>
-            </div>
-
-            <div class="content">
-                <h1 style="margin: 0 0 16px; font-size: 24px; color: #111827;">{headline}</h1>
-                
-                {content_html}
-                
-                {cta_section}
-            </div>
-
-            <div class="footer">
-                <p style="margin-bottom: 12px;">
-                    &copy; {datetime.now().year} TruthHire Inc. &middot; Pune, Maharashtra, India
-                </p>
-                <p>
-                    <a href="#" class="link">Support</a> &middot; <a href="#" class="link">Privacy Policy</a>
-                </p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-
 def send_recruiter_status_email(email: str, name: str, status: str):
-    subject = ""
-    headline = ""
-    content_html = ""
-    cta_text = None
-    cta_link = None
-
-    if status == "pending":
-        subject = "Action Required: Account Verification Pending"
-        headline = "Verification in Progress ⏳"
-        content_html = f"""
-        <p>Hi {name},</p>
-        <p>Thank you for joining TruthHire. Since you signed up using a public email domain (Gmail/Yahoo), your account has been placed in our <strong>Trust & Safety Queue</strong>.</p>
-        
-        <div style="background-color: #fff7ed; border: 1px solid #ffedd5; border-radius: 8px; padding: 20px; margin: 24px 0;">
-            <h3 style="margin: 0 0 12px; font-size: 16px; color: #9a3412;">What happens next?</h3>
-            <ul style="margin: 0; padding-left: 20px; color: #7c2d12;">
-                <li style="margin-bottom: 8px;">Our team will review your LinkedIn profile to verify your employment.</li>
-                <li style="margin-bottom: 8px;">This process typically takes <strong>2-4 hours</strong> during business days.</li>
-                <li>You will receive an email immediately once approved.</li>
-            </ul>
-        </div>
-        
-        <p style="font-size: 14px; color: #6b7280;">While you wait, you can still log in and draft job posts, but they will not go live until verified.</p>
-        """
-        cta_text = "Login to Dashboard"
-        cta_link = "https://truthhire.in/recruiter/login"
-
-    elif status == "verified":
-        subject = "Welcome! Your Recruiter Account is Verified"
-        headline = "You are Verified! ✅"
-        content_html = f"""
-        <p>Hi {name},</p>
-        <p>Great news! Your identity has been verified. You now have full access to TruthHire's recruitment suite.</p>
-        
-        <div style="margin: 24px 0;">
-            <p style="margin-bottom: 8px;"><strong>🚀 You can now:</strong></p>
-            <ul style="margin: 0; padding-left: 20px; color: #374151;">
-                <li style="margin-bottom: 6px;">Post unlimited "Verified" jobs.</li>
-                <li style="margin-bottom: 6px;">Access candidate contact details.</li>
-                <li>Use AI to rank applicants automatically.</li>
-            </ul>
-        </div>
-        """
-        cta_text = "Post Your First Job"
-        cta_link = "https://truthhire.in/recruiter/dashboard"
-
-    elif status == "rejected":
-        subject = "Update on your TruthHire Account"
-        headline = "Verification Unsuccessful"
-        content_html = f"""
-        <p>Hi {name},</p>
-        <p>We verified your profile but could not confirm your employment details based on the information provided.</p>
-        
-        <div style="background-color: #fef2f2; border-left: 4px solid #ef4444; padding: 16px; border-radius: 4px; margin: 24px 0;">
-            <p style="margin: 0; font-size: 14px; font-weight: 700; color: #991b1b;">Why?</p>
-            <p style="margin: 4px 0 0; font-size: 14px; color: #b91c1c;">
-                We require a LinkedIn profile that clearly matches the company name used during signup to prevent fraud.
-            </p>
-        </div>
-        
-        <p>If you believe this is a mistake, please reply to this email with your official ID card or an offer letter.</p>
-        """
-
-    final_html = get_base_email_template(headline, content_html, cta_text, cta_link)
+    subject, final_html = render_recruiter_status_email(name, status)
 
     # ✅ UPDATED: Send via Resend
-    send_email_via_resend(email, subject, final_html)
+    enqueue_email(email, subject, final_html)
 
 def send_reset_success_email(email: str, name: str):
-    content_html = f"""
-    <p>Hi {name},</p>
-    <p>Your password has been successfully reset.</p>
-    
-    <div style="background-color: #f0fdf4; border-left: 4px solid #10b981; padding: 16px; border-radius: 8px; margin: 24px 0;">
-        <p style="margin: 0; font-size: 14px; color: #065f46; font-weight: 600;">✓ Security Update</p>
-        <p style="margin: 4px 0 0; font-size: 13px; color: #047857;">If you did not make this change, please contact support immediately.</p>
-    </div>
-    
-    <p style="font-size: 14px; color: #6b7280;">You can now log in with your new password.</p>
-    """
-
-    final_html = get_base_email_template("Password Changed", content_html, "Login Now", "https://truthhire.in/login")
-    send_email_via_resend(email, "Security Alert: Password Changed", final_html)
+    final_html = render_reset_success_email(name)
+    enqueue_email(email, "Security Alert: Password Changed", final_html)
 
 # ==========================================
 # 📢 MARKETING & RETENTION EMAILS
@@ -1233,52 +733,16 @@ def send_profile_completion_reminder(email: str, name: str, missing_fields: list
     Naukri-style 'Incomplete Profile' Nudge.
     Triggers when a user has no resume, location, or skills.
     """
-    subject = f"Recruiters are searching, but they can't find you, {name.split()[0]}"
-    headline = "Your profile is getting invisible 👻"
-    
-    missing_str = ", ".join(missing_fields).title()
-    
-    content_html = f"""
-    <p>Hi {name},</p>
-    <p>We noticed you started setting up your profile on TruthHire but didn't finish. <strong>Recruiters search by skills and resumes</strong>, not just names.</p>
-    
-    <div style="background-color: #fff1f2; border-left: 4px solid #f43f5e; padding: 16px; border-radius: 4px; margin: 24px 0;">
-        <p style="margin: 0 0 8px; font-size: 14px; font-weight: 700; color: #9f1239;">⚠️ Missing Information</p>
-        <p style="margin: 0; font-size: 14px; color: #881337;">
-            You are missing: <strong>{missing_str}</strong>.
-        </p>
-    </div>
-    
-    <p>Profiles with a resume and skills get <strong>5x more visibility</strong> and higher trust scores.</p>
-    """
-
-    final_html = get_base_email_template(headline, content_html, "Complete Profile Now", "https://truthhire.in/dashboard/profile")
-    send_email_via_resend(email, subject, final_html)
+    subject, final_html = render_profile_completion_reminder(name, missing_fields)
+    enqueue_email(email, subject, final_html)
 
 def send_truth_score_nudge(email: str, name: str):
     """
     LinkedIn-style 'Feature Adoption' Nudge.
     Triggers when a user has applied to 0 jobs or has avg_match_score = 0.
     """
-    subject = "Why you might be getting ghosted (and how to fix it)"
-    headline = "Stop Applying Blindly 🛑"
-    
-    content_html = f"""
-    <p>Hi {name},</p>
-    <p>We noticed you haven't checked your <strong>Truth Score</strong> yet. Applying to jobs without knowing if you match is the #1 reason candidates get rejected.</p>
-    
-    <div style="background-color: #eff6ff; border: 1px solid #bfdbfe; border-radius: 8px; padding: 20px; margin: 24px 0; text-align: center;">
-        <p style="margin: 0 0 8px; font-size: 18px; font-weight: 700; color: #1e3a8a;">Your Truth Score: <span style="color: #9ca3af;">Pending...</span></p>
-        <p style="margin: 0; font-size: 13px; color: #1e40af;">
-            Upload your resume against any job description to see your % chance of hiring instantly.
-        </p>
-    </div>
-    
-    <p>It takes 10 seconds and prevents "Ghost Jobs."</p>
-    """
-
-    final_html = get_base_email_template(headline, content_html, "Check My Score", "https://truthhire.in/jobs")
-    send_email_via_resend(email, subject, final_html)
+    subject, final_html = render_truth_score_nudge(name)
+    enqueue_email(email, subject, final_html)
 
 class FeedbackRequest(BaseModel):
     job_id: str
@@ -1291,18 +755,11 @@ class FeedbackRequest(BaseModel):
 @app.post("/feedback/ai-analysis")
 def submit_ai_feedback(
     data: FeedbackRequest, 
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    principal: Principal = Depends(get_principal),
     db: Session = Depends(get_db)
 ):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = int(payload.get("sub"))
-    except:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
     new_feedback = AIFeedback(
-        user_id=user_id,
+        user_id=principal.id,
         job_id=data.job_id,
         resume_text_snapshot=data.resume_text,
         job_desc_snapshot=data.job_desc,
@@ -1317,72 +774,40 @@ def submit_ai_feedback(
     return {"message": "Feedback recorded. Thank you for making TruthHire smarter!"}
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        role = payload.get("role")
-        
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        if role == "student":
-            user = db.query(User).filter(User.id == int(user_id)).first()
-            if not user:
-                raise HTTPException(status_code=401, detail="User not found")
-            return user
-        elif role == "recruiter":
-            recruiter = db.query(Recruiter).filter(Recruiter.id == int(user_id)).first()
-            if not recruiter:
-                raise HTTPException(status_code=401, detail="Recruiter not found")
-            return recruiter
-        else:
-            raise HTTPException(status_code=401, detail="Invalid role")
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
+# Kept as the generic "who is calling" dependency; resolves to the cached principal, not the DB row
+get_current_user = get_principal
+
 # --- CUSTOM RECRUITER DEPENDENCY ---
 def get_current_recruiter_custom(
-    credentials: HTTPAuthorizationCredentials = Depends(security), 
+    principal: Principal = Depends(get_recruiter_principal),
     db: Session = Depends(get_db)
 ):
-    token = credentials.credentials
-    try:
-        # Verify JWT Token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        recruiter_id: str = payload.get("sub")
-        role: str = payload.get("role")
-        
-        if role != "recruiter" or not recruiter_id:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-            
-        recruiter = db.query(Recruiter).filter(Recruiter.id == int(recruiter_id)).first()
-        if not recruiter:
-            raise HTTPException(status_code=401, detail="Recruiter account not found")
-            
-        return recruiter
-        
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    recruiter = db.query(Recruiter).filter(Recruiter.id == principal.id).first()
+    if not recruiter:
+        raise HTTPException(status_code=401, detail="Recruiter account not found")
+    return recruiter
     
 class RecruiterLogin(BaseModel):
     email: str
     password: str
 
 @app.post("/recruiters/login")
-def login_recruiter(data: RecruiterLogin, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    # 1. Find Recruiter by Email
-    recruiter = db.query(Recruiter).filter(Recruiter.official_email == data.email).first()
+async def login_recruiter(data: RecruiterLogin, db: Session = Depends(get_db)):
+    # 1. Find Recruiter by Email (DB work in the threadpool, bcrypt awaited on its own executor)
+    recruiter = await run_in_threadpool(db.query(Recruiter).filter(Recruiter.official_email == data.email).first)
     
     # 2. Validate Password
     if not recruiter:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
         
-    if not bcrypt.checkpw(data.password.encode('utf-8'), recruiter.password_hash.encode('utf-8')):
+    if not await verify_password_async(data.password, recruiter.password_hash):
         raise HTTPException(status_code=401, detail="Incorrect email or password")
+    rehashed = await rehash_if_needed_async(recruiter, data.password)
+    return await run_in_threadpool(_complete_recruiter_login, db, recruiter, data.email, rehashed)
+
+def _complete_recruiter_login(db: Session, recruiter: Recruiter, email: str, rehashed: bool) -> dict:
+    if rehashed:
+        db.commit()
     
     # 3. Check Verification Status
     if recruiter.verification_status == "rejected":
@@ -1396,7 +821,7 @@ def login_recruiter(data: RecruiterLogin, background_tasks: BackgroundTasks, db:
         )
 
     # 5. Check if official domain - require OTP
-    email_clean = data.email.strip().lower()
+    email_clean = email.strip().lower()
     domain = email_clean.split('@')[1]
     
     public_domains = [
@@ -1407,18 +832,14 @@ def login_recruiter(data: RecruiterLogin, background_tasks: BackgroundTasks, db:
     
     if domain not in public_domains:
         # Official domain - send OTP
-        otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-        OTP_STORE[email_clean] = {
-            'otp': otp,
-            'expires_at': datetime.now() + timedelta(seconds=OTP_EXPIRY_SECONDS),
+        otp = otp_store.issue(email_clean, 'recruiter_login', {
             'recruiter_id': recruiter.id,
             'name': recruiter.name,
             'company_name': recruiter.company_name,
-            'is_verified': recruiter.is_verified,
-            'type': 'recruiter_login'
-        }
+            'is_verified': recruiter.is_verified
+        })
         
-        background_tasks.add_task(send_recruiter_otp_email, email_clean, otp, recruiter.name)
+        send_recruiter_otp_email(email_clean, otp, recruiter.name)
         
         return {
             "message": "OTP sent to your email",
@@ -1441,123 +862,83 @@ def login_recruiter(data: RecruiterLogin, background_tasks: BackgroundTasks, db:
 
 @app.get("/recruiters/me")
 def get_current_recruiter(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    principal: Principal = Depends(get_recruiter_principal),
     db: Session = Depends(get_db)
 ):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        recruiter_id = payload.get("sub")
-        role = payload.get("role")
+    recruiter = db.query(Recruiter).filter(Recruiter.id == principal.id).first()
+    if not recruiter:
+        raise HTTPException(status_code=401, detail="Recruiter not found")
         
-        if role != "recruiter" or not recruiter_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-            
-        recruiter = db.query(Recruiter).filter(Recruiter.id == int(recruiter_id)).first()
-        if not recruiter:
-            raise HTTPException(status_code=401, detail="Recruiter not found")
-            
-        return {
-            "id": recruiter.id,
-            "name": recruiter.name,
-            "company_name": recruiter.company_name,
-            "email": recruiter.official_email,
-            "verification_status": recruiter.verification_status,
-            "is_verified": recruiter.is_verified
-        }
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    return {
+        "id": recruiter.id,
+        "name": recruiter.name,
+        "company_name": recruiter.company_name,
+        "email": recruiter.official_email,
+        "verification_status": recruiter.verification_status,
+        "is_verified": recruiter.is_verified
+    }
 
 @app.get("/candidate/me")
 def get_current_candidate(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    principal: Principal = Depends(get_student_principal),
     db: Session = Depends(get_db)
 ):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        role = payload.get("role")
-        
-        if role != "student" or not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-            
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        
-        # Fetch related data
-        projects = db.query(Project).filter(Project.user_id == user.id).all()
-        skill_gaps = db.query(SkillGap).filter(SkillGap.user_id == user.id)\
-            .order_by(SkillGap.frequency.desc()).limit(5).all()
-        
-        # ✅ FIX 1: Use actual URL string (Python string), NOT JavaScript code
-        resume_url = None
-        if user.resume_filename:
-            if user.resume_filename.startswith("http"):
-                # It is already a full Supabase URL -> Use it directly
-                resume_url = user.resume_filename
-            else:
-                # It is an old local file -> Add the path
-                base_url = "https://truthhire-api.onrender.com"
-                resume_url = f"{base_url}/static/resumes/{user.resume_filename}"
-            
-        return {
-            "id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "phone": user.phone,
-            "location": user.location,
-            "headline": user.headline,
-            "bio": user.bio,
-            "github_url": user.github_url,
-            "linkedin_url": user.linkedin_url,
-            "portfolio_url": user.portfolio_url,
-            "skills": user.skills,
-            "education": user.education,
-            "experiences": user.experiences,
-            "total_experience": user.total_experience,
-            "current_salary": user.current_salary,
-            "expected_salary": user.expected_salary,
-            "notice_period": user.notice_period,
-            "resume_filename": user.resume_filename,
-            "resume_url": resume_url,
-            "resume_text": user.resume_text,
-            "profile_image": getattr(user, 'profile_image', None),
-            "skill_gaps": [{"skill_name": s.skill_name, "frequency": s.frequency} for s in skill_gaps],
-            "projects": [{"id": p.id, "title": p.title, "description": p.description, "tech_stack": p.tech_stack, "live_link": p.live_link, "github_link": p.github_link} for p in projects]
-        }
+    user = db.query(User).filter(User.id == principal.id).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
 
-    # ✅ FIX 2: Catch the correct exception for PyJWT
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.PyJWTError:  # <--- Changed from jwt.JWTError to jwt.PyJWTError
-        raise HTTPException(status_code=401, detail="Invalid token")
-    except Exception as e:
-        print(f"Auth Error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication failed")
+    # Fetch related data
+    projects = db.query(Project).filter(Project.user_id == user.id).all()
+    skill_gaps = db.query(SkillGap).filter(SkillGap.user_id == user.id)\
+        .order_by(SkillGap.frequency.desc()).limit(5).all()
+
+    # ✅ FIX 1: Use actual URL string (Python string), NOT JavaScript code
+    resume_url = None
+    if user.resume_filename:
+        if user.resume_filename.startswith("http"):
+            # It is already a full Supabase URL -> Use it directly
+            resume_url = user.resume_filename
+        else:
+            # It is an old local file -> Add the path
+            base_url = "https://truthhire-api.onrender.com"
+            resume_url = f"{base_url}/static/resumes/{user.resume_filename}"
+
+    return {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "phone": user.phone,
+        "location": user.location,
+        "headline": user.headline,
+        "bio": user.bio,
+        "github_url": user.github_url,
+        "linkedin_url": user.linkedin_url,
+        "portfolio_url": user.portfolio_url,
+        "skills": user.skills,
+        "education": user.education,
+        "experiences": user.experiences,
+        "total_experience": user.total_experience,
+        "current_salary": user.current_salary,
+        "expected_salary": user.expected_salary,
+        "notice_period": user.notice_period,
+        "resume_filename": user.resume_filename,
+        "resume_url": resume_url,
+        "resume_text": user.resume_text,
+        "profile_image": getattr(user, 'profile_image', None),
+        "profile_image_urls": profile_image_urls(getattr(user, 'profile_image', None)),
+        "skill_gaps": [{"skill_name": s.skill_name, "frequency": s.frequency} for s in skill_gaps],
+        "projects": [{"id": p.id, "title": p.title, "description": p.description, "tech_stack": p.tech_stack, "live_link": p.live_link, "github_link": p.github_link} for p in projects]
+    }
 
 @app.get("/candidate/applications")
 def get_my_applications(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    principal: Principal = Depends(get_student_principal),
     db: Session = Depends(get_db)
 ):
-    token = credentials.credentials
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        role = payload.get("role")
-        
-        if role != "student" or not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-            
-        user_id = int(user_id)
-        
-        job_apps = db.query(JobApplication).filter(JobApplication.user_id == user_id).all()
+        job_apps = db.query(JobApplication).filter(JobApplication.user_id == principal.id).all()
         results = []
-        
+
         for app in job_apps:
             job_data = {
                 "id": "0", 
@@ -1566,7 +947,7 @@ def get_my_applications(
                 "location": "Remote", 
                 "salary": "Not disclosed"
             }
-            
+
             r_job = db.query(Job).filter(Job.id == app.job_id).first()
             if r_job:
                 salary = None
@@ -1574,7 +955,7 @@ def get_my_applications(
                     salary = f"{r_job.currency} {r_job.salary_min:,} - {r_job.salary_max:,}"
                 elif r_job.salary_min:
                     salary = f"{r_job.currency} {r_job.salary_min:,}"
-                
+
                 job_data = {
                     "id": str(r_job.id), 
                     "title": r_job.title, 
@@ -1591,13 +972,9 @@ def get_my_applications(
                 "interview_attempts": app.interview_attempts or 0,
                 "job": job_data
             })
-            
+
         return sorted(results, key=lambda x: x['applied_at'], reverse=True)
 
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except Exception as e:
         print(f"Error fetching apps: {e}")
         raise HTTPException(status_code=500, detail="Server Error")
@@ -1617,148 +994,8 @@ class VerificationUpdate(BaseModel):
 # 📧 DAILY JOB ALERT SYSTEM (Glassdoor Style)
 # ==========================================
 
-def generate_daily_jobs_email(user_name, jobs):
-    """
-    Generates a LinkedIn/Indeed-style Professional Job Alert Email.
-    Features: Card layout, Skill badges, clear CTAs, and responsive design.
-    """
-    job_cards_html = ""
-    
-    for job in jobs:
-        # Data Preparation
-        title = job.get('title')
-        company = job.get('company')
-        location = job.get('location')
-        salary = job.get('salary', 'Not disclosed')
-        job_id = job.get('id')
-        
-        # Skill Badges (Max 3)
-        skills_raw = job.get('skills', '').split(',')
-        skill_badges = ""
-        for s in skills_raw[:3]:
-            if s.strip():
-                skill_badges += f'<span style="display:inline-block; background-color:#f0f9ff; color:#0369a1; font-size:11px; padding:3px 8px; border-radius:4px; margin-right:5px; border:1px solid #bae6fd;">{s.strip().title()}</span>'
-        
-        # Links
-        apply_link = f"http://localhost:3000/jobs/{job_id}" 
-        company_initial = company[0].upper() if company else "C"
-
-        job_cards_html += f"""
-        <table width="100%" cellpadding="0" cellspacing="0" style="background-color:#ffffff; border:1px solid #e5e7eb; border-radius:8px; margin-bottom:16px; border-collapse:separate;">
-            <tr>
-                <td style="padding:20px;">
-                    <table width="100%" cellpadding="0" cellspacing="0">
-                        <tr>
-                            <td width="50" valign="top" style="padding-right:15px;">
-                                <div style="width:40px; height:40px; background-color:#f3f4f6; border-radius:6px; color:#6b7280; font-size:18px; font-weight:bold; line-height:40px; text-align:center;">
-                                    {company_initial}
-                                </div>
-                            </td>
-                            <td valign="top">
-                                <h3 style="margin:0 0 4px 0; font-size:16px; font-weight:600; line-height:1.3;">
-                                    <a href="{apply_link}" style="color:#2563eb; text-decoration:none;">{title}</a>
-                                </h3>
-                                <p style="margin:0 0 8px 0; font-size:13px; color:#374151;">
-                                    <strong>{company}</strong> &bull; <span style="color:#6b7280;">{location}</span>
-                                </p>
-                                
-                                <div style="margin-bottom:12px;">
-                                    <span style="display:inline-block; font-size:12px; color:#4b5563; background-color:#f9fafb; padding:2px 6px; border-radius:4px; border:1px solid #e5e7eb; margin-right:5px;">
-                                        💰 {salary}
-                                    </span>
-                                </div>
-                                <div style="margin-bottom:15px;">
-                                    {skill_badges}
-                                </div>
-                            </td>
-                        </tr>
-                        <tr>
-                            <td colspan="2" style="padding-top:10px; border-top:1px dashed #e5e7eb; text-align:right;">
-                                <a href="{apply_link}" style="display:inline-block; background-color:#2563eb; color:#ffffff; font-size:13px; font-weight:600; padding:8px 20px; border-radius:4px; text-decoration:none;">View Job</a>
-                            </td>
-                        </tr>
-                    </table>
-                </td>
-            </tr>
-        </table>
-        """
-
-    html_body = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Daily Job Alerts</title>
-        <style type="text/css">
-            body {{ margin: 0; padding: 0; font-family: 'Segoe UI', Helvetica, Arial, sans-serif; background-color: #f3f4f6; color: #1f2937; }}
-            a {{ color: #2563eb; text-decoration: none; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ text-align: center; padding: 20px 0; }}
-            .footer {{ text-align: center; padding: 20px 0; font-size: 12px; color: #9ca3af; }}
-            .btn-primary {{ background-color: #2563eb; color: #ffffff; padding: 10px 20px; border-radius: 6px; font-weight: 600; text-decoration: none; }}
-        </style>
-    </head>
-    <body style="background-color: #f3f4f6;">
-        <div class="container">
-            
-            <div class="header">
-                <table width="100%" cellpadding="0" cellspacing="0">
-                    <tr>
-                        <td align="center">
-                            <span style="font-size: 22px; font-weight: 800; color: #111827; letter-spacing: -0.5px;">TruthHire<span style="color: #2563eb;">.</span></span>
-                        </td>
-                    </tr>
-                </table>
-            </div>
-
-            <div style="background-color: #ffffff; padding: 24px; border-radius: 8px; border: 1px solid #e5e7eb; margin-bottom: 20px; text-align: center;">
-                <h2 style="margin: 0 0 8px 0; font-size: 18px; color: #111827;">Jobs for you, {user_name}</h2>
-                <p style="margin: 0; font-size: 14px; color: #6b7280;">
-                    We found <strong>{len(jobs)} new jobs</strong> matching your preferences based on your profile and activity.
-                </p>
-            </div>
-
-            {job_cards_html}
-
-            <div style="text-align: center; margin: 30px 0;">
-                <a href="http://localhost:3000/jobs" style="background-color: #111827; color: #ffffff; padding: 12px 24px; border-radius: 6px; font-weight: 600; font-size: 14px; text-decoration: none; display: inline-block;">
-                    See all matching jobs
-                </a>
-            </div>
-
-            <div class="footer">
-                <p style="margin-bottom: 10px;">
-                    <strong>Why am I getting this?</strong><br>
-                    You have job alerts enabled for your profile on TruthHire.
-                </p>
-                <p>
-                    <a href="#" style="color: #6b7280; text-decoration: underline;">Update Preferences</a> &bull; 
-                    <a href="#" style="color: #6b7280; text-decoration: underline;">Unsubscribe</a>
-                </p>
-                <p style="margin-top: 20px;">&copy; 2026 TruthHire Inc. Pune, India.</p>
-            </div>
-
-        </div>
-    </body>
-    </html>
-    """
-    return html_body
-
-async def send_email_async(smtp_client, recipient, subject, html_content):
-    message = MIMEText(html_content, 'html')
-    message['From'] = f"TruthHire Job Alerts <{os.getenv('MAIL_USER')}>"
-    message['To'] = recipient
-    message['Subject'] = subject
-
-    try:
-        await smtp_client.send_message(message)
-        return True
-    except Exception as e:
-        print(f"❌ Failed to send to {recipient}: {e}")
-        return False
-    
-# Daily job alerts disabled - enable only when needed
+# Digests are built in batches by backend/job_alerts.py (python -m backend.job_alerts);
+# set DAILY_JOB_ALERTS_ENABLED=true to schedule them inside the API (see lifespan)
 
 # ===========================
 # 🚀 API ENDPOINTS
@@ -1767,34 +1004,13 @@ async def send_email_async(smtp_client, recipient, subject, html_content):
 @app.post("/parse-resume")
 async def parse_resume(file: UploadFile = File(...)):
     try:
-        content = await file.read()
-        text = ""
-        
-        if file.filename.lower().endswith('.pdf'):
-            try:
-                with pdfplumber.open(io.BytesIO(content)) as pdf:
-                    for page in pdf.pages:
-                        extracted = page.extract_text(x_tolerance=2) 
-                        if extracted: text += extracted + "\n"
-            except Exception:
-                pass
-            
-            if len(text.strip()) < 50:
-                try:
-                    import pypdf
-                    pdf = pypdf.PdfReader(io.BytesIO(content))
-                    for page in pdf.pages:
-                        extracted = page.extract_text()
-                        if extracted: text += extracted + "\n"
-                except ImportError:
-                    print("⚠️ Install pypdf: pip install pypdf")
-                except Exception:
-                    pass
-        else:
-            text = content.decode('utf-8', errors='ignore')
-
+        upload = await receive_upload(file, RESUME_MAX_UPLOAD_BYTES)
+        # Cached by content hash; on a miss the file is parsed in the process pool
+        text = (await extract_resume_text(upload)).text
         text = " ".join(text.split()) 
         return {"text": text[:15000]}
+    except HTTPException:
+        raise
     except Exception as e:
         return {"error": str(e), "text": ""}
 
@@ -1807,34 +1023,26 @@ class AnalyzeRequest(BaseModel):
 @app.post("/analyze-gap")
 async def analyze_gap(
     request: AnalyzeRequest, 
-    db: Session = Depends(get_db) # <--- Added DB connection for rate limiting
+    http_request: Request,
+    principal: Optional[Principal] = Depends(get_optional_principal)
 ):
-    # 1. --- RATE LIMITING (Simple Safety) ---
-    # Prevents a single user from spamming the AI and increasing costs
-    if request.user_id and request.user_id != "anon":
-        try:
-            # Check usage: We use 'JobApplication' count as a proxy for daily activity
-            # to avoid creating new database tables right now.
-            usage_count = db.query(JobApplication).filter(
-                JobApplication.user_id == int(request.user_id),
-                JobApplication.applied_at >= datetime.utcnow() - timedelta(days=1)
-            ).count()
-
-            # Limit to 20 actions per day (Generous for a human)
-            if usage_count > 20: 
-                raise HTTPException(
-                    status_code=429, 
-                    detail="Daily limit reached. To ensure fair usage, please try again tomorrow."
-                )
-        except ValueError:
-            pass # Ignore if user_id is not a valid number
+    # 1. --- DAILY AI QUOTA ---
+    # Prevents a single user from spamming the AI and increasing costs. The ai_usage ledger counts
+    # real LLM calls (cached analyses are free). The subject comes from the bearer token, never from
+    # the body's user_id; anonymous callers are counted per IP.
+    if principal:
+        usage_subject = f"user:{principal.id}" if principal.role == "student" else f"{principal.role}:{principal.id}"
+    else:
+        usage_subject = f"ip:{client_ip(http_request)}"
 
     # 2. --- RUN AI ANALYSIS ---
     analysis = get_ai_gap_analysis(
         request.resume_text, 
         request.job_description, 
         candidate_id=request.user_id, 
-        job_id=request.job_id
+        job_id=request.job_id,
+        usage_subject=usage_subject,
+        enforce_quota=True
     )
     
     match_score = int(analysis.get("score", 40))
@@ -1864,25 +1072,23 @@ class OTPVerify(BaseModel):
 
 @app.post("/users/signup")
 @limiter.limit("3/minute")
-def signup_user(data: UserSignup, background_tasks: BackgroundTasks,request: Request, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == data.email).first()
+async def signup_user(data: UserSignup, request: Request, db: Session = Depends(get_db)):
+    existing = await run_in_threadpool(db.query(User).filter(User.email == data.email).first)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Generate OTP
-    otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-    password_hash = bcrypt.hashpw(data.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    
-    OTP_STORE[data.email] = {
-        'otp': otp,
-        'expires_at': datetime.now() + timedelta(seconds=OTP_EXPIRY_SECONDS),
+    password_hash = await hash_password_async(data.password)
+    return await run_in_threadpool(_start_signup, data, password_hash)
+
+def _start_signup(data: UserSignup, password_hash: str) -> dict:
+    # Generate OTP (the pending signup lives in the shared OTP store until verified)
+    otp = otp_store.issue(data.email, 'signup', {
         'name': data.name,
-        'password_hash': password_hash,
-        'type': 'signup'
-    }
+        'password_hash': password_hash
+    })
     
     # Send OTP email
-    background_tasks.add_task(send_otp_email, data.email, otp, data.name)
+    send_otp_email(data.email, otp, data.name)
     
     return {
         "message": "OTP sent to your email",
@@ -1892,21 +1098,9 @@ def signup_user(data: UserSignup, background_tasks: BackgroundTasks,request: Req
 
 @app.post("/users/verify-signup-otp")
 @limiter.limit("5/minute")
-def verify_signup_otp(data: OTPVerify, background_tasks: BackgroundTasks,request: Request, db: Session = Depends(get_db)):
-    if data.email not in OTP_STORE:
-        raise HTTPException(status_code=400, detail="OTP expired or invalid")
-    
-    stored = OTP_STORE[data.email]
-    
-    if stored.get('type') != 'signup':
-        raise HTTPException(status_code=400, detail="Invalid OTP type")
-    
-    if datetime.now() > stored['expires_at']:
-        del OTP_STORE[data.email]
-        raise HTTPException(status_code=400, detail="OTP expired")
-    
-    if stored['otp'] != data.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
+def verify_signup_otp(data: OTPVerify, request: Request, db: Session = Depends(get_db)):
+    # Verify + consume atomically (a replayed request can't create a second account)
+    stored = otp_store.consume(data.email, 'signup', data.otp)
     
     # Create user
     new_user = User(
@@ -1922,10 +1116,7 @@ def verify_signup_otp(data: OTPVerify, background_tasks: BackgroundTasks,request
     access_token = create_access_token(data={"sub": str(new_user.id), "role": "student"})
     
     # Send welcome email
-    background_tasks.add_task(send_welcome_email, data.email, stored['name'])
-    
-    # Clean up OTP
-    del OTP_STORE[data.email]
+    send_welcome_email(data.email, stored['name'])
     
     return {
         "access_token": access_token,
@@ -1937,26 +1128,29 @@ def verify_signup_otp(data: OTPVerify, background_tasks: BackgroundTasks,request
 
 @app.post("/users/login")
 @limiter.limit("5/minute")  # <--- ADD THIS LINE (Max 5 logins per minute)
-def login_user(data: UserLogin, background_tasks: BackgroundTasks,request: Request, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
+async def login_user(data: UserLogin, request: Request, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(db.query(User).filter(User.email == data.email).first)
     
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
     
-    if not bcrypt.checkpw(data.password.encode('utf-8'), user.password_hash.encode('utf-8')):
+    if not await verify_password_async(data.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Incorrect email or password")
+    rehashed = await rehash_if_needed_async(user, data.password)
+    return await run_in_threadpool(_send_login_otp, db, user, data, rehashed)
+
+def _send_login_otp(db: Session, user: User, data: UserLogin, rehashed: bool) -> dict:
+    if rehashed:
+        db.commit()
     
     # Generate OTP
-    otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-    OTP_STORE[data.email] = {
-        'otp': otp,
-        'expires_at': datetime.now() + timedelta(seconds=OTP_EXPIRY_SECONDS),
+    otp = otp_store.issue(data.email, 'login', {
         'user_id': user.id,
         'name': user.name
-    }
+    })
     
     # Send OTP email
-    background_tasks.add_task(send_otp_email, data.email, otp, user.name)
+    send_otp_email(data.email, otp, user.name)
     
     return {
         "message": "OTP sent to your email",
@@ -1983,7 +1177,6 @@ class ResetPasswordConfirm(BaseModel):
 @limiter.limit("3/minute") # Recommendation: Rate Limiting [cite: 8, 44]
 def forgot_password_request(
     data: ForgotPasswordRequest, 
-    background_tasks: BackgroundTasks, 
     request: Request, # Required for rate limiting
     db: Session = Depends(get_db)
 ):
@@ -1995,16 +1188,12 @@ def forgot_password_request(
     
     # 2. Logic: Only process if User Exists
     if user:
-        otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-        OTP_STORE[data.email] = {
-            'otp': otp,
-            'expires_at': datetime.now() + timedelta(seconds=OTP_EXPIRY_SECONDS),
+        otp = otp_store.issue(data.email, 'password_reset', {
             'user_id': user.id,
-            'name': user.name,
-            'type': 'password_reset'
-        }
+            'name': user.name
+        })
         # Send Email in background (so response time doesn't leak info)
-        background_tasks.add_task(send_otp_email, data.email, otp, user.name)
+        send_otp_email(data.email, otp, user.name)
     
     # 3. Recommendation: Implement a generic response [cite: 37, 44]
     # We return the EXACT SAME success message even if the user does NOT exist.
@@ -2013,77 +1202,48 @@ def forgot_password_request(
 
 @app.post("/users/verify-reset-otp")
 def verify_reset_otp_endpoint(data: ResetPasswordVerify):
-    if data.email not in OTP_STORE:
-        raise HTTPException(status_code=400, detail="OTP expired or invalid")
-    
-    stored = OTP_STORE[data.email]
-    
-    if stored.get('type') != 'password_reset':
-        raise HTTPException(status_code=400, detail="Invalid OTP type")
-        
-    if datetime.now() > stored['expires_at']:
-        del OTP_STORE[data.email]
-        raise HTTPException(status_code=400, detail="OTP expired")
-    
-    if stored['otp'] != data.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
+    # Check only: the code is consumed by /users/reset-password
+    otp_store.check(data.email, 'password_reset', data.otp)
         
     return {"message": "OTP Verified"}
 
 @app.post("/users/reset-password")
-def reset_password_confirm(data: ResetPasswordConfirm, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    # 1. Verify OTP again (Double check for security)
-    if data.email not in OTP_STORE:
-        raise HTTPException(status_code=400, detail="Session expired")
-        
-    stored = OTP_STORE[data.email]
-    
-    if stored['otp'] != data.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
-        
-    # 2. Update Password
-    user = db.query(User).filter(User.id == stored['user_id']).first()
+async def reset_password_confirm(data: ResetPasswordConfirm, db: Session = Depends(get_db)):
+    # 1. Verify OTP again (Double check for security) and consume it
+    user = await run_in_threadpool(_consume_password_reset, db, User, 'password_reset', 'user_id', data)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
-    new_hash = bcrypt.hashpw(data.new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    # 2. Update Password
+    new_hash = await hash_password_async(data.new_password)
+    await run_in_threadpool(_finish_user_password_reset, db, user, new_hash, data.email)
+    
+    return {"message": "Password reset successfully"}
+
+def _consume_password_reset(db: Session, model, purpose: str, id_field: str, data: ResetPasswordConfirm):
+    stored = otp_store.consume(data.email, purpose, data.otp)
+    return db.query(model).filter(model.id == stored[id_field]).first()
+
+def _finish_user_password_reset(db: Session, user: User, new_hash: str, email: str):
     user.password_hash = new_hash
     db.commit()
     
     # 3. Send Confirmation Email
-    background_tasks.add_task(send_reset_success_email, data.email, user.name)
-    
-    # 4. Clear OTP
-    del OTP_STORE[data.email]
-    
-    return {"message": "Password reset successfully"}
+    send_reset_success_email(email, user.name)
 
 class OTPVerify(BaseModel):
     email: str
     otp: str
 
 @app.post("/users/verify-otp")
-def verify_otp(data: OTPVerify, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    if data.email not in OTP_STORE:
-        raise HTTPException(status_code=400, detail="OTP expired or invalid")
-    
-    stored = OTP_STORE[data.email]
-    
-    if datetime.now() > stored['expires_at']:
-        del OTP_STORE[data.email]
-        raise HTTPException(status_code=400, detail="OTP expired")
-    
-    if stored['otp'] != data.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
+def verify_otp(data: OTPVerify, db: Session = Depends(get_db)):
+    stored = otp_store.consume(data.email, 'login', data.otp)
     
     # OTP verified, generate token
     access_token = create_access_token(data={"sub": str(stored['user_id']), "role": "student"})
     
     # Send success email
-    background_tasks.add_task(send_login_success_email, data.email, stored['name'])
-    
-    # Clean up OTP
-    del OTP_STORE[data.email]
+    send_login_success_email(data.email, stored['name'])
     
     return {
         "access_token": access_token,
@@ -2094,22 +1254,9 @@ def verify_otp(data: OTPVerify, background_tasks: BackgroundTasks, db: Session =
     }
 
 @app.post("/recruiters/verify-signup-otp")
-def verify_recruiter_signup_otp(data: OTPVerify, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    # 1. Validate OTP
-    if data.email not in OTP_STORE:
-        raise HTTPException(status_code=400, detail="OTP expired or invalid")
-    
-    stored = OTP_STORE[data.email]
-    
-    if stored.get('type') != 'recruiter_signup':
-        raise HTTPException(status_code=400, detail="Invalid OTP type")
-    
-    if datetime.now() > stored['expires_at']:
-        del OTP_STORE[data.email]
-        raise HTTPException(status_code=400, detail="OTP expired")
-    
-    if stored['otp'] != data.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
+def verify_recruiter_signup_otp(data: OTPVerify, db: Session = Depends(get_db)):
+    # 1. Validate + consume OTP
+    stored = otp_store.consume(data.email, 'recruiter_signup', data.otp)
     
     # 2. Determine Account Status based on Domain
     if stored.get('is_public_domain'):
@@ -2119,7 +1266,7 @@ def verify_recruiter_signup_otp(data: OTPVerify, background_tasks: BackgroundTas
         email_action = "pending" # Send "Pending Review" email
         
         # Send Alert to Admin
-        background_tasks.add_task(send_admin_recruiter_alert, stored['name'], data.email, stored.get('linkedin_url'))
+        send_admin_recruiter_alert(stored['name'], data.email, stored.get('linkedin_url'))
     else:
         # Corporate Email -> Fully Verified ✅
         verification_status = "verified"
@@ -2144,10 +1291,7 @@ def verify_recruiter_signup_otp(data: OTPVerify, background_tasks: BackgroundTas
     access_token = create_access_token(data={"sub": str(recruiter.id), "role": "recruiter"})
     
     # 5. Send Status Email
-    background_tasks.add_task(send_recruiter_status_email, data.email, stored['name'], email_action)
-    
-    # Clean up OTP
-    del OTP_STORE[data.email]
+    send_recruiter_status_email(data.email, stored['name'], email_action)
     
     return {
         "access_token": access_token,
@@ -2160,28 +1304,12 @@ def verify_recruiter_signup_otp(data: OTPVerify, background_tasks: BackgroundTas
     }
 
 @app.post("/recruiters/verify-login-otp")
-def verify_recruiter_login_otp(data: OTPVerify, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    if data.email not in OTP_STORE:
-        raise HTTPException(status_code=400, detail="OTP expired or invalid")
-    
-    stored = OTP_STORE[data.email]
-    
-    if stored.get('type') != 'recruiter_login':
-        raise HTTPException(status_code=400, detail="Invalid OTP type")
-    
-    if datetime.now() > stored['expires_at']:
-        del OTP_STORE[data.email]
-        raise HTTPException(status_code=400, detail="OTP expired")
-    
-    if stored['otp'] != data.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
+def verify_recruiter_login_otp(data: OTPVerify, db: Session = Depends(get_db)):
+    stored = otp_store.consume(data.email, 'recruiter_login', data.otp)
     
     # Generate token
     access_token = create_access_token(data={"sub": str(stored['recruiter_id']), "role": "recruiter"})
     
-    # Clean up OTP
-    del OTP_STORE[data.email]
-    
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -2339,26 +1467,21 @@ def check_if_applied(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
-    token = credentials.credentials
+    # Cached principal: no user lookup, just the (user_id, job_id) index probe
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        role = payload.get("role")
-        
-        if role != "student" or not user_id: return {"has_applied": False}
-            
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if not user: return {"has_applied": False}
-            
-        existing = db.query(JobApplication).filter(
-            JobApplication.job_id == job_id,
-            JobApplication.user_id == user.id
-        ).first()
-        
-        return {"has_applied": existing is not None}
-    except jwt.JWTError:
+        principal = principal_from_token(credentials.credentials, db)
+    except HTTPException:
+        return {"has_applied": False}
+    if principal.role != "student":
         return {"has_applied": False}
 
+    existing = db.query(JobApplication.id).filter(
+        JobApplication.job_id == job_id,
+        JobApplication.user_id == principal.id
+    ).first()
+    
+    return {"has_applied": existing is not None}
+
 class ApplyToJob(BaseModel):
     job_id: int
     cover_note: str = None
@@ -2366,19 +1489,11 @@ class ApplyToJob(BaseModel):
 @app.post("/jobs/apply")
 async def apply_to_job(
     data: ApplyToJob,
-    background_tasks: BackgroundTasks,
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    principal: Principal = Depends(get_student_principal),
     db: Session = Depends(get_db)
 ):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        role = payload.get("role")
-        if role != "student" or not user_id: raise HTTPException(403, "Only candidates can apply")
-        student = db.query(User).filter(User.id == int(user_id)).first()
-        if not student: raise HTTPException(404, "User not found")
-    except: raise HTTPException(401, "Invalid token")
+    student = db.query(User).filter(User.id == principal.id).first()
+    if not student: raise HTTPException(404, "User not found")
 
     job = db.query(Job).filter(Job.id == data.job_id).first()
     if not job: raise HTTPException(404, "Job not found")
@@ -2387,22 +1502,11 @@ async def apply_to_job(
     if existing: raise HTTPException(400, "Already applied")
 
     # 1. Run AI Analysis
-    analysis = get_ai_gap_analysis(student.resume_text or "", job.description, candidate_id=str(student.id), job_id=str(job.id))
+    analysis = get_ai_gap_analysis(resume_for_ai(student), job.description, candidate_id=str(student.id), job_id=str(job.id))
     match_score = int(analysis.get("score", 40))
 
-    # 2. Save Skill Gaps
-    missing_skills = analysis.get("missing_skills", [])
-    
-    for skill in missing_skills:
-        skill_clean = skill.strip().title()[:50] 
-        if len(skill_clean) > 2: 
-            gap = db.query(SkillGap).filter(SkillGap.user_id == student.id, SkillGap.skill_name == skill_clean).first()
-            if gap:
-                gap.frequency += 1
-                gap.last_seen = datetime.now() 
-            else:
-                new_gap = SkillGap(user_id=student.id, skill_name=skill_clean, frequency=1)
-                db.add(new_gap)
+    # 2. Save Skill Gaps (one bulk upsert, names normalized against the skill vocabulary)
+    upsert_skill_gaps(db, student.id, analysis.get("missing_skills", []))
     
     # 3. Create Application
     new_app = JobApplication(
@@ -2415,17 +1519,13 @@ async def apply_to_job(
         match_score=match_score
     )
     db.add(new_app)
+
+    # 4. Update Running Average Score (O(1), same transaction as the application)
+    record_application_score(db, student.id, match_score)
     
-    # 4. Commit & Refresh
+    # 5. Commit & Refresh
     db.commit()
     db.refresh(new_app) 
-
-    # 5. Update Average Score
-    all_apps = db.query(JobApplication).filter(JobApplication.user_id == student.id).all()
-    if all_apps:
-        total = sum([a.match_score for a in all_apps if a.match_score])
-        student.avg_match_score = round(total / len(all_apps), 1)
-        db.commit()
     
     # 6. Emails (Strategy B: Smart Routing)
     recruiter_email = None
@@ -2441,11 +1541,8 @@ async def apply_to_job(
         else:
             recruiter_email = os.getenv("ADMIN_EMAIL", "hrtruthhire@gmail.com")
     
-    # 🟢 FIX: Construct Resume Path
-    resume_path = None
-    if student.resume_filename:
-        # Assumes resumes are stored in 'static/resumes/' folder
-        resume_path = f"static/resumes/{student.resume_filename}"
+    # Supabase URL or legacy 'static/resumes/' file; the outbox worker fetches and encodes it
+    resume_path = resume_source(student.resume_filename)
 
     if recruiter_email:
         candidate_data = {
@@ -2453,8 +1550,7 @@ async def apply_to_job(
             'matched': analysis.get('matched_skills', []), 'missing': analysis.get('missing_skills', [])
         }
         
-        background_tasks.add_task(
-            send_application_email, 
+        send_application_email(
             recruiter_email, 
             job.title, 
             candidate_data, 
@@ -2465,7 +1561,7 @@ async def apply_to_job(
         )
     
     # Confirmation to Student
-    background_tasks.add_task(send_candidate_confirmation_email, student.email, student.name, job.title, job.company_name)
+    send_candidate_confirmation_email(student.email, student.name, job.title, job.company_name)
     
     return {"message": "Applied successfully", "match_score": match_score}
 
@@ -2474,15 +1570,8 @@ async def apply_to_job(
 # ==========================================
 
 @app.post("/jobs/{job_id}/save")
-def save_job(job_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = int(payload.get("sub"))
-        role = payload.get("role")
-        if role != "student": raise HTTPException(403, "Only students can save jobs")
-    except:
-        raise HTTPException(401, "Invalid token")
+def save_job(job_id: int, principal: Principal = Depends(get_student_principal), db: Session = Depends(get_db)):
+    user_id = principal.id
 
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job: raise HTTPException(404, "Job not found")
@@ -2493,17 +1582,17 @@ def save_job(job_id: int, credentials: HTTPAuthorizationCredentials = Depends(se
 
     new_save = SavedJob(user_id=user_id, job_id=job_id)
     db.add(new_save)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request (double click) saved it first; uq_saved_jobs_user_job caught it
+        db.rollback()
+        return {"message": "Job already saved"}
     return {"message": "Job saved"}
 
 @app.delete("/jobs/{job_id}/unsave")
-def unsave_job(job_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = int(payload.get("sub"))
-    except:
-        raise HTTPException(401, "Invalid token")
+def unsave_job(job_id: int, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    user_id = principal.id
 
     saved = db.query(SavedJob).filter(SavedJob.user_id == user_id, SavedJob.job_id == job_id).first()
     if saved:
@@ -2512,16 +1601,9 @@ def unsave_job(job_id: int, credentials: HTTPAuthorizationCredentials = Depends(
     return {"message": "Job removed from saved"}
 
 @app.get("/users/me/saved-ids")
-def get_saved_job_ids(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = int(payload.get("sub"))
-    except:
-        raise HTTPException(401, "Invalid token")
-    
-    # Return list of IDs only for quick frontend check
-    saved_jobs = db.query(SavedJob.job_id).filter(SavedJob.user_id == user_id).all()
+def get_saved_job_ids(principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    # Return list of IDs only for quick frontend check (principal is cached, so this is the only query)
+    saved_jobs = db.query(SavedJob.job_id).filter(SavedJob.user_id == principal.id).all()
     return [s[0] for s in saved_jobs]
 
     
@@ -2613,30 +1695,57 @@ def get_resume_text(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="No resume text available")
     return {"text": user.resume_text}
 
+# --- PROFILE SECTIONS ---
+# Maps each optional `include=` section to the User relationship that backs it.
+# Skill gaps are not a relationship because only the top 5 are ever returned.
+PROFILE_SECTIONS = {
+    "applications": "legacy_applications",
+    "projects": "projects",
+    "achievements": "achievements",
+    "certifications": "certifications",
+    "skill_gaps": None,
+}
+
+def _parse_profile_include(include: Optional[str]) -> set:
+    if not include:
+        return set(PROFILE_SECTIONS)
+    sections = {part.strip() for part in include.split(",") if part.strip()}
+    unknown = sections - set(PROFILE_SECTIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown profile sections: {', '.join(sorted(unknown))}")
+    return sections
+
 @app.get("/users/{user_id}")
-def get_user_profile(user_id: int, db: Session = Depends(get_db),current_user = Depends(get_current_user)):
+def get_user_profile(
+    user_id: int,
+    include: Optional[str] = Query(None, description="Comma-separated sections: applications, projects, achievements, certifications, skill_gaps. Defaults to all."),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
 
     #🛡️ SECURITY FIX: Strict Ownership Check
     # Only allow access if the logged-in user IS the user being requested
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view this profile")
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+
+    sections = _parse_profile_include(include)
+
+    # 1. User row + saved count in ONE query (scores come from the running aggregates on User)
+    saved_count = select(func.count(SavedJob.id)).where(SavedJob.user_id == User.id).correlate(User).scalar_subquery()
+    loaders = [selectinload(getattr(User, rel)) for name, rel in PROFILE_SECTIONS.items() if rel and name in sections]
+
+    row = db.query(User, saved_count).options(*loaders).filter(User.id == user_id).first()
+
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    applications = db.query(Application).filter(Application.user_id == user_id).order_by(Application.applied_at.desc()).all()
-    job_applications = db.query(JobApplication).filter(JobApplication.user_id == user_id).all()
-    saved_jobs = db.query(SavedJob).filter(SavedJob.user_id == user_id).all()
-    projects = db.query(Project).filter(Project.user_id == user_id).all()
-    achievements = db.query(Achievement).filter(Achievement.user_id == user_id).all()
-    certifications = db.query(Certification).filter(Certification.user_id == user_id).all()
-    skill_gaps = db.query(SkillGap).filter(SkillGap.user_id == user_id).order_by(SkillGap.frequency.desc()).limit(5).all()
-    
-    all_apps = list(applications) + list(job_applications)
-    match_scores = [app.match_score for app in all_apps if hasattr(app, 'match_score') and app.match_score and app.match_score > 0]
-    employability_score = round(sum(match_scores) / len(match_scores)) if match_scores else user.employability_score or 0
-    
+
+    user, saved_jobs_count = row
+
+    # 2. Only the top 5 skill gaps are shown, so they get their own bounded query
+    skill_gaps = []
+    if "skill_gaps" in sections:
+        skill_gaps = db.query(SkillGap).filter(SkillGap.user_id == user_id).order_by(SkillGap.frequency.desc()).limit(5).all()
+
     resume_url = None
     if user.resume_filename:
         if user.resume_filename.startswith("http"):
@@ -2645,7 +1754,7 @@ def get_user_profile(user_id: int, db: Session = Depends(get_db),current_user =
             base_url = "https://truthhire-api.onrender.com"
             resume_url = f"{base_url}/static/resumes/{user.resume_filename}"
 
-    return {
+    profile = {
         "id": user.id,
         "name": user.name,
         "email": user.email,
@@ -2674,23 +1783,32 @@ def get_user_profile(user_id: int, db: Session = Depends(get_db),current_user =
         "current_salary": user.current_salary,
         "notice_period": user.notice_period,
 
-        "employability_score": employability_score,
-        "verified_jobs_applied": user.verified_jobs_applied or len([a for a in all_apps if hasattr(a, 'match_score')]),
+        "employability_score": user.employability_score or 0,
+        "verified_jobs_applied": user.verified_jobs_applied or user.applications_count or 0,
         "scams_avoided": user.scams_avoided,
         "resume_filename": user.resume_filename,
         "resume_url": resume_url, 
         "resume_uploaded_at": user.resume_uploaded_at,
         "avg_match_score": user.avg_match_score,
-        "applications": [{"id": a.id, "job_title": a.job_title, "company_name": a.company_name, "status": a.status, "match_score": a.match_score, "applied_at": a.applied_at} for a in applications],
-        "saved_jobs_count": len(saved_jobs),
-        "projects": [{"id": p.id, "title": p.title, "description": p.description, "tech_stack": p.tech_stack, "live_link": p.live_link, "github_link": p.github_link} for p in projects],
-        "achievements": [{"id": a.id, "title": a.title, "description": a.description, "date": a.date} for a in achievements],
-        "certifications": [{"id": c.id, "title": c.title, "issuer": c.issuer, "date": c.date, "credential_url": c.credential_url} for c in certifications],
-        "skill_gaps": [{"skill_name": s.skill_name, "frequency": s.frequency} for s in skill_gaps],
+        "saved_jobs_count": saved_jobs_count,
         "education": user.education,
         "experiences": user.experiences
     }
 
+    # 3. Optional sections (already loaded by selectinload above)
+    if "applications" in sections:
+        profile["applications"] = [{"id": a.id, "job_title": a.job_title, "company_name": a.company_name, "status": a.status, "match_score": a.match_score, "applied_at": a.applied_at} for a in user.legacy_applications]
+    if "projects" in sections:
+        profile["projects"] = [{"id": p.id, "title": p.title, "description": p.description, "tech_stack": p.tech_stack, "live_link": p.live_link, "github_link": p.github_link} for p in user.projects]
+    if "achievements" in sections:
+        profile["achievements"] = [{"id": a.id, "title": a.title, "description": a.description, "date": a.date} for a in user.achievements]
+    if "certifications" in sections:
+        profile["certifications"] = [{"id": c.id, "title": c.title, "issuer": c.issuer, "date": c.date, "credential_url": c.credential_url} for c in user.certifications]
+    if "skill_gaps" in sections:
+        profile["skill_gaps"] = [{"skill_name": s.skill_name, "frequency": s.frequency} for s in skill_gaps]
+
+    return profile
+
 # Update this class in main.py
 class ProfileUpdate(BaseModel):
     name: Optional[str] = None 
@@ -2772,6 +1890,7 @@ def update_full_profile(user_id: int, data: ProfileUpdate, db: Session = Depends
         user.experiences = json.dumps(data.experiences)
         
     db.commit()
+    invalidate_principal("student", user.id)
     return {"message": "Profile updated successfully"}
 
 class ProjectSchema(BaseModel):
@@ -2813,69 +1932,57 @@ async def upload_resume(user_id: int, file: UploadFile = File(...), db: Session
     user = db.query(User).filter(User.id == user_id).first()
     if not user: raise HTTPException(status_code=404, detail="User not found")
     
-    # 2. Read File Content into Memory
-    content = await file.read()
+    # 2. Size cap + hash in one pass over the spooled upload
+    upload = await receive_upload(file, RESUME_MAX_UPLOAD_BYTES)
     
-    # --- AI Text Extraction Logic (Unchanged) ---
-    text = ""
+    # --- AI Text Extraction + structured profile ---
+    text, sha256 = "", upload.sha256
     try:
-        if file.filename.lower().endswith('.pdf'):
-            try:
-                import pdfplumber
-                with pdfplumber.open(io.BytesIO(content)) as pdf:
-                    for page in pdf.pages:
-                        extracted = page.extract_text(x_tolerance=1)
-                        if extracted: text += extracted + " "
-            except: pass
-            
-            # Fallback
-            if len(text) < 50:
-                try:
-                    import pypdf
-                    pdf = pypdf.PdfReader(io.BytesIO(content))
-                    for page in pdf.pages:
-                        t = page.extract_text()
-                        if t: text += t + " "
-                except: pass
-        else:
-            text = content.decode('utf-8', errors='ignore')
+        text = (await extract_resume_text(upload)).text
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"AI Extraction Warning: {e}")
-    # --------------------------------------------
 
-    # 3. UPLOAD TO SUPABASE (Replaces local save)
+    # Same file as last time -> keep the stored profile
+    profile = load_profile(user.resume_profile) if user.resume_sha256 == sha256 else None
     try:
-        # Create a unique filename: resumes/user_123_random.pdf
-        # We add random numbers to avoid caching issues when updating resumes
-        file_extension = file.filename.split(".")[-1]
-        unique_filename = f"user_{user_id}_{random.randint(1000, 9999)}.{file_extension}"
-        
-        # Upload using the Supabase Client
-        # Note: We upload 'content' (bytes) directly
-        res = supabase.storage.from_("resumes").upload(
-            path=unique_filename,
-            file=content,
-            file_options={"content-type": file.content_type}
-        )
+        # Regex work over the whole resume: off the event loop, like the extraction itself
+        profile = profile or await run_in_threadpool(build_resume_profile, text, sha256)
+    except Exception as e:
+        # The profile is a convenience: a parser failure must not fail the upload itself
+        print(f"Resume Profile Warning: {e}")
+        profile = None
+    # --------------------------------------------
 
-        # Get the Public URL
-        public_url = supabase.storage.from_("resumes").get_public_url(unique_filename)
+    # 3. UPLOAD TO STORAGE (content-addressed: re-uploading the same file stores nothing new)
+    try:
+        content = await run_in_threadpool(upload.read)
+        stored = await put_content(RESUME_BUCKET, content, sha256, upload.extension, file.content_type)
 
         # 4. Save to Database
-        # Important: We now save the FULL URL, not just the filename
-        user.resume_filename = public_url 
+        # Supabase: the full public URL; local storage: the key under static/resumes/
+        user.resume_filename = stored.reference
         user.resume_text = clean_text_for_ai(text)[:10000]
+        user.resume_profile = json.dumps(profile) if profile else None
+        user.resume_sha256 = sha256
         user.resume_uploaded_at = datetime.now()
+        # Only fills skills / experience / education the user hasn't entered by hand
+        filled = apply_profile_defaults(user, profile) if profile else []
         db.commit()
+        if filled:
+            invalidate_principal("student", user.id)
         
         return {
             "message": "Resume uploaded successfully", 
-            "filename": unique_filename,
-            "url": public_url
+            "filename": stored.key,
+            "url": stored.url,
+            "profile": profile,
+            "filled_fields": filled
         }
 
     except Exception as e:
-        print(f"Supabase Upload Error: {e}")
+        print(f"Resume Upload Error: {e}")
         raise HTTPException(status_code=500, detail="Failed to upload resume to cloud storage")
     
 # --- ADD THIS NEW ENDPOINT ---
@@ -2895,25 +2002,21 @@ async def upload_profile_image(
         raise HTTPException(status_code=400, detail="File must be an image")
 
     try:
-        # 3. Create directory if not exists
-        os.makedirs("static/profile_images", exist_ok=True)
-        
-        # 4. Generate unique filename (prevents caching issues)
-        file_extension = file.filename.split(".")[-1]
-        safe_filename = f"profile_{user_id}_{random.randint(1000, 9999)}.{file_extension}"
-        file_path = f"static/profile_images/{safe_filename}"
-        
-        # 5. Save the file
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        # 6. Update Database
-        user.profile_image = safe_filename
+        # 3. Size cap + hash in one pass, then validated, metadata-free thumbnails (64/128/256 WebP + JPEG)
+        upload = await receive_upload(file, IMAGE_MAX_UPLOAD_BYTES)
+        image = await store_profile_image(upload)
+
+        # 4. Update Database
+        user.profile_image = image["reference"]
         db.commit()
         
-        return {"filename": safe_filename, "message": "Profile image updated"}
+        return {"filename": image["reference"], "urls": image["urls"], "bytes": image["bytes"],
+                "original_bytes": image["original_bytes"], "message": "Profile image updated"}
 
+    except HTTPException:
+        raise
+    except InvalidImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Image Upload Error: {e}")
         raise HTTPException(status_code=500, detail="Failed to upload image")
@@ -2930,9 +2033,9 @@ class RecruiterLogin(BaseModel):
     password: str
 
 @app.post("/recruiters/register")
-def register_recruiter(data: RecruiterRegister, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def register_recruiter(data: RecruiterRegister, db: Session = Depends(get_db)):
     # 1. Check if email exists
-    existing = db.query(Recruiter).filter(Recruiter.official_email == data.official_email).first()
+    existing = await run_in_threadpool(db.query(Recruiter).filter(Recruiter.official_email == data.official_email).first)
     if existing: 
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -2955,22 +2058,20 @@ def register_recruiter(data: RecruiterRegister, background_tasks: BackgroundTask
         )
 
     # 3. Generate OTP & Store Data (DON'T CREATE ACCOUNT YET)
-    otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-    password_hash = bcrypt.hashpw(data.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    
-    OTP_STORE[email_clean] = {
-        'otp': otp,
-        'expires_at': datetime.now() + timedelta(seconds=OTP_EXPIRY_SECONDS),
+    password_hash = await hash_password_async(data.password)
+    return await run_in_threadpool(_start_recruiter_signup, data, email_clean, is_public, password_hash)
+
+def _start_recruiter_signup(data: RecruiterRegister, email_clean: str, is_public: bool, password_hash: str) -> dict:
+    otp = otp_store.issue(email_clean, 'recruiter_signup', {
         'name': data.name,
         'company_name': data.company_name,
         'password_hash': password_hash,
         'linkedin_url': data.linkedin_url,
-        'type': 'recruiter_signup',
         'is_public_domain': is_public # Store this flag for the next step
-    }
+    })
     
     # 4. Send OTP Email
-    background_tasks.add_task(send_recruiter_otp_email, email_clean, otp, data.name)
+    send_recruiter_otp_email(email_clean, otp, data.name)
     
     # 5. Return Success with OTP Requirement
     return {
@@ -2984,47 +2085,32 @@ def register_recruiter(data: RecruiterRegister, background_tasks: BackgroundTask
 @limiter.limit("3/minute")
 def recruiter_forgot_password(
     data: ForgotPasswordRequest, 
-    background_tasks: BackgroundTasks, 
     request: Request,
     db: Session = Depends(get_db)
 ):
     recruiter = db.query(Recruiter).filter(Recruiter.official_email == data.email).first()
 
     if recruiter:
-        otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-        OTP_STORE[data.email] = {
-            'otp': otp,
-            'expires_at': datetime.now() + timedelta(seconds=OTP_EXPIRY_SECONDS),
+        otp = otp_store.issue(data.email, 'recruiter_password_reset', {
             'recruiter_id': recruiter.id,
-            'name': recruiter.name,
-            'type': 'recruiter_password_reset'
-        }
+            'name': recruiter.name
+        })
         # Re-use the user email function or create a new one
-        background_tasks.add_task(send_otp_email, data.email, otp, recruiter.name)
+        send_otp_email(data.email, otp, recruiter.name)
 
     return {"message": "If this email is registered, a reset code has been sent."}
 
 # 🟢 NEW: Recruiter Reset Confirm
 @app.post("/recruiters/reset-password")
-def recruiter_reset_password_confirm(data: ResetPasswordConfirm, db: Session = Depends(get_db)):
-    if data.email not in OTP_STORE:
-        raise HTTPException(status_code=400, detail="Session expired")
-        
-    stored = OTP_STORE[data.email]
-    
-    # Verify OTP and correct Type
-    if stored.get('type') != 'recruiter_password_reset' or stored['otp'] != data.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
-        
-    recruiter = db.query(Recruiter).filter(Recruiter.id == stored['recruiter_id']).first()
+async def recruiter_reset_password_confirm(data: ResetPasswordConfirm, db: Session = Depends(get_db)):
+    # Verify OTP and correct Type (consumed on success)
+    recruiter = await run_in_threadpool(_consume_password_reset, db, Recruiter, 'recruiter_password_reset', 'recruiter_id', data)
     if not recruiter:
         raise HTTPException(status_code=404, detail="Recruiter not found")
         
-    new_hash = bcrypt.hashpw(data.new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    recruiter.password_hash = new_hash
-    db.commit()
+    recruiter.password_hash = await hash_password_async(data.new_password)
+    await run_in_threadpool(db.commit)
     
-    del OTP_STORE[data.email]
     return {"message": "Password reset successfully"}
 
 @app.get("/recruiters/{recruiter_id}")
@@ -3051,25 +2137,18 @@ class JobPost(BaseModel):
 @app.post("/recruiters/post-job")
 async def post_job(
     data: JobPost,
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    principal: Principal = Depends(get_recruiter_principal),
     db: Session = Depends(get_db)
 ):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        recruiter_id = payload.get("sub")
-        if not recruiter_id: raise HTTPException(status_code=401, detail="Invalid token")
-        
-        recruiter = db.query(Recruiter).filter(Recruiter.id == int(recruiter_id)).first()
-        if not recruiter: raise HTTPException(status_code=401, detail="Recruiter not found")
-    except:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    if recruiter.verification_status == 'pending':
+    if principal.verification_status == 'pending':
         raise HTTPException(status_code=403, detail="Account pending verification.")
+
+    recruiter = db.query(Recruiter).filter(Recruiter.id == principal.id).first()
+    if not recruiter: raise HTTPException(status_code=401, detail="Recruiter not found")
     
     # Trust Score
-    analysis = analyze_job_trust(data.title, data.description, data.salary_min, data.salary_max, data.currency, data.location_type)
+    analysis = analyze_job_trust(data.title, data.description, data.salary_min, data.salary_max, data.currency, data.location_type,
+                                 usage_subject=f"recruiter:{principal.id}")
     trust_score = analysis['trust_score']
     if data.salary_min and data.salary_max: trust_score = min(100, trust_score + 10)
     
@@ -3113,7 +2192,7 @@ class AnswerAnalysisRequest(BaseModel):
     job_role: str
 
 @app.post("/interview/analyze-answer")
-async def analyze_interview_answer(data: AnswerAnalysisRequest):
+async def analyze_interview_answer(data: AnswerAnalysisRequest, request: Request):
     if not os.getenv("GROQ_API_KEY"):
         return {
             "rating": 5,
@@ -3143,6 +2222,9 @@ async def analyze_interview_answer(data: AnswerAnalysisRequest):
     }}
     """
 
+    subject = f"ip:{client_ip(request)}"
+    record_ai_call(subject, daily_limit_for(subject))
+
     try:
         response = ai_client.chat.completions.create(
             model="llama-3.3-70b-versatile",
@@ -3159,6 +2241,7 @@ def delete_job(job_id: int, db: Session = Depends(get_db)):
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job: raise HTTPException(404, "Job not found")
     
+    forget_applications(db, JobApplication.job_id == job.id)
     db.query(JobApplication).filter(JobApplication.job_id == job.id).delete()
     db.query(SavedJob).filter(SavedJob.job_id == job.id).delete()
     
@@ -3210,7 +2293,7 @@ def get_job_applicants(job_id: int, db: Session = Depends(get_db)):
     base_url = "https://truthhire-api.onrender.com"
 
     for app, user in results:
-        ai_analysis = get_ai_gap_analysis(user.resume_text or "", job.description, candidate_id=str(user.id), job_id=str(job.id))
+        ai_analysis = get_ai_gap_analysis(resume_for_ai(user), job.description, candidate_id=str(user.id), job_id=str(job.id))
         
         # ✅ FIX 2: Smart URL Check (Prevents Double URLs)
         resume_link = None
@@ -3254,7 +2337,6 @@ class StatusUpdate(BaseModel):
 def update_applicant_status(
     applicant_id: int, 
     data: StatusUpdate, 
-    background_tasks: BackgroundTasks, 
     db: Session = Depends(get_db)
 ):
     try:
@@ -3275,8 +2357,7 @@ def update_applicant_status(
                 recruiter = db.query(Recruiter).filter(Recruiter.id == job.recruiter_id).first()
                 if recruiter:
                     # Send the unified update email
-                    background_tasks.add_task(
-                        send_candidate_update_email,
+                    send_candidate_update_email(
                         candidate_email=applicant.applicant_email, 
                         candidate_name=applicant.applicant_name, 
                         job_title=job.title,
@@ -3357,6 +2438,7 @@ def update_recruiter_profile(recruiter_id: int, data: RecruiterProfileUpdate, db
     if hasattr(recruiter, "industry"): recruiter.industry = data.industry
 
     db.commit()
+    invalidate_principal("recruiter", recruiter.id)
     return {"message": "Profile updated successfully"}
 
 
@@ -3366,6 +2448,8 @@ def delete_application(application_id: int, db: Session = Depends(get_db)):
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
     
+    if application.user_id:
+        record_application_score(db, application.user_id, application.match_score, delta=-1)
     db.delete(application)
     db.commit()
     return None
@@ -3414,7 +2498,7 @@ class AdminLogin(BaseModel):
     password: str
 
 @app.post("/admin/create")
-def create_admin(
+async def create_admin(
     data: AdminLogin, 
     # 🛡️ SECURITY FIX: Require a secret key in the header
     x_admin_secret: str = Header(..., alias="x-admin-secret"), 
@@ -3432,12 +2516,12 @@ def create_admin(
         raise HTTPException(status_code=403, detail="Forbidden: Invalid Admin Secret")
 
     # 2. Check if username exists
-    existing = db.query(Admin).filter(Admin.username == data.username).first()
+    existing = await run_in_threadpool(db.query(Admin).filter(Admin.username == data.username).first)
     if existing:
         raise HTTPException(status_code=400, detail="Admin username already exists")
     
     # 3. Create Admin
-    hashed_pw = bcrypt.hashpw(data.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed_pw = await hash_password_async(data.password)
     
     new_admin = Admin(
         username=data.username,
@@ -3445,25 +2529,45 @@ def create_admin(
         password_hash=hashed_pw
     )
     db.add(new_admin)
-    db.commit()
+    await run_in_threadpool(db.commit)
     
     return {"message": "Admin account created successfully"}
 
 @app.post("/admin/login")
-def admin_login(data: AdminLogin, db: Session = Depends(get_db)):
-    admin = db.query(Admin).filter(Admin.username == data.username).first()
+async def admin_login(data: AdminLogin, db: Session = Depends(get_db)):
+    admin = await run_in_threadpool(db.query(Admin).filter(Admin.username == data.username).first)
     
     if not admin:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not bcrypt.checkpw(data.password.encode('utf-8'), admin.password_hash.encode('utf-8')):
+    if not await verify_password_async(data.password, admin.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    return {
+    # Read before the commit below expires the instance
+    response = {
         "admin_id": admin.id,
         "username": admin.username,
         "role": "super_admin"
     }
+    if await rehash_if_needed_async(admin, data.password):
+        await run_in_threadpool(db.commit)
+    
+    return response
+
+@app.get("/admin/metrics/password-hashing")
+def get_password_hashing_metrics():
+    return password_hash_stats()
+
+@app.get("/admin/metrics/resume-parsing")
+def get_resume_parsing_metrics():
+    return extraction_stats()
+
+@app.get("/admin/metrics/job-page-fetch")
+def get_job_page_fetch_metrics():
+    return fetch_stats()
+
+@app.get("/admin/metrics/email-outbox")
+def get_email_outbox_metrics():
+    return outbox_stats()
 
 @app.get("/admin/stats")
 def get_admin_analytics(db: Session = Depends(get_db)):
@@ -3494,22 +2598,24 @@ class AdminJobPost(BaseModel):
     skills_required: str = None
     equity: bool = False
 
+# Admin listings: one page per request (newest first by default); the next page's cursor is in the
+# X-Next-Cursor header, so the body stays the plain list the dashboard reads. See backend/admin_listings.py
 @app.get("/admin/jobs")
-def get_all_jobs_admin(db: Session = Depends(get_db)):
-    jobs = db.query(Job).order_by(Job.created_at.desc()).all()
-    results = []
-    for job in jobs:
-        results.append({
-            "id": str(job.id),
-            "title": job.title,
-            "company_name": job.company_name,
-            "location": job.location,
-            "employment_type": job.employment_type,
-            "source": "Recruiter" if job.recruiter_id else "Admin",
-            "created_at": str(job.created_at),
-            "is_direct": job.recruiter_id is not None
-        })
-    return results
+def get_all_jobs_admin(
+    response: Response,
+    q: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    source: Optional[str] = Query(None, description="admin or recruiter"),
+    sort: str = "id",
+    order: str = "desc",
+    limit: int = Query(ADMIN_PAGE_DEFAULT, ge=1, le=ADMIN_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    items, next_cursor = list_page(db, "jobs", q, {"status": status_filter, "source": source}, sort, order, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @app.post("/admin/jobs")
 def create_job_admin(data: AdminJobPost, db: Session = Depends(get_db)):
@@ -3539,6 +2645,44 @@ def create_job_admin(data: AdminJobPost, db: Session = Depends(get_db)):
     db.commit()
     return {"message": "Job posted successfully", "job_id": new_job.id}
 
+@app.post("/admin/jobs/import")
+@limiter.limit("3/minute")
+async def import_jobs_admin(
+    request: Request,
+    urls: Optional[str] = Form(None),
+    file: Optional[UploadFile] = File(None),
+    x_admin_secret: str = Header(..., alias="x-admin-secret")
+):
+    """
+    Bulk import: newline/comma separated `urls` and/or a CSV/JSON `file` of AdminJobPost fields.
+    Streams one NDJSON line per row (created / skipped / blocked / error) and a final summary line.
+    """
+    # One request fans out to hundreds of page fetches and LLM calls: secret + rate limit, and the
+    # endpoint stays off until JOB_IMPORT_SECRET is set
+    required_secret = os.getenv("JOB_IMPORT_SECRET")
+    if not required_secret:
+        raise HTTPException(status_code=403, detail="Job import is disabled (No secret set).")
+    if not hmac.compare_digest(x_admin_secret.encode(), required_secret.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden: Invalid Admin Secret")
+
+    rows = parse_url_list(urls)
+    if file:
+        upload = await receive_upload(file, IMPORT_MAX_UPLOAD_BYTES)
+        try:
+            rows += parse_import_file(await run_in_threadpool(upload.read), upload.filename)
+        except ImportRowError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if not rows:
+        raise HTTPException(status_code=400, detail="Provide urls or a CSV/JSON file")
+    if len(rows) > JOB_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {JOB_IMPORT_MAX_ROWS} jobs per import")
+
+    async def stream():
+        async for result in import_jobs(rows, lambda jobs: analyze_jobs_trust_batch(jobs, usage_subject="admin:import")):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 class VerificationUpdate(BaseModel):
     status: str
 
@@ -3603,6 +2747,8 @@ async def generate_job_description_ai(data: JDGeneratorRequest):
     }}
     """
 
+    record_ai_call("admin")
+
     try:
         response = ai_client.chat.completions.create(
             model="llama-3.3-70b-versatile",
@@ -3660,6 +2806,7 @@ def delete_job_admin(job_id: int, db: Session = Depends(get_db)):
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job: raise HTTPException(404, "Job not found")
     
+    forget_applications(db, JobApplication.job_id == job.id)
     db.query(JobApplication).filter(JobApplication.job_id == job.id).delete()
     db.query(SavedJob).filter(SavedJob.job_id == job.id).delete()
     
@@ -3668,18 +2815,19 @@ def delete_job_admin(job_id: int, db: Session = Depends(get_db)):
     return {"message": "Job deleted successfully"}
 
 @app.get("/admin/users")
-def get_all_users_admin(db: Session = Depends(get_db)):
-    users = db.query(User).order_by(User.created_at.desc()).all()
-    results = []
-    for u in users:
-        results.append({
-            "id": u.id,
-            "name": u.name,
-            "email": u.email,
-            "created_at": str(u.created_at),
-            "match_score": u.avg_match_score
-        })
-    return results
+def get_all_users_admin(
+    response: Response,
+    q: Optional[str] = None,
+    sort: str = "id",
+    order: str = "desc",
+    limit: int = Query(ADMIN_PAGE_DEFAULT, ge=1, le=ADMIN_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    items, next_cursor = list_page(db, "users", q, {}, sort, order, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @app.delete("/admin/users/{user_id}")
 def delete_user_admin(user_id: int, db: Session = Depends(get_db)):
@@ -3692,25 +2840,45 @@ def delete_user_admin(user_id: int, db: Session = Depends(get_db)):
     
     db.delete(user)
     db.commit()
+    invalidate_principal("student", user_id)
     return {"message": "User deleted"}
 
 @app.get("/admin/recruiters")
-def get_all_recruiters_admin(db: Session = Depends(get_db)):
-    recruiters = db.query(Recruiter).order_by(Recruiter.created_at.desc()).all()
-    results = []
-    for r in recruiters:
-        job_count = db.query(Job).filter(Job.recruiter_id == r.id).count()
-        results.append({
-            "id": r.id,
-            "name": r.name,
-            "company_name": r.company_name,
-            "official_email": r.official_email,
-            "verification_status": r.verification_status,
-            "linkedin_url": r.linkedin_url,
-            "job_count": job_count,
-            "created_at": str(r.created_at)
-        })
-    return results
+def get_all_recruiters_admin(
+    response: Response,
+    q: Optional[str] = None,
+    verification_status: Optional[str] = None,
+    sort: str = "id",
+    order: str = "desc",
+    limit: int = Query(ADMIN_PAGE_DEFAULT, ge=1, le=ADMIN_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    items, next_cursor = list_page(db, "recruiters", q, {"verification_status": verification_status},
+                                   sort, order, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+@app.get("/admin/{entity}/export")
+def export_admin_listing(
+    entity: str,
+    format: Literal["csv", "ndjson"] = "csv",
+    q: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    source: Optional[str] = None,
+    verification_status: Optional[str] = None,
+    sort: str = "id",
+    order: str = "desc"
+):
+    """Streams every matching jobs / users / recruiters row as CSV or NDJSON, in constant memory."""
+    if entity not in LISTINGS:
+        raise HTTPException(status_code=404, detail="Unknown listing")
+    filters = {"status": status_filter, "source": source, "verification_status": verification_status}
+    chunks = export_rows(entity, format, q, filters, sort, order)
+    filename = f"{entity}-{datetime.utcnow():%Y%m%d}.{format}"
+    return StreamingResponse(chunks, media_type="text/csv" if format == "csv" else "application/x-ndjson",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 @app.delete("/admin/recruiters/{recruiter_id}")
 def delete_recruiter_admin(recruiter_id: int, db: Session = Depends(get_db)):
@@ -3722,6 +2890,7 @@ def delete_recruiter_admin(recruiter_id: int, db: Session = Depends(get_db)):
     
     db.delete(recruiter)
     db.commit()
+    invalidate_principal("recruiter", recruiter_id)
     return {"message": "Recruiter deleted"}
 
 @app.post("/applications/{application_id}/generate-prep")
@@ -3825,6 +2994,8 @@ def generate_interview_prep(
     }}
     """
 
+    record_ai_call(f"user:{app.user_id}" if app.user_id else "anon", AI_DAILY_LIMIT if app.user_id else None)
+
     try:
         response = ai_client.chat.completions.create(
             model="llama-3.3-70b-versatile",
@@ -3862,7 +3033,7 @@ def complete_interview_prep(application_id: int, db: Session = Depends(get_db)):
 
 
 @app.put("/admin/recruiters/{recruiter_id}/verify")
-def verify_recruiter(recruiter_id: int, data: VerificationUpdate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def verify_recruiter(recruiter_id: int, data: VerificationUpdate, db: Session = Depends(get_db)):
     recruiter = db.query(Recruiter).filter(Recruiter.id == recruiter_id).first()
     if not recruiter:
         raise HTTPException(status_code=404, detail="Recruiter not found")
@@ -3875,9 +3046,10 @@ def verify_recruiter(recruiter_id: int, data: VerificationUpdate, background_tas
         recruiter.is_verified = False
     
     db.commit()
+    invalidate_principal("recruiter", recruiter.id)
     
     # Send email notification
-    background_tasks.add_task(send_recruiter_status_email, recruiter.official_email, recruiter.name, data.status)
+    send_recruiter_status_email(recruiter.official_email, recruiter.name, data.status)
     
     return {"message": f"Recruiter {data.status} successfully"}
 
@@ -3889,51 +3061,32 @@ class NudgeRequest(BaseModel):
     admin_secret: str
 
 @app.post("/admin/marketing/trigger-nudges")
-def trigger_marketing_emails(
-    data: NudgeRequest, 
-    background_tasks: BackgroundTasks, 
-    db: Session = Depends(get_db)
-):
+def trigger_marketing_emails(data: NudgeRequest):
     """
-    Smart System to find users who need a nudge.
-    Logic:
-    1. Users created > 24 hours ago.
-    2. Missing Resume OR Missing Location -> Send Profile Nudge.
-    3. Has Resume BUT Avg Match Score is 0 -> Send Truth Score Nudge.
+    Smart System to find users who need a nudge (see backend/campaigns.py):
+    1. Users who joined in the last 7 days and weren't nudged recently.
+    2. Missing Resume / Location / Skills -> Profile Nudge.
+    3. Has Resume BUT Avg Match Score is 0 -> Truth Score Nudge.
+    The campaign runs in the background; poll the returned status_url for progress.
     """
     # Simple security check (Change this secret!)
     if data.admin_secret != os.getenv("ADMIN_SECRET", "truthhire_admin_secret"):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    # 1. Fetch recent users (e.g., joined in last 7 days to avoid annoying old users)
-    seven_days_ago = datetime.now() - timedelta(days=7)
-    users = db.query(User).filter(User.created_at >= seven_days_ago).all()
-    
-    sent_count = 0
-    
-    for user in users:
-        # --- CHECK 1: INCOMPLETE PROFILE ---
-        missing = []
-        if not user.resume_filename and not user.resume_text:
-            missing.append("Resume")
-        if not user.location:
-            missing.append("Location")
-        if not user.skills or len(user.skills) < 5:
-            missing.append("Key Skills")
-            
-        if missing:
-            # Send Profile Nudge
-            background_tasks.add_task(send_profile_completion_reminder, user.email, user.name, missing)
-            sent_count += 1
-            continue # Don't send two emails at once
-            
-        # --- CHECK 2: UNUSED TRUTH SCORE ---
-        # If they have a resume but haven't used the AI Score feature (avg_score is 0 or None)
-        if (not user.avg_match_score or user.avg_match_score == 0) and user.resume_text:
-            background_tasks.add_task(send_truth_score_nudge, user.email, user.name)
-            sent_count += 1
+    run = start_nudge_campaign()
+    return {
+        "message": "Marketing campaign started",
+        "campaign_id": run["campaign_id"],
+        "emails_queued": run["candidates"],
+        "status_url": f"/admin/marketing/campaigns/{run['campaign_id']}",
+    }
 
-    return {"message": "Marketing campaign triggered", "emails_queued": sent_count}
+@app.get("/admin/marketing/campaigns/{campaign_id}")
+def get_marketing_campaign_status(campaign_id: int):
+    status = campaign_status(campaign_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return status
 
 # ===========================
 # 🆕 WAITLIST ENDPOINT
@@ -3944,7 +3097,7 @@ class WaitlistRequest(BaseModel):
     category: str
 
 @app.post("/waitlist/join")
-def join_waitlist(data: WaitlistRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def join_waitlist(data: WaitlistRequest, db: Session = Depends(get_db)):
     # Check if already exists
     existing = db.query(Waitlist).filter(Waitlist.email == data.email, Waitlist.category == data.category).first()
     
@@ -3958,12 +3111,20 @@ def join_waitlist(data: WaitlistRequest, background_tasks: BackgroundTasks, db:
     # 1. Save to DB
     new_entry = Waitlist(email=data.email, category=data.category)
     db.add(new_entry)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent signup for the same address (uq_waitlist_category_email)
+        db.rollback()
+        return JSONResponse(
+            status_code=200,
+            content={"status": "exists", "message": "You are already on the waitlist."}
+        )
     
     # 2. CALC REAL POSITION
     position = db.query(Waitlist).filter(Waitlist.category == data.category).count()
     
     # 3. Send Email
-    background_tasks.add_task(send_waitlist_confirmation_email, data.email, data.category, position)
+    send_waitlist_confirmation_email(data.email, data.category, position)
     
     return {"status": "success", "message": "Added to waitlist"}
\ No newline at end of file
@@ -0,0 +1,294 @@
+# backend/migrations.py
+# Versioned schema migrations (replaces running Base.metadata.create_all by hand).
+#
+#   python -m backend.migrations upgrade   # apply pending migrations
+#   python -m backend.migrations status    # list applied / pending versions
+#   python -m backend.migrations check     # diff live indexes against the ones declared in models.py
+#
+# Rules for new migrations:
+# - Append with the next version number, never edit one that has shipped.
+# - Keep them idempotent (IF NOT EXISTS / inspector checks) so a half-applied run can be retried.
+# - Index builds go through create_indexes(), which uses CREATE INDEX CONCURRENTLY on Postgres
+#   so production tables stay writable while the index is built.
+import sys
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, MetaData, Table, inspect, text
+from sqlalchemy.schema import CreateIndex
+from backend.database import engine, SessionLocal
+from backend.models import Base
+
+# Arbitrary constant so two deploys starting at once don't run migrations concurrently
+MIGRATION_LOCK_ID = 22840228
+
+migration_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", migration_meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String),
+    Column("applied_at", DateTime),
+)
+
+MIGRATIONS = []
+
+def migration(version: int, name: str):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+# ===========================
+# 🔧 HELPERS
+# ===========================
+
+def _is_postgres() -> bool:
+    return engine.dialect.name == "postgresql"
+
+def _declared_indexes() -> dict:
+    """name -> Index object for every index declared on the models (incl. column index=True)."""
+    return {idx.name: idx for table in Base.metadata.tables.values() for idx in table.indexes}
+
+def add_column_if_missing(table: str, column: str, ddl: str):
+    existing = {c["name"] for c in inspect(engine).get_columns(table)}
+    if column in existing:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    print(f"   ➕ {table}.{column}")
+
+def create_tables(*models):
+    """Creates the tables for newly added models (and their declared indexes) if they don't exist."""
+    Base.metadata.create_all(bind=engine, tables=[m.__table__ for m in models])
+
+def create_indexes(*names: str):
+    """
+    Builds declared indexes by name. On Postgres this runs CREATE [UNIQUE] INDEX CONCURRENTLY
+    outside a transaction; an INVALID leftover from an interrupted concurrent build is dropped first.
+    """
+    declared = _declared_indexes()
+
+    if not _is_postgres():
+        with engine.begin() as conn:
+            for name in names:
+                conn.execute(CreateIndex(declared[name], if_not_exists=True))
+                print(f"   🗂️  {name}")
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name in names:
+            invalid = conn.execute(text("""
+                SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+                WHERE c.relname = :name AND NOT i.indisvalid
+            """), {"name": name}).first()
+            if invalid:
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+            ddl = str(CreateIndex(declared[name], if_not_exists=True).compile(dialect=engine.dialect))
+            ddl = ddl.replace("CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX CONCURRENTLY", 1) \
+                if ddl.startswith("CREATE UNIQUE INDEX") else ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+            conn.execute(text(ddl))
+            print(f"   🗂️  {name}")
+
+def delete_duplicates(table: str, *columns: str):
+    """Keeps the oldest row (lowest id) of each duplicate group, so a unique index can be built."""
+    cols = ", ".join(columns)
+    with engine.begin() as conn:
+        result = conn.execute(text(
+            f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {cols})"
+        ))
+        if result.rowcount:
+            print(f"   🧹 removed {result.rowcount} duplicate rows from {table}")
+
+# ===========================
+# 📜 MIGRATIONS
+# ===========================
+
+@migration(1, "baseline tables")
+def _baseline():
+    # Creates any table that doesn't exist yet; existing tables are left untouched
+    Base.metadata.create_all(bind=engine)
+
+@migration(2, "user running score aggregates")
+def _user_score_aggregates():
+    from backend.scores import backfill_user_scores
+
+    add_column_if_missing("users", "applications_count", "INTEGER DEFAULT 0")
+    add_column_if_missing("users", "scored_applications_count", "INTEGER DEFAULT 0")
+    add_column_if_missing("users", "match_score_total", "INTEGER DEFAULT 0")
+
+    db = SessionLocal()
+    try:
+        backfill_user_scores(db)
+    finally:
+        db.close()
+
+@migration(3, "unique skill gaps per user")
+def _unique_skill_gaps():
+    from backend.skills import merge_duplicate_skill_gaps
+
+    db = SessionLocal()
+    try:
+        removed = merge_duplicate_skill_gaps(db)
+        db.commit()
+        print(f"   🧹 merged {removed} duplicate skill gaps")
+    finally:
+        db.close()
+
+    create_indexes("uq_skill_gaps_user_skill")
+
+@migration(4, "hot path indexes and unique constraints")
+def _index_pack():
+    delete_duplicates("saved_jobs", "user_id", "job_id")
+    delete_duplicates("waitlist", "category", "email")
+
+    create_indexes(
+        "ix_job_applications_user_job",
+        "ix_job_applications_job_id",
+        "uq_saved_jobs_user_job",
+        "ix_skill_gaps_user_frequency",
+        "ix_projects_user_id",
+        "ix_achievements_user_id",
+        "ix_certifications_user_id",
+        "ix_applications_user_id",
+        "ix_jobs_status_created_at",
+        "ix_jobs_active_created_at",
+        "ix_jobs_recruiter_id",
+        "uq_waitlist_category_email",
+    )
+
+@migration(5, "shared otp challenges")
+def _otp_challenges():
+    from backend.models import OTPChallenge
+    create_tables(OTPChallenge)
+
+@migration(6, "shared rate limit buckets and ai usage ledger")
+def _rate_limits_and_ai_usage():
+    from backend.models import RateLimitBucket, AIUsage
+    create_tables(RateLimitBucket, AIUsage)
+
+@migration(7, "email outbox")
+def _email_outbox():
+    from backend.models import EmailOutbox
+    create_tables(EmailOutbox)
+
+@migration(8, "daily job alert digests")
+def _job_digests():
+    from backend.models import DigestRun
+    add_column_if_missing("users", "last_job_digest_at", "TIMESTAMP")
+    create_tables(DigestRun)
+
+@migration(9, "marketing campaign runs")
+def _campaign_runs():
+    from backend.models import CampaignRun
+    add_column_if_missing("users", "last_nudge_at", "TIMESTAMP")
+    create_tables(CampaignRun)
+
+@migration(10, "resume extraction cache")
+def _resume_extractions():
+    from backend.models import ResumeExtraction
+    create_tables(ResumeExtraction)
+
+@migration(11, "resume extractor and quality")
+def _resume_extraction_quality():
+    add_column_if_missing("resume_extractions", "extractor", "VARCHAR")
+    add_column_if_missing("resume_extractions", "quality", "FLOAT")
+
+@migration(12, "structured resume profile")
+def _resume_profile():
+    add_column_if_missing("users", "resume_profile", "TEXT")
+    add_column_if_missing("users", "resume_sha256", "VARCHAR(64)")
+
+@migration(13, "otp challenges per purpose")
+def _otp_challenges_per_purpose():
+    from backend.models import OTPChallenge
+    # The primary key becomes (key, purpose). Rows only live for minutes, so rebuild the table
+    # instead of altering the key in place; codes pending during the deploy have to be re-requested.
+    OTPChallenge.__table__.drop(bind=engine, checkfirst=True)
+    create_tables(OTPChallenge)
+
+@migration(14, "legacy applications in score aggregates")
+def _legacy_applications_in_scores():
+    from backend.scores import backfill_user_scores
+
+    # Databases that ran 0002 with the job_applications-only backfill are missing the legacy counts
+    db = SessionLocal()
+    try:
+        backfill_user_scores(db)
+    finally:
+        db.close()
+
+# ===========================
+# 🚀 RUNNER
+# ===========================
+
+def applied_versions() -> set:
+    schema_migrations.create(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(schema_migrations.select().with_only_columns(schema_migrations.c.version))}
+
+def run_migrations():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        if _is_postgres():
+            lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            done = applied_versions()
+            pending = sorted(m for m in MIGRATIONS if m[0] not in done)
+            if not pending:
+                print("✅ Schema is up to date.")
+                return
+
+            for version, name, fn in pending:
+                print(f"⏳ Applying {version:04d} {name}...")
+                fn()
+                with engine.begin() as conn:
+                    conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+            print(f"✅ Applied {len(pending)} migration(s).")
+        finally:
+            if _is_postgres():
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+def print_status():
+    done = applied_versions()
+    for version, name, _ in sorted(MIGRATIONS):
+        print(f"{'✅' if version in done else '⏳'} {version:04d} {name}")
+
+def check_indexes() -> bool:
+    """Prints missing / extra / mismatched indexes. Returns True when live == declared."""
+    inspector = inspect(engine)
+    live_tables = set(inspector.get_table_names())
+    ok = True
+
+    for table_name, table in sorted(Base.metadata.tables.items()):
+        if table_name not in live_tables:
+            print(f"❌ {table_name}: table missing")
+            ok = False
+            continue
+
+        declared = {idx.name: ([c.name for c in idx.columns], bool(idx.unique)) for idx in table.indexes}
+        live = {i["name"]: (i["column_names"], bool(i["unique"])) for i in inspector.get_indexes(table_name)}
+        live.update({u["name"]: (u["column_names"], True) for u in inspector.get_unique_constraints(table_name) if u.get("name")})
+
+        for name, spec in sorted(declared.items()):
+            if name not in live:
+                print(f"❌ {table_name}: missing index {name} {spec[0]}")
+                ok = False
+            elif live[name] != spec:
+                print(f"⚠️  {table_name}: {name} is {live[name]} but models.py declares {spec}")
+                ok = False
+        for name in sorted(set(live) - set(declared)):
+            print(f"➖ {table_name}: undeclared index {name} {live[name][0]}")
+
+    if ok:
+        print("✅ Live indexes match models.py")
+    return ok
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if command == "upgrade":
+        run_migrations()
+    elif command == "status":
+        print_status()
+    elif command == "check":
+        sys.exit(0 if check_indexes() else 1)
+    else:
+        print("Usage: python -m backend.migrations [upgrade|status|check]")
+        sys.exit(2)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Text, ForeignKey, Float, JSON, Index, text
 from datetime import datetime
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -7,6 +7,13 @@ import bcrypt
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+        # Partial index for the public listing: active jobs, newest first
+        Index("ix_jobs_active_created_at", "created_at",
+              postgresql_where=text("status = 'active'"), sqlite_where=text("status = 'active'")),
+        Index("ix_jobs_recruiter_id", "recruiter_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -76,6 +83,10 @@ class Recruiter(Base):
 
 class JobApplication(Base):
     __tablename__ = "job_applications"
+    __table_args__ = (
+        Index("ix_job_applications_user_job", "user_id", "job_id"),
+        Index("ix_job_applications_job_id", "job_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -105,6 +116,9 @@ class User(Base):
     resume_filename = Column(String, nullable=True)
     resume_text = Column(Text, nullable=True)
     resume_uploaded_at = Column(DateTime(timezone=True), nullable=True)
+    # Structured profile parsed at upload (backend/resume_profile.py) and the sha256 of the file it came from
+    resume_profile = Column(Text, nullable=True)
+    resume_sha256 = Column(String(64), nullable=True)
     avg_match_score = Column(Float, default=0.0)
     
     # Fresher Profile Fields
@@ -136,16 +150,33 @@ class User(Base):
     employability_score = Column(Integer, default=0)
     verified_jobs_applied = Column(Integer, default=0)
     scams_avoided = Column(Integer, default=0)
+
+    # Running application aggregates (updated on apply/delete, rebuilt by python -m backend.scores)
+    applications_count = Column(Integer, default=0)
+    scored_applications_count = Column(Integer, default=0)
+    match_score_total = Column(Integer, default=0)
+
+    # Daily job alerts (backend/job_alerts.py): jobs newer than this go into the next digest
+    last_job_digest_at = Column(DateTime, nullable=True)  # naive UTC
+    # Marketing nudges (backend/campaigns.py): frequency cap watermark
+    last_nudge_at = Column(DateTime, nullable=True)  # naive UTC
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # --- Profile Sections (loaded explicitly with selectinload) ---
+    # passive_deletes keeps deleting a user from touching child rows, same as before these existed
+    legacy_applications = relationship("Application", order_by="desc(Application.applied_at)", passive_deletes=True)
+    projects = relationship("Project", passive_deletes=True)
+    achievements = relationship("Achievement", passive_deletes=True)
+    certifications = relationship("Certification", passive_deletes=True)
+
 # Note: You can now technically remove 'Application' table if you migrate everything to JobApplication
 # But I will leave it here if you still have legacy code relying on it.
 class Application(Base):
     __tablename__ = "applications"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
     job_id = Column(Integer, ForeignKey('jobs.id'))
     job_title = Column(String)
     company_name = Column(String)
@@ -155,6 +186,7 @@ class Application(Base):
 
 class SavedJob(Base):
     __tablename__ = "saved_jobs"
+    __table_args__ = (Index("uq_saved_jobs_user_job", "user_id", "job_id", unique=True),)
     job = relationship("Job")
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -174,7 +206,7 @@ class Project(Base):
     __tablename__ = "projects"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
     title = Column(String)
     description = Column(Text)
     tech_stack = Column(String) 
@@ -186,7 +218,7 @@ class Achievement(Base):
     __tablename__ = "achievements"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
     title = Column(String)
     description = Column(Text, nullable=True)
     date = Column(String, nullable=True)
@@ -196,7 +228,7 @@ class Certification(Base):
     __tablename__ = "certifications"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
     title = Column(String)
     issuer = Column(String)
     date = Column(String, nullable=True)
@@ -205,6 +237,11 @@ class Certification(Base):
 
 class SkillGap(Base):
     __tablename__ = "skill_gaps"
+    __table_args__ = (
+        # One row per (user, canonical skill) -> bulk ON CONFLICT upserts in backend/skills.py
+        Index("uq_skill_gaps_user_skill", "user_id", "skill_name", unique=True),
+        Index("ix_skill_gaps_user_frequency", "user_id", "frequency"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -231,13 +268,118 @@ class AIFeedback(Base):
 
 class Waitlist(Base):
     __tablename__ = "waitlist"
+    __table_args__ = (Index("uq_waitlist_category_email", "category", "email", unique=True),)
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, index=True)
     category = Column(String)
     joined_at = Column(DateTime, default=datetime.utcnow)
+
+class OTPChallenge(Base):
+    """Pending OTP (signup / login / password reset) shared by all workers. See backend/otp_store.py."""
+    __tablename__ = "otp_challenges"
+    __table_args__ = (Index("ix_otp_challenges_expires_at", "expires_at"),)
+
+    key = Column(String, primary_key=True)  # normalized email
+    purpose = Column(String, primary_key=True)  # one pending challenge per (email, purpose)
+    code_hash = Column(String, nullable=False)
+    payload = Column(JSON)
+    attempts = Column(Integer, default=0, nullable=False)
+    expires_at = Column(DateTime, nullable=False)  # naive UTC
+    created_at = Column(DateTime, default=datetime.utcnow)
     
-# Run this block to create tables
+class RateLimitBucket(Base):
+    """Token bucket per (endpoint, client) shared by all workers. See backend/rate_limit.py."""
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = (Index("ix_rate_limit_buckets_updated_at", "updated_at"),)
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # unix time, so refill math is plain arithmetic in SQL
+
+class AIUsage(Base):
+    """Daily count of real LLM calls per subject (user:<id>, recruiter:<id>, ip:<addr>). See backend/ai_usage.py."""
+    __tablename__ = "ai_usage"
+    __table_args__ = (Index("uq_ai_usage_subject_day", "subject", "day", unique=True),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    subject = Column(String, nullable=False)
+    day = Column(Date, nullable=False)  # UTC
+    calls = Column(Integer, default=0, nullable=False)
+    last_call_at = Column(DateTime, default=datetime.utcnow)
+
+class EmailOutbox(Base):
+    """Queued outgoing email. Rows are claimed and sent by backend/email_outbox.py workers."""
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html = Column(Text, nullable=False)
+    attachment_path = Column(String, nullable=True)
+
+    status = Column(String, default="pending", nullable=False)  # pending / sending / sent / failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # naive UTC
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    provider_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+class DigestRun(Base):
+    """One daily job-alert run; cursor_user_id is the checkpoint a crashed run resumes from."""
+    __tablename__ = "digest_runs"
+    __table_args__ = (Index("uq_digest_runs_run_date", "run_date", unique=True),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_date = Column(Date, nullable=False)  # UTC day; one run per day across all workers
+    status = Column(String, default="running", nullable=False)  # running / done
+    jobs_since = Column(DateTime, nullable=False)  # oldest job creation time considered (naive UTC)
+    cursor_user_id = Column(Integer, default=0, nullable=False)
+    users_scanned = Column(Integer, default=0, nullable=False)
+    emails_queued = Column(Integer, default=0, nullable=False)
+    heartbeat_at = Column(DateTime, nullable=False)  # a run with a stale heartbeat can be taken over
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class CampaignRun(Base):
+    """Progress of one marketing campaign run (backend/campaigns.py), polled by the admin dashboard."""
+    __tablename__ = "campaign_runs"
+    __table_args__ = (Index("ix_campaign_runs_kind_status", "kind", "status"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # e.g. 'nudges'
+    status = Column(String, default="running", nullable=False)  # running / done / failed
+    candidates = Column(Integer, default=0, nullable=False)
+    processed = Column(Integer, default=0, nullable=False)
+    emails_queued = Column(Integer, default=0, nullable=False)
+    send_until = Column(DateTime, nullable=True)  # last scheduled send slot (rate limited), naive UTC
+    last_error = Column(Text, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class ResumeExtraction(Base):
+    """Extracted resume text keyed by the sha256 of the uploaded bytes (backend/resume_extraction.py)."""
+    __tablename__ = "resume_extractions"
+
+    sha256 = Column(String(64), primary_key=True)
+    extractor_version = Column(Integer, nullable=False)  # rows from an older extractor are re-parsed
+    text = Column(Text, nullable=False, default="")
+    pages = Column(Integer, default=0, nullable=False)
+    total_pages = Column(Integer, default=0, nullable=False)
+    fallback_used = Column(Boolean, default=False, nullable=False)
+    extractor = Column(String, nullable=True)  # which extractor produced the text (pypdf / pdfplumber / docx)
+    quality = Column(Float, nullable=True)  # text_quality() score, 0..1
+    size_bytes = Column(Integer, default=0, nullable=False)
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)  # for purging cold entries
+
+# Run this block to create / migrate tables (see backend/migrations.py)
 if __name__ == "__main__":
-    Base.metadata.create_all(bind=engine)
+    from backend.migrations import run_migrations
+    run_migrations()
     print("Database tables updated successfully")
\ No newline at end of file
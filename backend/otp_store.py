@@ -0,0 +1,188 @@
+# backend/otp_store.py
+# Shared store for one-time codes (signup / login / password reset, students and recruiters).
+#
+# The old module-level OTP_STORE dict lived in each worker's memory, so a code issued by one
+# gunicorn worker failed on another, and abandoned entries were never removed.
+#
+#   OTP_STORE_BACKEND=database  (default) -> otp_challenges table, works across workers
+#   OTP_STORE_BACKEND=memory              -> per-process dict, for tests / single-process dev
+#
+# There is one pending challenge per (key, purpose), so a password-reset code doesn't clobber a
+# pending signup code for the same email. Issuing a new code for the same purpose replaces the old
+# one but keeps its failed-attempt count until OTP_ATTEMPT_WINDOW_SECONDS after the first code, so
+# re-requesting codes doesn't buy fresh guesses. consume() verifies and deletes in a single
+# statement, so a code can only ever be used once.
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import case, delete, update, select
+from backend.database import engine, dialect_insert
+from backend.models import OTPChallenge
+from backend.principals import SECRET_KEY
+
+OTP_EXPIRY_SECONDS = 300  # 5 minutes
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+OTP_ATTEMPT_WINDOW_SECONDS = OTP_EXPIRY_SECONDS
+OTP_SWEEP_INTERVAL_SECONDS = 60
+
+def generate_code(length: int = 6) -> str:
+    return ''.join(str(secrets.randbelow(10)) for _ in range(length))
+
+def _hash_code(key: str, code: str) -> str:
+    # Codes are never stored in clear; keyed so equal codes for different emails don't match
+    return hmac.new(SECRET_KEY.encode("utf-8"), f"{key}:{code}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+def _normalize(key: str) -> str:
+    return (key or "").strip().lower()
+
+def _reject(challenge: Optional[dict], now: datetime):
+    """Raises the right 4xx for a failed verification of `challenge` (None = nothing pending)."""
+    if challenge is None:
+        raise HTTPException(status_code=400, detail="OTP expired or invalid")
+    if challenge["expires_at"] <= now:
+        raise HTTPException(status_code=400, detail="OTP expired")
+    if challenge["attempts"] >= OTP_MAX_ATTEMPTS:
+        raise HTTPException(status_code=429, detail="Too many attempts. Please request a new code in a few minutes.")
+    raise HTTPException(status_code=400, detail="Invalid OTP")
+
+# ===========================
+# 🧠 MEMORY BACKEND
+# ===========================
+
+class MemoryOTPStore:
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def issue(self, key: str, purpose: str, payload: dict = None, ttl: int = OTP_EXPIRY_SECONDS) -> str:
+        key, code = _normalize(key), generate_code()
+        now = datetime.utcnow()
+        with self._lock:
+            self._items = {k: v for k, v in self._items.items() if v["expires_at"] > now}
+            previous = self._items.get((key, purpose))
+            # Within the window a reissued code keeps the failed attempts of the one it replaces
+            if previous and previous["created_at"] > now - timedelta(seconds=OTP_ATTEMPT_WINDOW_SECONDS):
+                attempts, created_at = previous["attempts"], previous["created_at"]
+            else:
+                attempts, created_at = 0, now
+            self._items[(key, purpose)] = {"code_hash": _hash_code(key, code), "payload": payload or {},
+                                           "attempts": attempts, "expires_at": now + timedelta(seconds=ttl),
+                                           "created_at": created_at}
+        return code
+
+    def _verify(self, key: str, purpose: str, code: str, consume: bool) -> dict:
+        key, now = _normalize(key), datetime.utcnow()
+        with self._lock:
+            challenge = self._items.get((key, purpose))
+            if (challenge and challenge["expires_at"] > now and challenge["attempts"] < OTP_MAX_ATTEMPTS
+                    and hmac.compare_digest(challenge["code_hash"], _hash_code(key, code or ""))):
+                if consume:
+                    del self._items[(key, purpose)]
+                return dict(challenge["payload"])
+
+            if challenge and challenge["expires_at"] > now:
+                challenge["attempts"] += 1
+            snapshot = dict(challenge) if challenge else None
+        _reject(snapshot, now)
+
+    def check(self, key: str, purpose: str, code: str) -> dict:
+        return self._verify(key, purpose, code, consume=False)
+
+    def consume(self, key: str, purpose: str, code: str) -> dict:
+        return self._verify(key, purpose, code, consume=True)
+
+    def discard(self, key: str, purpose: str):
+        with self._lock:
+            self._items.pop((_normalize(key), purpose), None)
+
+# ===========================
+# 🐘 DATABASE BACKEND
+# ===========================
+
+class DatabaseOTPStore:
+    """otp_challenges table (migration 0005). Uses its own short transactions, not the request session."""
+
+    def __init__(self):
+        self._last_sweep = 0.0
+
+    def _sweep(self, conn, now: datetime):
+        # Expired rows are cleared at most once a minute per worker (indexed on expires_at)
+        if time.monotonic() - self._last_sweep < OTP_SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = time.monotonic()
+        conn.execute(delete(OTPChallenge).where(OTPChallenge.expires_at <= now))
+
+    def issue(self, key: str, purpose: str, payload: dict = None, ttl: int = OTP_EXPIRY_SECONDS) -> str:
+        key, code = _normalize(key), generate_code()
+        now = datetime.utcnow()
+        stmt = dialect_insert(engine)(OTPChallenge).values(
+            key=key, purpose=purpose, code_hash=_hash_code(key, code), payload=payload or {},
+            attempts=0, expires_at=now + timedelta(seconds=ttl), created_at=now,
+        )
+        # Replacing a code issued within the window keeps its failed attempts (and window start)
+        in_window = OTPChallenge.created_at > now - timedelta(seconds=OTP_ATTEMPT_WINDOW_SECONDS)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OTPChallenge.key, OTPChallenge.purpose],
+            set_={
+                "code_hash": stmt.excluded.code_hash,
+                "payload": stmt.excluded.payload,
+                "expires_at": stmt.excluded.expires_at,
+                "attempts": case((in_window, OTPChallenge.attempts), else_=0),
+                "created_at": case((in_window, OTPChallenge.created_at), else_=now),
+            },
+        )
+        with engine.begin() as conn:
+            self._sweep(conn, now)
+            conn.execute(stmt)
+        return code
+
+    def _verify(self, key: str, purpose: str, code: str, consume: bool) -> dict:
+        key, now = _normalize(key), datetime.utcnow()
+        match = (
+            (OTPChallenge.key == key)
+            & (OTPChallenge.purpose == purpose)
+            & (OTPChallenge.code_hash == _hash_code(key, code or ""))
+            & (OTPChallenge.expires_at > now)
+            & (OTPChallenge.attempts < OTP_MAX_ATTEMPTS)
+        )
+        with engine.begin() as conn:
+            # Verify (and consume) in ONE statement: two concurrent requests can't both succeed
+            stmt = delete(OTPChallenge) if consume else update(OTPChallenge).values(attempts=OTPChallenge.attempts)
+            row = conn.execute(stmt.where(match).returning(OTPChallenge.payload)).first()
+            if row:
+                return dict(row[0] or {})
+
+            conn.execute(
+                update(OTPChallenge)
+                .where(OTPChallenge.key == key, OTPChallenge.purpose == purpose, OTPChallenge.expires_at > now)
+                .values(attempts=OTPChallenge.attempts + 1)
+            )
+            challenge = conn.execute(
+                select(OTPChallenge.expires_at, OTPChallenge.attempts)
+                .where(OTPChallenge.key == key, OTPChallenge.purpose == purpose)
+            ).mappings().first()
+        _reject(dict(challenge) if challenge else None, now)
+
+    def check(self, key: str, purpose: str, code: str) -> dict:
+        return self._verify(key, purpose, code, consume=False)
+
+    def consume(self, key: str, purpose: str, code: str) -> dict:
+        return self._verify(key, purpose, code, consume=True)
+
+    def discard(self, key: str, purpose: str):
+        with engine.begin() as conn:
+            conn.execute(delete(OTPChallenge).where(OTPChallenge.key == _normalize(key), OTPChallenge.purpose == purpose))
+
+def build_otp_store():
+    backend = os.getenv("OTP_STORE_BACKEND", "database").lower()
+    if backend == "memory":
+        return MemoryOTPStore()
+    return DatabaseOTPStore()
+
+otp_store = build_otp_store()
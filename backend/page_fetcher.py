@@ -0,0 +1,310 @@
+# backend/page_fetcher.py
+# Job page text for /fetch-job-content (and anything else that turns a job URL into text).
+#
+# The old path downloaded the whole page, built a BeautifulSoup tree of all of it and kept 5000 chars,
+# again for every user pasting the same LinkedIn / Naukri link. Now:
+# - the extracted text is cached per normalized URL (case, fragment, click trackers, param order): fresh
+#   for JOB_PAGE_CACHE_TTL, then revalidated with If-None-Match / If-Modified-Since, so an unchanged
+#   page costs a 304 instead of a download and a parse. The normalized form is only the cache key; the
+#   page is always fetched from the URL as given
+# - concurrent requests for the same URL share one fetch
+# - the body is streamed through an incremental HTML -> text extractor (stdlib HTMLParser, no DOM)
+#   that drops script/style/nav/... subtrees as it goes, and reading stops once JOB_PAGE_MAX_BYTES have
+#   arrived or JOB_PAGE_TEXT_CHARS of text have been extracted
+# - the same pass keeps <title>, og:/description meta tags and any schema.org JobPosting JSON-LD,
+#   which most job boards and ATS pages embed, for callers that want fields rather than text
+import asyncio
+import codecs
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import httpx
+from starlette.concurrency import run_in_threadpool
+from backend.http_client import HTTP_RETRIES, RETRY_STATUSES, _TTLCache, get_http_client
+
+JOB_PAGE_MAX_BYTES = int(os.getenv("JOB_PAGE_MAX_BYTES", str(2 * 1024 * 1024)))
+JOB_PAGE_TEXT_CHARS = int(os.getenv("JOB_PAGE_TEXT_CHARS", "20000"))  # callers use the first few thousand
+JOB_PAGE_CACHE_TTL = int(os.getenv("JOB_PAGE_CACHE_TTL", "1800"))
+JOB_PAGE_CACHE_KEEP = int(os.getenv("JOB_PAGE_CACHE_KEEP", "86400"))  # validators are kept this long
+JOB_PAGE_CACHE_SIZE = int(os.getenv("JOB_PAGE_CACHE_SIZE", "2000"))
+
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Referer": "https://www.google.com/",
+}
+
+# Query params that only record where a click came from (ads, newsletters, LinkedIn trk*). Generic
+# names like sid / src / ref often carry the posting or session on ATS pages, so they stay in the key
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid"}
+TRACKING_PREFIXES = ("utm_", "mc_", "trk")
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+class PageFetchError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+@dataclass
+class PageText:
+    url: str
+    text: str
+    truncated: bool = False  # stopped at the byte or text cap
+    cached: bool = False
+    revalidated: bool = False  # served from cache after a 304
+    title: str = ""
+    meta: Optional[Dict[str, str]] = None  # og:title, og:site_name, description, ...
+    job_posting: Optional[dict] = None  # schema.org JobPosting from JSON-LD
+
+def normalize_url(url: str) -> str:
+    """Cache / dedupe key for a URL. Never fetched or stored: the URL as given is."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k))
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+# ===========================
+# 📝 STREAMING HTML -> TEXT
+# ===========================
+
+class _TextExtractor(HTMLParser):
+    SKIP = {"script", "style", "nav", "footer", "header", "iframe", "svg", "noscript", "template"}
+    BLOCK = {"p", "div", "br", "li", "ul", "ol", "tr", "td", "th", "table", "section", "article", "main",
+             "h1", "h2", "h3", "h4", "h5", "h6", "dd", "dt", "dl", "pre", "blockquote", "title"}
+    META = {"og:title", "og:site_name", "og:description", "description", "twitter:title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.chars = 0
+        self.title = ""
+        self.meta = {}
+        self._skip_depth = 0
+        self._in_title = False
+        self._ld_json = None  # buffer while inside <script type="application/ld+json">
+        self._ld_blocks = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            attrs = dict(attrs)
+            name = (attrs.get("property") or attrs.get("name") or "").lower()
+            if name in self.META and attrs.get("content") and name not in self.meta:
+                self.meta[name] = attrs["content"].strip()
+            return
+        if tag == "script" and (dict(attrs).get("type") or "").lower() == "application/ld+json":
+            self._ld_json = []
+        if tag == "title":
+            self._in_title = True
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "meta":
+            return self.handle_starttag(tag, attrs)
+        if tag in self.BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._ld_json is not None:
+            self._ld_blocks.append("".join(self._ld_json))
+            self._ld_json = None
+        if tag == "title":
+            self._in_title = False
+        if tag in self.SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._ld_json is not None:
+            self._ld_json.append(data)
+        if self._in_title and not self.title:
+            self.title = data.strip()
+        if not self._skip_depth:
+            self.parts.append(data)
+            self.chars += len(data.strip())
+
+    def text(self) -> str:
+        # Same clean-up as the old BeautifulSoup version: trimmed lines, "  " splits, no blank lines
+        lines = (line.strip() for line in " ".join(self.parts).splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        return "\n".join(chunk for chunk in chunks if chunk)
+
+    def job_posting(self) -> Optional[dict]:
+        for block in self._ld_blocks:
+            try:
+                data = json.loads(block)
+            except ValueError:
+                continue
+            found = _find_job_posting(data)
+            if found:
+                return found
+        return None
+
+def _find_job_posting(data) -> Optional[dict]:
+    if isinstance(data, list):
+        return next(filter(None, (_find_job_posting(item) for item in data)), None)
+    if not isinstance(data, dict):
+        return None
+    kind = data.get("@type")
+    if kind == "JobPosting" or (isinstance(kind, list) and "JobPosting" in kind):
+        return data
+    return _find_job_posting(data.get("@graph", []))
+
+def html_to_text(html: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return parser.text()
+
+# ===========================
+# 📊 METRICS
+# ===========================
+
+class FetchMetrics:
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._fetch_ms = deque(maxlen=window)
+        self.outcomes = Counter()  # hit / miss / not_modified / shared / error
+        self.bytes_read = 0
+        self.truncated = 0
+
+    def record(self, outcome: str, seconds: float = 0.0, bytes_read: int = 0, truncated: bool = False):
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self.bytes_read += bytes_read
+            self.truncated += truncated
+            if outcome in ("miss", "not_modified"):
+                self._fetch_ms.append(seconds * 1000)
+
+    def snapshot(self) -> dict:
+        def pct(values, p):
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 1)
+
+        with self._lock:
+            return {
+                "cache_ttl_seconds": JOB_PAGE_CACHE_TTL, "max_bytes": JOB_PAGE_MAX_BYTES,
+                "outcomes": dict(self.outcomes), "bytes_read": self.bytes_read, "truncated": self.truncated,
+                "fetch_p50_ms": pct(self._fetch_ms, 0.50), "fetch_p95_ms": pct(self._fetch_ms, 0.95),
+            }
+
+metrics = FetchMetrics()
+_cache = _TTLCache(JOB_PAGE_CACHE_SIZE)
+_inflight: Dict[str, asyncio.Future] = {}
+
+def fetch_stats() -> dict:
+    return metrics.snapshot()
+
+# ===========================
+# 🌐 FETCH
+# ===========================
+
+async def _download(url: str, cached: Optional[dict]) -> Optional[dict]:
+    """Streams url into the extractor. Returns None on a 304 for the cached entry."""
+    headers = dict(BROWSER_HEADERS)
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    client = get_http_client()
+    for attempt in range(HTTP_RETRIES + 1):
+        try:
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.status_code in RETRY_STATUSES and attempt < HTTP_RETRIES:
+                    await asyncio.sleep(0.25 * 2 ** attempt)
+                    continue
+                if response.status_code == 304 and cached:
+                    return None
+                if response.status_code != 200:
+                    raise PageFetchError(f"Site returned status {response.status_code}", response.status_code)
+
+                parser = _TextExtractor()
+                decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+                size, truncated = 0, False
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    # Parsing is CPU work: keep it off the event loop, one chunk at a time
+                    await run_in_threadpool(parser.feed, decoder.decode(chunk))
+                    if size >= JOB_PAGE_MAX_BYTES or parser.chars >= JOB_PAGE_TEXT_CHARS:
+                        truncated = True
+                        break  # leaving the stream closes the connection; the rest is never read
+                parser.feed(decoder.decode(b"", final=True))
+                parser.close()
+                return {
+                    "text": parser.text(), "truncated": truncated, "bytes": size,
+                    "title": parser.title, "meta": parser.meta, "job_posting": parser.job_posting(),
+                    "etag": response.headers.get("etag"), "last_modified": response.headers.get("last-modified"),
+                }
+        except (httpx.TimeoutException, httpx.TransportError):
+            if attempt >= HTTP_RETRIES:
+                raise
+            await asyncio.sleep(0.25 * 2 ** attempt)
+
+def _page(url: str, entry: dict, **flags) -> PageText:
+    return PageText(url, entry["text"], entry["truncated"], title=entry["title"], meta=entry["meta"],
+                    job_posting=entry["job_posting"], **flags)
+
+async def _fetch(key: str, url: str) -> PageText:
+    cached = _cache.get(key)
+    if cached and cached["fresh_until"] > time.monotonic():
+        metrics.record("hit")
+        return _page(url, cached, cached=True)
+
+    started = time.perf_counter()
+    try:
+        entry = await _download(url, cached)
+    except Exception:
+        metrics.record("error", time.perf_counter() - started)
+        raise
+    revalidated = entry is None
+    if revalidated:
+        entry = cached
+        metrics.record("not_modified", time.perf_counter() - started)
+    else:
+        metrics.record("miss", time.perf_counter() - started, entry.pop("bytes"), entry["truncated"])
+
+    entry["fresh_until"] = time.monotonic() + JOB_PAGE_CACHE_TTL
+    if entry["etag"] or entry["last_modified"]:
+        _cache.put(key, entry, JOB_PAGE_CACHE_KEEP)
+    else:
+        _cache.put(key, entry, JOB_PAGE_CACHE_TTL)  # nothing to revalidate with
+    return _page(url, entry, cached=revalidated, revalidated=revalidated)
+
+async def fetch_page_text(url: str) -> PageText:
+    """Cached, conditional, size-capped page text. Raises PageFetchError / httpx errors."""
+    url = url.strip()
+    key = normalize_url(url)
+    if not urlsplit(key).hostname:
+        raise PageFetchError("Invalid URL")
+
+    shared = _inflight.get(key)
+    if shared:
+        metrics.record("shared")
+        return await asyncio.shield(shared)
+
+    task = asyncio.ensure_future(_fetch(key, url))
+    _inflight[key] = task
+    try:
+        return await asyncio.shield(task)
+    finally:
+        if _inflight.get(key) is task:
+            del _inflight[key]
@@ -0,0 +1,150 @@
+# backend/passwords.py
+# bcrypt hashing/verification on a dedicated, bounded executor.
+#
+# bcrypt is deliberately slow (~250ms at cost 12). Running it inline in sync endpoints ties up
+# Starlette's shared threadpool, so a login burst starved every other sync endpoint. Here at most
+# PASSWORD_HASH_WORKERS hashes run at once and at most PASSWORD_HASH_QUEUE_LIMIT more wait; beyond
+# that callers get a 503 with Retry-After immediately instead of queueing behind the burst.
+# The API is async only: the auth endpoints are `async def`, await the hash on the event loop and
+# run just their DB work through run_in_threadpool, so a queued hash holds no threadpool thread.
+# The bcrypt library releases the GIL while hashing, so a separate thread pool gets real CPU
+# parallelism without the fork/pickling overhead of a process pool.
+import os
+import threading
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from fastapi import HTTPException
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", str(PASSWORD_HASH_WORKERS * 8)))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 2
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+# Running + queued jobs; acquired without blocking so saturation is reported, not waited on
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT)
+
+# ===========================
+# 📊 LATENCY METRICS
+# ===========================
+
+class HashMetrics:
+    """Counters plus a rolling window of recent latencies (ms) per operation."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._window = window
+        self._ops = {}
+        self.rejected = 0
+
+    def record(self, op: str, queued_ms: float, run_ms: float):
+        with self._lock:
+            stats = self._ops.setdefault(op, {"count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                              "recent": deque(maxlen=self._window), "queued": deque(maxlen=self._window)})
+            stats["count"] += 1
+            stats["total_ms"] += run_ms
+            stats["max_ms"] = max(stats["max_ms"], run_ms)
+            stats["recent"].append(run_ms)
+            stats["queued"].append(queued_ms)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self) -> dict:
+        def pct(values, p):
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 1)
+
+        with self._lock:
+            ops = {
+                op: {
+                    "count": s["count"],
+                    "avg_ms": round(s["total_ms"] / s["count"], 1) if s["count"] else 0.0,
+                    "p50_ms": pct(s["recent"], 0.50),
+                    "p95_ms": pct(s["recent"], 0.95),
+                    "max_ms": round(s["max_ms"], 1),
+                    "queue_wait_p95_ms": pct(s["queued"], 0.95),
+                }
+                for op, s in self._ops.items()
+            }
+            return {"workers": PASSWORD_HASH_WORKERS, "queue_limit": PASSWORD_HASH_QUEUE_LIMIT,
+                    "bcrypt_rounds": BCRYPT_ROUNDS, "rejected": self.rejected, "operations": ops}
+
+metrics = HashMetrics()
+
+# ===========================
+# ⚙️ EXECUTOR
+# ===========================
+
+def _timed(op: str, fn, submitted_at: float, *args):
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        finished = time.perf_counter()
+        metrics.record(op, (started - submitted_at) * 1000, (finished - started) * 1000)
+
+def _submit(op: str, fn, *args):
+    if not _slots.acquire(blocking=False):
+        metrics.reject()
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+        )
+    future = _executor.submit(_timed, op, fn, time.perf_counter(), *args)
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+def _hashpw(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+def _checkpw(password: str, password_hash: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Malformed / empty stored hash
+        return False
+
+# ===========================
+# 🔐 PUBLIC API
+# ===========================
+
+async def hash_password_async(password: str) -> str:
+    """Hashes on the bcrypt executor. Raises 503 (with Retry-After) when the executor is saturated."""
+    return await asyncio.wrap_future(_submit("hash", _hashpw, password))
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    if not password_hash:
+        return False
+    return await asyncio.wrap_future(_submit("verify", _checkpw, password, password_hash))
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when a stored hash was made with a different cost factor than BCRYPT_ROUNDS."""
+    # Format: $2b$<cost>$<salt+hash>
+    try:
+        return int(password_hash.split("$")[2]) != BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+async def rehash_if_needed_async(account, password: str) -> bool:
+    """
+    Call after a successful verify: upgrades account.password_hash to the current cost factor.
+    Returns True if it changed (caller commits). A saturated executor just skips the upgrade.
+    """
+    if not needs_rehash(account.password_hash):
+        return False
+    try:
+        account.password_hash = await hash_password_async(password)
+    except HTTPException:
+        return False
+    return True
+
+def password_hash_stats() -> dict:
+    return metrics.snapshot()
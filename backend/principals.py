@@ -0,0 +1,155 @@
+# backend/principals.py
+# Shared JWT auth dependencies.
+#
+# Every authenticated request used to decode the token and SELECT the full User/Recruiter row.
+# Verified tokens are now mapped to a slim Principal (id, role, verification state) kept in a
+# short-TTL LRU keyed by the token's sha256, so hot endpoints skip both the decode and the lookup.
+# Call invalidate_principal(role, id) after changing a user's profile/verification or deleting them.
+# The cache is per process: other workers pick the change up within PRINCIPAL_CACHE_TTL_SECONDS.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import jwt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from backend.database import get_db
+from backend.models import User, Recruiter
+
+SECRET_KEY = os.getenv("SECRET_KEY", "your_super_secret_key_change_this")
+ALGORITHM = "HS256"
+
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    role: str  # "student" | "recruiter"
+    is_verified: bool = False
+    verification_status: Optional[str] = None
+
+# ===========================
+# 🧠 PRINCIPAL CACHE
+# ===========================
+
+class PrincipalCache:
+    """Thread-safe LRU of token hash -> (expires_at, Principal)."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, key: str, principal: Principal, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, role: str, principal_id: int) -> int:
+        # Only runs on profile/verification writes, so a scan of the (bounded) cache is fine
+        with self._lock:
+            stale = [key for key, (_, p) in self._entries.items() if p.role == role and p.id == principal_id]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
+def invalidate_principal(role: str, principal_id: int):
+    """Drops every cached token for this account so the next request re-reads it from the DB."""
+    principal_cache.invalidate(role, principal_id)
+
+# ===========================
+# 🔐 DEPENDENCIES
+# ===========================
+
+def _load_principal(db: Session, role: str, principal_id: int) -> Optional[Principal]:
+    if role == "student":
+        row = db.query(User.id, User.is_student_verified).filter(User.id == principal_id).first()
+        return Principal(id=row[0], role=role, is_verified=bool(row[1])) if row else None
+    if role == "recruiter":
+        row = db.query(Recruiter.id, Recruiter.is_verified, Recruiter.verification_status)\
+            .filter(Recruiter.id == principal_id).first()
+        return Principal(id=row[0], role=role, is_verified=bool(row[1]), verification_status=row[2]) if row else None
+    return None
+
+def principal_from_token(token: str, db: Session) -> Principal:
+    """Returns the cached principal for a token, decoding and loading it on a miss. Raises 401."""
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    principal = principal_cache.get(key)
+    if principal:
+        return principal
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    try:
+        principal_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    principal = _load_principal(db, payload.get("role"), principal_id)
+    if not principal:
+        raise HTTPException(status_code=401, detail="Account not found")
+
+    # Never keep a principal around longer than the token itself is valid
+    ttl = PRINCIPAL_CACHE_TTL_SECONDS
+    if payload.get("exp"):
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        principal_cache.put(key, principal, ttl)
+    return principal
+
+def get_principal(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> Principal:
+    return principal_from_token(credentials.credentials, db)
+
+def get_optional_principal(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+                           db: Session = Depends(get_db)) -> Optional[Principal]:
+    """The caller's principal when a valid bearer token is sent, else None (anonymous)."""
+    if not credentials:
+        return None
+    try:
+        return principal_from_token(credentials.credentials, db)
+    except HTTPException:
+        return None
+
+def get_student_principal(principal: Principal = Depends(get_principal)) -> Principal:
+    if principal.role != "student":
+        raise HTTPException(status_code=403, detail="Only candidates can access this")
+    return principal
+
+def get_recruiter_principal(principal: Principal = Depends(get_principal)) -> Principal:
+    if principal.role != "recruiter":
+        raise HTTPException(status_code=403, detail="Only recruiters can access this")
+    return principal
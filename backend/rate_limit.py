@@ -0,0 +1,141 @@
+# backend/rate_limit.py
+# Rate limiting shared by every worker (replaces slowapi's per-process counters, which let the
+# real limit grow with the gunicorn worker count).
+#
+# Each (endpoint, client) pair is a token bucket: capacity = the number in "5/minute", refilled
+# continuously at capacity/period. Taking a token is ONE upsert statement that refills, checks and
+# decrements atomically, so concurrent requests on different workers can't overspend.
+#
+#   RATE_LIMIT_BACKEND=database  (default) -> rate_limit_buckets table (migration 0006)
+#   RATE_LIMIT_BACKEND=memory              -> per-process dict, for tests / single-process dev
+#
+# Usage stays the same as slowapi: the endpoint takes `request: Request` and is decorated with
+#   @limiter.limit("5/minute")
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+from fastapi import HTTPException
+from sqlalchemy import delete, select, func
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from backend.database import engine, dialect_insert
+from backend.models import RateLimitBucket
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+BUCKET_SWEEP_INTERVAL_SECONDS = 600
+BUCKET_IDLE_SECONDS = 86400
+
+def parse_rate(rate: str):
+    """'5/minute' -> (capacity 5, refill 5/60 tokens per second)."""
+    amount, _, period = rate.partition("/")
+    seconds = PERIODS[period.strip().rstrip("s")]
+    capacity = int(amount)
+    return capacity, capacity / seconds
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+# ===========================
+# 🧠 MEMORY BACKEND
+# ===========================
+
+class MemoryBuckets:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, refill_per_second: float):
+        """Returns (allowed, retry_after_seconds)."""
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return False, (1 - tokens) / refill_per_second
+            self._buckets[key] = (tokens - 1, now)
+            return True, 0.0
+
+# ===========================
+# 🐘 DATABASE BACKEND
+# ===========================
+
+class DatabaseBuckets:
+    def __init__(self):
+        self._last_sweep = 0.0
+        self._insert = dialect_insert(engine)
+        if self._insert is None:
+            raise RuntimeError(f"RATE_LIMIT_BACKEND=database needs Postgres or SQLite, not {engine.dialect.name}")
+        self._least = func.least if engine.dialect.name == "postgresql" else func.min
+
+    def _sweep(self, conn, now: float):
+        # Idle buckets are full again anyway; drop them so the table only holds recent clients
+        if now - self._last_sweep < BUCKET_SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+        conn.execute(delete(RateLimitBucket).where(RateLimitBucket.updated_at < now - BUCKET_IDLE_SECONDS))
+
+    def take(self, key: str, capacity: int, refill_per_second: float):
+        now = time.time()
+        refilled = self._least(capacity, RateLimitBucket.tokens + (now - RateLimitBucket.updated_at) * refill_per_second)
+
+        stmt = self._insert(RateLimitBucket).values(key=key, tokens=capacity - 1, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RateLimitBucket.key],
+            set_={"tokens": refilled - 1, "updated_at": now},
+            where=refilled >= 1,
+        ).returning(RateLimitBucket.tokens)
+
+        with engine.begin() as conn:
+            self._sweep(conn, now)
+            if conn.execute(stmt).first():
+                return True, 0.0
+            tokens = conn.execute(select(refilled).where(RateLimitBucket.key == key)).scalar() or 0
+        return False, (1 - tokens) / refill_per_second
+
+# ===========================
+# 🚦 LIMITER
+# ===========================
+
+class RateLimiter:
+    def __init__(self, key_func=client_ip, backend=None):
+        self.key_func = key_func
+        if backend is None:
+            backend = MemoryBuckets() if os.getenv("RATE_LIMIT_BACKEND", "database").lower() == "memory" else DatabaseBuckets()
+        self.backend = backend
+
+    def hit(self, scope: str, rate: str, request: Request):
+        """Takes one token for this client, or raises 429 with Retry-After."""
+        capacity, refill = parse_rate(rate)
+        allowed, retry_after = self.backend.take(f"{scope}:{self.key_func(request)}", capacity, refill)
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded: {rate}",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    def limit(self, rate: str):
+        parse_rate(rate)  # fail at import time on a typo, not on the first request
+
+        def decorator(fn):
+            scope = fn.__name__
+            if "request" not in inspect.signature(fn).parameters:
+                raise TypeError(f"{scope} needs a 'request: Request' parameter to be rate limited")
+
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    await run_in_threadpool(self.hit, scope, rate, kwargs["request"])
+                    return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                self.hit(scope, rate, kwargs["request"])
+                return fn(*args, **kwargs)
+            return wrapper
+        return decorator
@@ -0,0 +1,411 @@
+# backend/resume_extraction.py
+# Resume text extraction: one engine for every upload path, run off the event loop.
+#
+# Extractors are plain functions registered in EXTRACTORS; each file kind has a chain tried cheapest
+# first (RESUME_PDF_EXTRACTORS to reorder). text_quality() scores every result and the engine stops at
+# the first one scoring RESUME_MIN_QUALITY or better, else keeps the best:
+# - pypdf: fast, fine for most single-column resumes
+# - pdfplumber: layout-aware, needed for designed templates where pypdf letter-spaces the text
+# - docx: streams word/document.xml out of the zip (no more decode('utf-8') of a zip file)
+#
+# Parsing is CPU-bound, so documents go to a bounded process pool:
+# - RESUME_PARSE_WORKERS processes, at most RESUME_PARSE_QUEUE_LIMIT more documents waiting (then 503)
+# - RESUME_PARSE_TIMEOUT_SECONDS per document; a stuck parse kills and replaces the pool
+# - only the first RESUME_MAX_PAGES pages are read
+# Per-page parse time, extractor usage, timeouts and failures are exposed by extraction_stats().
+#
+# Results are cached in resume_extractions by the sha256 of the uploaded bytes (migration 0010), shared
+# by /parse-resume and /users/{id}/resume: a re-upload or a repeated check never parses the file again.
+# Bump EXTRACTOR_VERSION when the extraction output changes so old rows are re-parsed on next use.
+#
+#   python -m backend.resume_extraction bench [directory] [rounds]   # throughput + quality per extractor
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Union
+from xml.etree import ElementTree
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from starlette.concurrency import run_in_threadpool
+from backend.database import engine, dialect_insert
+from backend.models import ResumeExtraction
+from backend.uploads import ReceivedUpload, HEAD_BYTES
+
+RESUME_PARSE_WORKERS = int(os.getenv("RESUME_PARSE_WORKERS", str(min(2, os.cpu_count() or 1))))
+RESUME_PARSE_QUEUE_LIMIT = int(os.getenv("RESUME_PARSE_QUEUE_LIMIT", str(RESUME_PARSE_WORKERS * 4)))
+RESUME_PARSE_TIMEOUT_SECONDS = float(os.getenv("RESUME_PARSE_TIMEOUT_SECONDS", "15"))
+RESUME_MAX_PAGES = int(os.getenv("RESUME_MAX_PAGES", "10"))
+RESUME_MIN_QUALITY = float(os.getenv("RESUME_MIN_QUALITY", "0.8"))
+RESUME_PDF_EXTRACTORS = tuple(os.getenv("RESUME_PDF_EXTRACTORS", "pypdf,pdfplumber").split(","))
+MIN_TEXT_CHARS = 50  # less than this is treated as a failed extraction
+DOCX_MAX_XML_BYTES = 20 * 1024 * 1024  # uncompressed document.xml limit (zip bombs)
+EXTRACTOR_VERSION = 2
+PDF_X_TOLERANCE = 2
+
+class ExtractionTimeout(Exception):
+    pass
+
+@dataclass
+class ExtractionResult:
+    text: str
+    pages: int = 0          # pages actually parsed
+    total_pages: int = 0
+    fallback_used: bool = False  # the first extractor in the chain wasn't good enough
+    seconds: float = 0.0
+    extractor: str = ""
+    quality: float = 0.0
+    cached: bool = False
+    sha256: str = ""  # of the uploaded bytes
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_pages > self.pages
+
+# ===========================
+# 🧪 EXTRACTORS (run in the child process)
+# ===========================
+
+def _pypdf(content: bytes, max_pages: int) -> tuple:
+    import pypdf
+    reader = pypdf.PdfReader(io.BytesIO(content))
+    pages = reader.pages[:max_pages]
+    return "\n".join(page.extract_text() or "" for page in pages), len(pages), len(reader.pages)
+
+def _pdfplumber(content: bytes, max_pages: int) -> tuple:
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        pages = pdf.pages[:max_pages]
+        text = "\n".join(page.extract_text(x_tolerance=PDF_X_TOLERANCE) or "" for page in pages)
+        return text, len(pages), len(pdf.pages)
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def _docx(content: bytes, max_pages: int) -> tuple:
+    """Paragraph text of word/document.xml, parsed incrementally straight from the zip member."""
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        if archive.getinfo("word/document.xml").file_size > DOCX_MAX_XML_BYTES:
+            raise ValueError("document.xml is too large")
+        parts, page = [], 1
+        with archive.open("word/document.xml") as xml:
+            for _, element in ElementTree.iterparse(xml, events=("end",)):
+                tag = element.tag
+                if tag == _W + "t":
+                    parts.append(element.text or "")
+                elif tag == _W + "tab":
+                    parts.append("\t")
+                elif tag in (_W + "br", _W + "cr"):
+                    if element.get(_W + "type") == "page":
+                        page += 1
+                    parts.append("\n")
+                elif tag == _W + "lastRenderedPageBreak":
+                    page += 1
+                elif tag == _W + "p":
+                    parts.append("\n")
+                    element.clear()  # keeps memory flat on long documents
+                if page > max_pages:
+                    return "".join(parts), max_pages, page
+    return "".join(parts), page, page
+
+def _plain(content: bytes, max_pages: int) -> tuple:
+    return content.decode("utf-8", errors="ignore"), 1, 1
+
+# Add an extractor by registering it here and listing it in a chain
+EXTRACTORS = {"pypdf": _pypdf, "pdfplumber": _pdfplumber, "docx": _docx, "text": _plain}
+CHAINS = {"pdf": RESUME_PDF_EXTRACTORS, "docx": ("docx",), "text": ("text",)}
+
+def detect_kind(content: bytes, filename: str) -> str:
+    """File kind by magic bytes (the first HEAD_BYTES are enough), falling back to the extension."""
+    name = (filename or "").lower()
+    if content[:5] == b"%PDF-":
+        return "pdf"
+    if content[:4] == b"PK\x03\x04" and (name.endswith(".docx") or b"word/" in content[:4096]):
+        return "docx"
+    if name.endswith(".pdf"):
+        return "pdf"
+    return "text"
+
+def text_quality(text: str) -> float:
+    """
+    0..1 estimate of how usable an extraction is. Penalises near-empty output, letter-spaced words
+    ("R e s u l t s", typical of pypdf on designed templates), words glued together, and unmapped
+    glyphs ("(cid:12)", U+FFFD).
+    """
+    stripped = text.strip()
+    if len(stripped) < MIN_TEXT_CHARS:
+        return 0.0
+    words = stripped.split()
+    single = sum(len(word) == 1 for word in words) / len(words)
+    glued = sum(len(word) > 30 and "/" not in word and "@" not in word for word in words) / len(words)
+    garbage = (stripped.count("�") + stripped.count("(cid:") * 6) / len(stripped)
+    score = 1.0 - max(0.0, single - 0.15) * 2 - glued * 5 - garbage * 10
+    return round(max(0.0, min(1.0, score)), 3)
+
+def _extract(content: bytes, kind: str, chain: tuple, max_pages: int) -> dict:
+    started = time.perf_counter()
+    best = None
+    for position, name in enumerate(chain):
+        try:
+            text, pages, total_pages = EXTRACTORS[name](content, max_pages)
+        except Exception:
+            continue
+        quality = text_quality(text)
+        if best is None or quality > best["quality"]:
+            best = {"text": text, "pages": pages, "total_pages": total_pages, "extractor": name,
+                    "quality": quality, "fallback_used": position > 0}
+        if quality >= RESUME_MIN_QUALITY:
+            break
+    best = best or {"text": "", "extractor": "", "fallback_used": len(chain) > 1}
+    best["seconds"] = time.perf_counter() - started
+    return best
+
+# ===========================
+# 📊 METRICS
+# ===========================
+
+class ExtractionMetrics:
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._per_page_ms = deque(maxlen=window)
+        self._per_doc_ms = deque(maxlen=window)
+        self._quality = deque(maxlen=window)
+        self.by_extractor = Counter()
+        self.documents = self.pages = self.fallbacks = self.truncated = 0
+        self.timeouts = self.failures = self.rejected = 0
+        self.cache_hits = self.cache_misses = 0
+
+    def record(self, result: ExtractionResult):
+        with self._lock:
+            self.documents += 1
+            self.pages += result.pages
+            self.fallbacks += result.fallback_used
+            self.truncated += result.truncated
+            self.by_extractor[result.extractor or "none"] += 1
+            self._quality.append(result.quality)
+            self._per_doc_ms.append(result.seconds * 1000)
+            if result.pages:
+                self._per_page_ms.append(result.seconds * 1000 / result.pages)
+
+    def count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self) -> dict:
+        def pct(values, p):
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 1)
+
+        with self._lock:
+            return {
+                "workers": RESUME_PARSE_WORKERS, "queue_limit": RESUME_PARSE_QUEUE_LIMIT,
+                "timeout_seconds": RESUME_PARSE_TIMEOUT_SECONDS, "max_pages": RESUME_MAX_PAGES,
+                "documents": self.documents, "pages": self.pages,
+                "fallback_used": self.fallbacks, "truncated": self.truncated,
+                "by_extractor": dict(self.by_extractor),
+                "low_quality": sum(q < RESUME_MIN_QUALITY for q in self._quality),
+                "timeouts": self.timeouts, "failures": self.failures, "rejected": self.rejected,
+                "cache_hits": self.cache_hits, "cache_misses": self.cache_misses,
+                "per_page_p50_ms": pct(self._per_page_ms, 0.50), "per_page_p95_ms": pct(self._per_page_ms, 0.95),
+                "per_document_p95_ms": pct(self._per_doc_ms, 0.95),
+            }
+
+metrics = ExtractionMetrics()
+
+# ===========================
+# ⚙️ POOL
+# ===========================
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(RESUME_PARSE_WORKERS + RESUME_PARSE_QUEUE_LIMIT)
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the API process runs threads (outbox, schedulers), which don't survive a fork safely
+            _pool = ProcessPoolExecutor(max_workers=RESUME_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Kills a pool with a stuck/broken worker; the next document starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    # A running task can't be cancelled, so terminate the processes (private attr, no public API for this)
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_extraction_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+async def _extract_in_pool(content: bytes, kind: str) -> ExtractionResult:
+    """
+    Runs the kind's extractor chain in the process pool. Raises 503 when the pool is saturated and
+    ExtractionTimeout when the document takes longer than RESUME_PARSE_TIMEOUT_SECONDS.
+    """
+    if not _slots.acquire(blocking=False):
+        metrics.count("rejected")
+        raise HTTPException(status_code=503, detail="Resume parser is busy, please try again shortly",
+                            headers={"Retry-After": "2"})
+    try:
+        for attempt in range(2):
+            pool = _get_pool()
+            future = pool.submit(_extract, content, kind, CHAINS[kind], RESUME_MAX_PAGES)
+            try:
+                raw = await asyncio.wait_for(asyncio.wrap_future(future), RESUME_PARSE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                metrics.count("timeouts")
+                _discard_pool(pool)
+                raise ExtractionTimeout(f"Resume parsing took longer than {RESUME_PARSE_TIMEOUT_SECONDS:g}s")
+            except BrokenProcessPool:
+                # Another document's timeout (or a crashed worker) took the pool down; retry once
+                _discard_pool(pool)
+                if attempt:
+                    metrics.count("failures")
+                    raise
+                continue
+            result = ExtractionResult(**raw)
+            metrics.record(result)
+            return result
+    finally:
+        _slots.release()
+
+# ===========================
+# 🗄️ CACHE (content-addressed)
+# ===========================
+
+def _cached(digest: str) -> Optional[ExtractionResult]:
+    with engine.begin() as conn:
+        row = conn.execute(
+            update(ResumeExtraction)
+            .where(ResumeExtraction.sha256 == digest, ResumeExtraction.extractor_version == EXTRACTOR_VERSION)
+            .values(hits=ResumeExtraction.hits + 1, last_used_at=datetime.utcnow())
+            .returning(ResumeExtraction.text, ResumeExtraction.pages, ResumeExtraction.total_pages,
+                       ResumeExtraction.fallback_used, ResumeExtraction.extractor, ResumeExtraction.quality)
+        ).first()
+    if not row:
+        return None
+    return ExtractionResult(text=row.text, pages=row.pages, total_pages=row.total_pages, fallback_used=row.fallback_used,
+                            extractor=row.extractor or "", quality=row.quality or 0.0, cached=True)
+
+def _store(digest: str, size: int, result: ExtractionResult):
+    values = {"text": result.text, "pages": result.pages, "total_pages": result.total_pages,
+              "fallback_used": result.fallback_used, "extractor": result.extractor, "quality": result.quality,
+              "size_bytes": size, "extractor_version": EXTRACTOR_VERSION, "last_used_at": datetime.utcnow()}
+    insert = dialect_insert(engine)(ResumeExtraction).values(sha256=digest, hits=0, created_at=datetime.utcnow(), **values)
+    with engine.begin() as conn:
+        conn.execute(insert.on_conflict_do_update(index_elements=[ResumeExtraction.sha256], set_=values))
+
+# ===========================
+# 📄 PUBLIC API
+# ===========================
+
+async def extract_resume_text(source: Union[ReceivedUpload, bytes], filename: str = "") -> ExtractionResult:
+    """
+    Text of an uploaded resume (PDF, DOCX or plain text). Looked up by content hash first and only
+    parsed on a miss, so a cached upload is never read into memory here. Cache errors never fail the upload.
+    """
+    if isinstance(source, ReceivedUpload):
+        digest, head, size, load = source.sha256, source.head, source.size, source.read
+        filename = filename or source.filename
+    else:
+        digest, head, size, load = hashlib.sha256(source).hexdigest(), source[:HEAD_BYTES], len(source), lambda: source
+    kind = detect_kind(head, filename)
+    if kind == "text":
+        text = (await run_in_threadpool(load)).decode("utf-8", errors="ignore")
+        return ExtractionResult(text=text, pages=1, total_pages=1, extractor="text", quality=text_quality(text), sha256=digest)
+
+    try:
+        hit = await run_in_threadpool(_cached, digest)
+    except Exception as e:
+        print(f"⚠️ Resume cache lookup failed: {e}")
+        hit = None
+    if hit:
+        metrics.count("cache_hits")
+        hit.sha256 = digest
+        return hit
+
+    metrics.count("cache_misses")
+    result = await _extract_in_pool(await run_in_threadpool(load), kind)
+    result.sha256 = digest
+    try:
+        await run_in_threadpool(_store, digest, size, result)
+    except Exception as e:
+        print(f"⚠️ Resume cache write failed: {e}")
+    return result
+
+def purge_extractions(older_than_days: int = 180) -> int:
+    """Deletes cache rows not used for older_than_days (e.g. from a cron job)."""
+    with engine.begin() as conn:
+        return conn.execute(
+            delete(ResumeExtraction).where(ResumeExtraction.last_used_at < datetime.utcnow() - timedelta(days=older_than_days))
+        ).rowcount
+
+def extraction_stats() -> dict:
+    return metrics.snapshot()
+
+# ===========================
+# 📊 BENCHMARK
+# ===========================
+
+def _bench(directory: str, rounds: int):
+    """Every extractor of each file's chain, in-process, plus the engine's pick."""
+    files = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                   if os.path.isfile(os.path.join(directory, name)))
+    totals = {}
+    print(f"{'file':<42} {'extractor':<11} {'ms':>7} {'pages':>5} {'chars':>6} {'quality':>7}")
+    for path in files:
+        with open(path, "rb") as f:
+            content = f.read()
+        kind = detect_kind(content, path)
+        for name in CHAINS[kind]:
+            started = time.perf_counter()
+            try:
+                for _ in range(rounds):
+                    text, pages, _total = EXTRACTORS[name](content, RESUME_MAX_PAGES)
+            except Exception as e:
+                print(f"{os.path.basename(path)[:42]:<42} {name:<11} failed: {e}")
+                continue
+            ms = (time.perf_counter() - started) * 1000 / rounds
+            quality = text_quality(text)
+            total = totals.setdefault(name, [0.0, 0, 0.0, 0])
+            total[0] += ms; total[1] += pages; total[2] += quality; total[3] += 1
+            print(f"{os.path.basename(path)[:42]:<42} {name:<11} {ms:7.1f} {pages:5} {len(text):6} {quality:7.2f}")
+        picked = _extract(content, kind, CHAINS[kind], RESUME_MAX_PAGES)
+        total = totals.setdefault("engine", [0.0, 0, 0.0, 0])
+        total[0] += picked["seconds"] * 1000; total[1] += picked.get("pages", 0)
+        total[2] += picked.get("quality", 0.0); total[3] += 1
+        print(f"{'  -> engine picked':<42} {picked['extractor'] or '-':<11} {picked['seconds'] * 1000:7.1f} "
+              f"{picked.get('pages', 0):5} {len(picked['text']):6} {picked.get('quality', 0.0):7.2f}")
+
+    print()
+    for name, (ms, pages, quality, count) in totals.items():
+        per_second = pages / (ms / 1000) if ms else 0.0
+        print(f"📊 {name:>10}: {count} files, {pages} pages in {ms:,.0f} ms -> {per_second:,.1f} pages/sec, "
+              f"mean quality {quality / count:.2f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        _bench(sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(__file__), "static", "resumes"),
+               int(sys.argv[3]) if len(sys.argv) > 3 else 3)
+    else:
+        print("Usage: python -m backend.resume_extraction bench [directory] [rounds]")
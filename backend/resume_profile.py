@@ -0,0 +1,412 @@
+# backend/resume_profile.py
+# Structured resume profile, built once when a resume is uploaded.
+#
+# The extracted text is split into sections by their headings (SKILLS, EXPERIENCE, EDUCATION,
+# PROJECTS, ...) and each section is parsed with plain rules, no LLM call:
+# - skills: vocabulary matches (backend/skills.py) in the skills section and the rest of the text, plus
+#   single tool-like tokens from the skills section; only vocabulary skills are copied to users.skills
+# - experience: entries anchored on date ranges ("12/2024 - 04/2025", "Jan 2023 - Present") or
+#   durations ("(3 Months)"); total_experience_years merges overlapping ranges
+# - education: degree / field / institution / year / grade, with the keys the profile editor uses
+# - projects: title, short description, tech stack
+# The result is stored as JSON in users.resume_profile next to the file's sha256 (migration 0012).
+# Matching and prompt building read it through resume_for_ai() instead of the raw resume_text blob.
+import json
+import re
+from datetime import date
+from typing import List, Optional
+from backend.skills import find_known_skills, is_known_skill, normalize_skills
+
+PROFILE_VERSION = 3
+MAX_SKILLS = 40
+MAX_ENTRIES = 10
+DESCRIPTION_CHARS = 300
+SUMMARY_CHARS = 500
+AI_TEXT_CHARS = 3000
+
+SECTION_HEADINGS = {
+    "summary": ["summary", "professional summary", "profile", "profile summary", "career objective", "objective", "about me"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history",
+                   "work history", "internship", "internships", "internship experience"],
+    "education": ["education", "academic background", "academics", "educational qualification",
+                  "educational qualifications", "qualifications", "academic qualifications"],
+    "skills": ["skills", "technical skills", "key skills", "core skills", "skills and tools", "tools and technologies",
+               "technologies", "tech stack", "core competencies", "skill set", "skillset"],
+    "projects": ["projects", "project", "personal projects", "academic projects", "key projects"],
+    "certifications": ["certifications", "certification", "certificates", "courses", "licenses and certifications"],
+    "achievements": ["achievements", "key achievements", "awards", "awards and achievements", "accomplishments"],
+    "other": ["languages", "strengths", "hobbies", "interests", "declaration", "disclaimer", "additional information",
+              "references", "personal details"],
+}
+_HEADINGS = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+_MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+_DATE = r"(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s*'?\d{2,4}|\d{1,2}[/.]\d{4}|(?:19|20)\d{2})"
+_RANGE = re.compile(rf"({_DATE})\s*(?:-|–|—|to|till)\s*({_DATE}|present|current|now|till date|ongoing)", re.IGNORECASE)
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)\s*(months?|mos?|years?|yrs?)\b", re.IGNORECASE)
+_YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+_DEGREE = re.compile(
+    r"(?<![a-z])(b\.?\s?tech|m\.?\s?tech|b\.e\.?|m\.e\.?|b\.?\s?sc|m\.?\s?sc|bca|mca|bba|mba|b\.?\s?com|m\.?\s?com|"
+    r"b\.a\.?|m\.a\.?|ph\.?\s?d|bachelor[a-z']*(?: of [a-z ]+?)?|master[a-z']*(?: of [a-z ]+?)?|diploma|doctorate|hsc|ssc|"
+    r"higher secondary|senior secondary|secondary school|12th|10th|intermediate|matriculation)(?![a-z])",
+    re.IGNORECASE)
+_GRADE = re.compile(
+    r"\b(?:c?gpa|sgpa|cpi|percentage|grade)\s*[:\-]?\s*\d{1,2}(?:\.\d{1,2})?(?:\s*/\s*\d{1,2}(?:\.\d+)?)?%?"
+    r"|\b\d{1,2}(?:\.\d{1,2})?\s*(?:/\s*10(?:\.0)?\s*)?(?:c?gpa|cpi)\b|\b\d{2}(?:\.\d{1,2})?\s*%",
+    re.IGNORECASE)
+_SCHOOL = re.compile(r"\b(university|college|institute|school|academy|vidyalaya|polytechnic|iit|nit|iiit)\b", re.IGNORECASE)
+_TECH_LINE = re.compile(r"^(technologies|tech stack|tools|built with|stack)[^:]{0,20}:\s*", re.IGNORECASE)
+_STOPWORDS = {"and", "of", "with", "in", "the", "for", "to", "a", "an", "on", "using", "by"}
+# Words that label a skills list rather than name a skill ("Advanced: ...", "Tools", "Proficient in")
+_NOT_SKILLS = _STOPWORDS | {word for heading in _HEADINGS for word in heading.split()} | {
+    "advanced", "intermediate", "beginner", "basic", "basics", "proficient", "familiar", "expert", "expertise",
+    "knowledge", "good", "strong", "working", "hands", "other", "others", "etc", "software", "tool", "soft", "hard",
+    "technical", "programming", "frameworks", "framework", "libraries", "databases", "database", "version", "control",
+    "plugins", "themes", "platforms"}
+_SKILL_TOKEN = re.compile(r"[A-Za-z][A-Za-z0-9.+#-]{1,29}")
+
+# ===========================
+# ✂️ SECTIONS
+# ===========================
+
+def _heading_key(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z]+", " ", text.lower().replace("&", " and ")).split())
+
+def _heading(line: str) -> Optional[str]:
+    """Section name if the line is a heading (short, capitalised, no digits, a known title or ending in one)."""
+    if not line or len(line) > 40 or not line[0].isupper() or line.endswith(".") or re.search(r"\d", line):
+        return None
+    words = _heading_key(line).split()
+    if not words or len(words) > 4:
+        return None
+    for size in (len(words), 2, 1):
+        section = _HEADINGS.get(" ".join(words[-size:]))
+        if section:
+            return section
+    return None
+
+def split_sections(text: str) -> dict:
+    """section -> lines. Lines before the first heading go to 'header'. "Skills: a, b" lines are routed inline."""
+    sections = {"header": []}
+    current = "header"
+    for raw in (text or "").splitlines():
+        line = " ".join(raw.replace("​", " ").split())
+        if not line:
+            continue
+        label, colon, rest = line.partition(":")
+        inline = _heading(label) if colon and len(label) <= 40 else None
+        if inline and rest.strip():
+            sections.setdefault(inline, []).append(rest.strip())
+            continue
+        section = _heading(label if colon and not rest.strip() else line)
+        if section:
+            current = section
+            sections.setdefault(current, [])
+            continue
+        sections[current].append(line)
+    return sections
+
+def _is_bullet(line: str) -> bool:
+    return not (line[0].isalnum() or line[0] in "“\"'(")
+
+def _is_title(line: str) -> bool:
+    return len(line) <= 70 and len(line.split()) <= 9 and not line.endswith(".") and not _is_bullet(line)
+
+def _strip_bullet(line: str) -> str:
+    return re.sub(r"^[^\w(“\"']+", "", line)
+
+def _unquote(text: str) -> str:
+    return " ".join(re.sub(r"[“”\"]", "", text).split())
+
+def _unglue(text: str) -> str:
+    """"engagementDeveloped" -> "engagement Developed" (bullets that lost their line break); "WordPress" stays."""
+    return re.sub(r"\b\w{15,}\b", lambda word: re.sub(r"(?<=[a-z]{3})(?=[A-Z][a-z]{3})", " ", word.group(0)), text)
+
+def _clip(text: str, limit: int = DESCRIPTION_CHARS) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+# ===========================
+# 🛠️ SKILLS
+# ===========================
+
+def _skills_from_section(lines: List[str]) -> List[str]:
+    """
+    Vocabulary skills found in each list item; an item with none is kept only when it is a single
+    tool-like token ("Elementor"), never a phrase or a label ("Version Control", "Advanced", "Skills").
+    """
+    found = []
+    for line in lines:
+        line = _strip_bullet(line)
+        if ":" in line:
+            line = line.split(":", 1)[1]  # "Front-End: HTML, CSS"
+        for chunk in re.split(r"[,|;•·\t]| and | & ", line):
+            chunk = chunk.strip(" .()")
+            if not chunk or len(chunk) > 40 or re.search(r"www\.|://|@", chunk):
+                continue
+            known = find_known_skills(chunk, prose=False)
+            if known:
+                found.extend(known)
+            elif _SKILL_TOKEN.fullmatch(chunk) and chunk.lower() not in _NOT_SKILLS:
+                found.append(chunk)
+    return normalize_skills(found)
+
+# ===========================
+# 💼 EXPERIENCE
+# ===========================
+
+def _parse_date(text: str, today: date) -> tuple:
+    """(year, month, has_month) for one end of a range."""
+    value = text.lower().strip()
+    if value in ("present", "current", "now", "till date", "ongoing"):
+        return today.year, today.month, True
+    match = re.match(r"([a-z]{3})[a-z]*\.?\s*'?(\d{2,4})", value)
+    if match:
+        year = int(match.group(2))
+        return (year + 2000 if year < 100 else year), _MONTHS.index(match.group(1)) + 1, True
+    match = re.match(r"(\d{1,2})[/.](\d{4})", value)
+    if match:
+        return int(match.group(2)), max(1, min(12, int(match.group(1)))), True
+    return int(value[:4]), 1, False
+
+def _range_months(match, today: date) -> tuple:
+    """(start index, end index exclusive) in months, for merging overlapping ranges."""
+    start_year, start_month, _ = _parse_date(match.group(1), today)
+    end_year, end_month, has_month = _parse_date(match.group(2), today)
+    start = start_year * 12 + start_month - 1
+    end = end_year * 12 + end_month - 1 + (1 if has_month else 0)
+    return start, max(start, end)
+
+def _split_role(head: str) -> tuple:
+    for separator in (" at ", " @ ", " | ", ","):
+        if separator in head:
+            role, company = head.split(separator, 1)
+            return role.strip(" ,|–—-"), company.strip(" ,|–—-")
+    return head.strip(" ,|–—-"), ""
+
+def _parse_experience(lines: List[str], today: date) -> tuple:
+    entries, buffer, spans, extra_months = [], [], [], 0.0
+    expect_company = False
+
+    for line in lines:
+        span = _RANGE.search(line)
+        duration = None if span else _DURATION.search(line)
+        if span or (duration and _is_title(line)):
+            anchor = span or duration
+            head = line[:anchor.start()].strip(" ,|–—-:(")
+            header = []
+            if not head:
+                # role / company on the line(s) above the dates
+                while buffer and len(header) < 2 and _is_title(buffer[-1]):
+                    header.insert(0, buffer.pop())
+            if entries:
+                entries[-1]["description"] += " " + " ".join(buffer)
+            buffer = []
+
+            role, company = _split_role(head) if head else ((header or [""])[0], header[1] if len(header) > 1 else "")
+            entry = {"role": _unquote(role), "company": _unquote(company), "start_date": "", "end_date": "",
+                     "is_current": False, "description": ""}
+            if span:
+                entry["is_current"] = span.group(2).lower() in ("present", "current", "now", "till date", "ongoing")
+                entry["start_date"], entry["end_date"] = span.group(1), "Present" if entry["is_current"] else span.group(2)
+                spans.append(_range_months(span, today))
+            else:
+                amount, unit = float(duration.group(1)), duration.group(2).lower()
+                extra_months += amount if unit.startswith("m") else amount * 12
+            entries.append(entry)
+            expect_company = not entry["company"]
+            continue
+
+        if expect_company and _is_title(line):
+            entries[-1]["company"] = _unquote(line)
+            expect_company = False
+            continue
+        expect_company = False
+        buffer.append(_strip_bullet(line))
+
+    if entries:
+        entries[-1]["description"] += " " + " ".join(buffer)
+    for entry in entries:
+        entry["description"] = _clip(_unglue(entry["description"]))
+
+    # Merge overlapping ranges so concurrent jobs aren't counted twice
+    months, last_end = 0, None
+    for start, end in sorted(spans):
+        if last_end is not None and start < last_end:
+            start = last_end
+        if end > start:
+            months += end - start
+            last_end = end if last_end is None else max(last_end, end)
+    return entries[:MAX_ENTRIES], round((months + extra_months) / 12, 1)
+
+# ===========================
+# 🎓 EDUCATION / 🧩 PROJECTS
+# ===========================
+
+def _parse_education(lines: List[str]) -> List[dict]:
+    entries, current = [], None
+    for line in lines:
+        grade = _GRADE.search(line)
+        line = _GRADE.sub("", line) if grade else line
+        years = _YEAR.findall(line)
+        text = re.sub(r"\(\s*([^)]*?)\s*\)", r" (\1)", _RANGE.sub("", line))
+        text = re.sub(r"^completed\s+", "", text, flags=re.IGNORECASE)
+        text = re.sub(r"\(\s*\)", "", _YEAR.sub("", text)).strip(" ,|–—-")
+        parts = [part.strip(" ,|–—-") for part in re.split(r",| \| | – | - ", text) if part.strip(" ,|–—-")]
+        degree_part = next((part for part in parts if _DEGREE.search(part)), None)
+        school_part = next((part for part in parts if _SCHOOL.search(part) and part != degree_part), None)
+
+        degree = field = ""
+        if degree_part:
+            token = _DEGREE.search(degree_part)
+            outside_token = degree_part[:token.start()] + degree_part[token.end():]
+            if school_part is None and _SCHOOL.search(outside_token):
+                school_part = re.sub(r"\(\s*" + re.escape(token.group(0)) + r"\s*\)", "", degree_part).strip(" ,")
+                degree = token.group(0)
+            elif f"({token.group(0)}" in degree_part:
+                degree = token.group(0)
+            else:
+                degree = degree_part
+            degree, _, field = degree.partition(" in ")
+
+        if degree and (current is None or current["degree"]):
+            current = {"school": "", "degree": "", "field": "", "year": "", "grade": ""}
+            entries.append(current)
+        elif school_part and (current is None or (current["school"] and current["degree"])):
+            current = {"school": "", "degree": "", "field": "", "year": "", "grade": ""}
+            entries.append(current)
+        if current is None:
+            continue
+        if degree:
+            current["degree"], current["field"] = " ".join(degree.split()), field.strip()
+        if school_part and not current["school"]:
+            current["school"] = school_part
+        if years and not current["year"]:
+            current["year"] = max(years)
+        if grade and not current["grade"]:
+            current["grade"] = re.sub(r"\s*[:\-]\s*(?=\d)", " ", " ".join(grade.group(0).split()))  # "CGPA 8.5/10"
+    return [entry for entry in entries if entry["degree"] or entry["school"]][:MAX_ENTRIES]
+
+def _parse_projects(lines: List[str]) -> List[dict]:
+    projects, current = [], None
+    for line in map(_strip_bullet, lines):
+        if not line:
+            continue
+        tech = _TECH_LINE.match(line)
+        if tech and current:
+            current["tech_stack"] = _skills_from_section([line[tech.end():]])
+        elif re.search(r"https?://", line) and current:
+            current["link"] = re.search(r"https?://\S+", line).group(0)
+        elif _is_title(line) and re.search(r"[a-zA-Z]{3}", line) and (current is None or current["description"]):
+            current = {"title": _unquote(line), "description": "", "tech_stack": [], "link": ""}
+            projects.append(current)
+        elif current:
+            current["description"] += " " + line
+    for project in projects:
+        project["description"] = _clip(project["description"])
+    return projects[:MAX_ENTRIES]
+
+# ===========================
+# 📄 PUBLIC API
+# ===========================
+
+def build_resume_profile(text: str, sha256: str = "", today: Optional[date] = None) -> dict:
+    """Parses extracted resume text (with its line breaks) into the stored profile dict."""
+    today = today or date.today()
+    sections = split_sections(text)
+    experience, years = _parse_experience(sections.get("experience", []), today)
+    projects = _parse_projects(sections.get("projects", []))
+
+    skills = _skills_from_section(sections.get("skills", []))
+    skills += [skill for project in projects for skill in project["tech_stack"]]
+    skills += find_known_skills(text)
+    return {
+        "version": PROFILE_VERSION,
+        "sha256": sha256,
+        "sections": [name for name, lines in sections.items() if lines and name != "header"],
+        "summary": _clip(" ".join(sections.get("summary", [])), SUMMARY_CHARS),
+        "skills": normalize_skills(skills)[:MAX_SKILLS],
+        "experience": experience,
+        "total_experience_years": years,
+        "education": _parse_education(sections.get("education", [])),
+        "projects": projects,
+    }
+
+def load_profile(raw: Optional[str]) -> Optional[dict]:
+    if not raw:
+        return None
+    try:
+        profile = json.loads(raw)
+    except ValueError:
+        return None
+    return profile if isinstance(profile, dict) and profile.get("version") == PROFILE_VERSION else None
+
+def profile_text(profile: dict) -> str:
+    """Compact plain-text rendering of a profile for LLM prompts."""
+    lines = []
+    if profile.get("summary"):
+        lines.append(f"Summary: {profile['summary']}")
+    if profile.get("skills"):
+        lines.append("Skills: " + ", ".join(profile["skills"]))
+    if profile.get("experience"):
+        lines.append(f"Experience ({profile.get('total_experience_years', 0)} years total):")
+        for entry in profile["experience"]:
+            dates = f" ({entry['start_date']} - {entry['end_date']})" if entry.get("start_date") else ""
+            company = f" at {entry['company']}" if entry.get("company") else ""
+            lines.append(f"- {entry['role']}{company}{dates}: {entry['description']}")
+    if profile.get("education"):
+        lines.append("Education:")
+        for entry in profile["education"]:
+            degree = entry["degree"] + (f" in {entry['field']}" if entry.get("field") else "")
+            year = f" ({entry['year']})" if entry.get("year") else ""
+            lines.append("- " + ", ".join(part for part in (degree, entry["school"]) if part) + year)
+    if profile.get("projects"):
+        lines.append("Projects:")
+        for project in profile["projects"]:
+            tech = f" [{', '.join(project['tech_stack'])}]" if project.get("tech_stack") else ""
+            lines.append(f"- {project['title']}{tech}: {project['description']}")
+    return "\n".join(lines)[:AI_TEXT_CHARS]
+
+def resume_for_ai(user) -> str:
+    """What prompts and matching read for a user: the compact profile, or the raw text if there is none."""
+    profile = load_profile(getattr(user, "resume_profile", None))
+    if not profile or not (profile["experience"] or profile["education"] or profile["projects"]):
+        return user.resume_text or ""
+    return profile_text(profile)
+
+def apply_profile_defaults(user, profile: dict) -> List[str]:
+    """Fills profile fields the user hasn't filled by hand. Returns the names of the fields set."""
+    filled = []
+    # Only vocabulary skills: job alerts and nudges match on users.skills, so a stray token from the
+    # skills section must not land there
+    known_skills = [skill for skill in profile["skills"] if is_known_skill(skill)]
+    if known_skills and not load_json_list(user.skills):
+        user.skills = json.dumps(known_skills)
+        filled.append("skills")
+    if profile["total_experience_years"] and not user.total_experience:
+        user.total_experience = profile["total_experience_years"]
+        filled.append("total_experience")
+    if profile["education"] and not load_json_list(user.education):
+        user.education = json.dumps(profile["education"])
+        first = profile["education"][0]
+        user.college = user.college or first["school"] or None
+        user.degree = user.degree or first["degree"] or None
+        user.batch_year = user.batch_year or first["year"] or None
+        filled.append("education")
+    if profile["experience"] and not load_json_list(user.experiences):
+        user.experiences = json.dumps(profile["experience"])
+        filled.append("experiences")
+    if profile["summary"] and not user.summary:
+        user.summary = profile["summary"]
+        filled.append("summary")
+    return filled
+
+def load_json_list(raw) -> list:
+    """Profile list columns hold JSON (or, for old rows, a comma-separated string)."""
+    if not raw:
+        return []
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return [item for item in str(raw).split(",") if item.strip()]
+    return value if isinstance(value, list) else [value] if value else []
@@ -0,0 +1,114 @@
+# backend/scores.py
+# Running application aggregates stored on User (applications_count, scored_applications_count,
+# match_score_total) so avg_match_score and employability_score never need a scan of all applications.
+#
+# Rebuild from job_applications plus the frozen legacy applications table (migrations 0002 / 0014):
+#   python -m backend.scores
+from sqlalchemy import func, update, select, case, union_all
+from sqlalchemy.orm import Session
+from backend.database import SessionLocal
+from backend.models import User, JobApplication, Application
+
+BACKFILL_CHUNK_SIZE = 1000
+
+def refresh_score_averages(user: User):
+    """Recomputes the derived averages from the running counters (no queries)."""
+    count = user.applications_count or 0
+    scored = user.scored_applications_count or 0
+    total = user.match_score_total or 0
+
+    user.avg_match_score = round(total / count, 1) if count else 0.0
+    # Employability follows the scored applications; with none left it goes back to the default
+    user.employability_score = round(total / scored) if scored else 0
+
+def record_application_score(db: Session, user_id: int, match_score: int, delta: int = 1):
+    """
+    Adds (delta=1) or removes (delta=-1) one application from the user's running aggregates.
+    The user row is locked so concurrent applies can't lose an increment. Caller commits.
+    """
+    user = db.query(User).filter(User.id == user_id).with_for_update().populate_existing().first()
+    if not user:
+        return None
+
+    score = match_score or 0
+    user.applications_count = max(0, (user.applications_count or 0) + delta)
+    if score > 0:
+        user.scored_applications_count = max(0, (user.scored_applications_count or 0) + delta)
+        user.match_score_total = max(0, (user.match_score_total or 0) + delta * score)
+
+    refresh_score_averages(user)
+    return user
+
+def forget_applications(db: Session, application_filter):
+    """
+    Removes every application matching `application_filter` from its owner's aggregates.
+    Call this BEFORE bulk-deleting those applications (e.g. when a job is deleted). Caller commits.
+    """
+    per_user = db.query(
+        JobApplication.user_id,
+        func.count(JobApplication.id),
+        func.count(case((JobApplication.match_score > 0, 1))),
+        func.coalesce(func.sum(case((JobApplication.match_score > 0, JobApplication.match_score), else_=0)), 0)
+    ).filter(application_filter, JobApplication.user_id.isnot(None)).group_by(JobApplication.user_id).all()
+
+    for user_id, count, scored, total in per_user:
+        user = db.query(User).filter(User.id == user_id).with_for_update().populate_existing().first()
+        if not user:
+            continue
+        user.applications_count = max(0, (user.applications_count or 0) - count)
+        user.scored_applications_count = max(0, (user.scored_applications_count or 0) - scored)
+        user.match_score_total = max(0, (user.match_score_total or 0) - total)
+        refresh_score_averages(user)
+
+# ===========================
+# 🔁 BULK BACKFILL
+# ===========================
+
+def backfill_user_scores(db: Session) -> int:
+    """Rebuilds the running aggregates for every user from job_applications and legacy applications."""
+    # Nothing writes or deletes legacy applications rows any more, so their count and score sum are a
+    # constant base that record_application_score / forget_applications adjust on top of. Leaving them
+    # out would drop employability to 0 for users whose scored history is only in the old table.
+    rows = union_all(
+        select(JobApplication.user_id, JobApplication.match_score).where(JobApplication.user_id.isnot(None)),
+        select(Application.user_id, Application.match_score).where(Application.user_id.isnot(None)),
+    ).subquery()
+    scored = rows.c.match_score > 0
+    aggregates = db.execute(
+        select(
+            rows.c.user_id,
+            func.count(),
+            func.count(case((scored, 1))),
+            func.coalesce(func.sum(case((scored, rows.c.match_score), else_=0)), 0),
+        ).group_by(rows.c.user_id)
+    ).all()
+
+    # 1. Reset everyone, then 2. write the real numbers in chunks (executemany UPDATE by primary key)
+    db.execute(update(User).values(applications_count=0, scored_applications_count=0, match_score_total=0,
+                                   avg_match_score=0.0, employability_score=0))
+
+    rows = [
+        {
+            "id": user_id,
+            "applications_count": count,
+            "scored_applications_count": scored_count,
+            "match_score_total": total,
+            "avg_match_score": round(total / count, 1) if count else 0.0,
+            "employability_score": round(total / scored_count) if scored_count else 0,
+        }
+        for user_id, count, scored_count, total in aggregates
+    ]
+    for i in range(0, len(rows), BACKFILL_CHUNK_SIZE):
+        db.execute(update(User), rows[i:i + BACKFILL_CHUNK_SIZE])
+
+    db.commit()
+    return len(rows)
+
+if __name__ == "__main__":
+    print("⏳ Backfilling user score aggregates...")
+    db = SessionLocal()
+    try:
+        updated = backfill_user_scores(db)
+        print(f"✅ Aggregates rebuilt for {updated} users with applications.")
+    finally:
+        db.close()
@@ -0,0 +1,217 @@
+# backend/skills.py
+# Normalized skill vocabulary + bulk SkillGap upserts.
+# Existing duplicates are merged by migration 0003 before its unique index is built.
+import re
+from typing import Iterable, List
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from backend.database import dialect_insert
+from backend.models import SkillGap
+
+MAX_SKILL_LENGTH = 50
+
+# --- CANONICAL VOCABULARY ---
+# canonical name -> known spellings. Spellings are compared by _skill_key, so "React.js",
+# "ReactJS" and "react js" all hit the same entry and only need to be listed once.
+SKILL_VOCABULARY = {
+    "JavaScript": ["javascript", "js", "ecmascript", "es6"],
+    "TypeScript": ["typescript", "ts"],
+    "React": ["react", "react.js", "reactjs"],
+    "React Native": ["react native"],
+    "Next.js": ["next.js", "nextjs", "next"],
+    "Node.js": ["node.js", "nodejs", "node"],
+    "Express.js": ["express", "express.js", "expressjs"],
+    "Vue.js": ["vue", "vue.js", "vuejs"],
+    "Angular": ["angular", "angularjs", "angular.js"],
+    "HTML": ["html", "html5"],
+    "CSS": ["css", "css3"],
+    "Tailwind CSS": ["tailwind", "tailwind css", "tailwindcss"],
+    "Python": ["python", "python3"],
+    "Django": ["django"],
+    "Flask": ["flask"],
+    "FastAPI": ["fastapi", "fast api"],
+    "Java": ["java"],
+    "Spring Boot": ["spring boot", "springboot", "spring"],
+    "C": ["c"],
+    "C++": ["c++", "cpp"],
+    "C#": ["c#", "csharp", "c sharp"],
+    ".NET": [".net", "dotnet", "asp.net"],
+    "Go": ["go", "golang"],
+    "Rust": ["rust"],
+    "PHP": ["php"],
+    "Ruby": ["ruby"],
+    "Kotlin": ["kotlin"],
+    "Swift": ["swift"],
+    "Flutter": ["flutter"],
+    "SQL": ["sql"],
+    "PostgreSQL": ["postgresql", "postgres", "psql"],
+    "MySQL": ["mysql"],
+    "MongoDB": ["mongodb", "mongo"],
+    "Redis": ["redis"],
+    "GraphQL": ["graphql"],
+    "REST APIs": ["rest", "rest api", "rest apis", "restful", "restful apis"],
+    "Git": ["git"],
+    "GitHub": ["github"],
+    "Docker": ["docker"],
+    "Kubernetes": ["kubernetes", "k8s"],
+    "AWS": ["aws", "amazon web services"],
+    "Azure": ["azure", "microsoft azure"],
+    "GCP": ["gcp", "google cloud", "google cloud platform"],
+    "CI/CD": ["ci/cd", "cicd", "ci cd"],
+    "Linux": ["linux"],
+    "Machine Learning": ["machine learning", "ml"],
+    "Deep Learning": ["deep learning", "dl"],
+    "Data Analysis": ["data analysis", "data analytics"],
+    "Pandas": ["pandas"],
+    "NumPy": ["numpy"],
+    "TensorFlow": ["tensorflow"],
+    "PyTorch": ["pytorch"],
+    "Power BI": ["power bi", "powerbi"],
+    "Tableau": ["tableau"],
+    "Excel": ["excel", "ms excel", "microsoft excel", "advanced excel"],
+    "Figma": ["figma"],
+    "Communication": ["communication", "communication skills"],
+    "Leadership": ["leadership"],
+    "Problem Solving": ["problem solving", "problem-solving"],
+}
+
+def _skill_key(name: str) -> str:
+    """Spelling-insensitive key: lowercase, keep only letters/digits and the + / # that matter (C++, C#)."""
+    return re.sub(r"[^a-z0-9+#]", "", name.lower())
+
+SKILL_ALIASES = {
+    _skill_key(alias): canonical
+    for canonical, aliases in SKILL_VOCABULARY.items()
+    for alias in [canonical] + aliases
+}
+
+def normalize_skill(name: str) -> str:
+    """Returns the canonical display name for a skill, or "" if it isn't worth storing."""
+    if not name:
+        return ""
+    tidy = " ".join(str(name).split())
+    key = _skill_key(tidy)
+    if not key:
+        return ""
+
+    canonical = SKILL_ALIASES.get(key)
+    if canonical:
+        return canonical
+
+    # Unknown skill: keep the old Title Case format and the old "longer than 2 chars" rule
+    tidy = tidy.title()[:MAX_SKILL_LENGTH]
+    return tidy if len(tidy) > 2 else ""
+
+def is_known_skill(name: str) -> bool:
+    return _skill_key(name or "") in SKILL_ALIASES
+
+def normalize_skills(names: Iterable[str]) -> List[str]:
+    """Normalizes and de-duplicates (by key) while keeping first-seen order."""
+    seen = set()
+    result = []
+    for name in names or []:
+        canonical = normalize_skill(name)
+        key = _skill_key(canonical)
+        if canonical and key not in seen:
+            seen.add(key)
+            result.append(canonical)
+    return result
+
+# Spellings that are ordinary words / letters in running text ("the rest", "go to", "excel in")
+AMBIGUOUS_ALIASES = {"c", "go", "js", "ts", "ml", "dl", "next", "node", "rest", "spring", "express",
+                     "swift", "rust", "ruby", "excel", "flask", "communication", "leadership"}
+
+def _alias_pattern(aliases: Iterable[str]) -> re.Pattern:
+    # Longest first so "react native" wins over "react"; boundaries keep "java" out of "javascript"
+    alternatives = "|".join(re.escape(alias) for alias in sorted(set(aliases), key=len, reverse=True))
+    return re.compile(rf"(?<![a-z0-9+#])(?:{alternatives})(?![a-z0-9+#])", re.IGNORECASE)
+
+_ALL_SPELLINGS = [alias for canonical, aliases in SKILL_VOCABULARY.items() for alias in [canonical.lower()] + aliases]
+_STRICT_PATTERN = _alias_pattern(_ALL_SPELLINGS)
+_PROSE_PATTERN = _alias_pattern(alias for alias in _ALL_SPELLINGS if alias not in AMBIGUOUS_ALIASES)
+
+def find_known_skills(text: str, prose: bool = True) -> List[str]:
+    """
+    Vocabulary skills mentioned in free text, canonical and in order of first mention.
+    prose=True skips ambiguous spellings; use prose=False on text known to be a skills list.
+    """
+    pattern = _PROSE_PATTERN if prose else _STRICT_PATTERN
+    return normalize_skills(match.group(0) for match in pattern.finditer(text or ""))
+
+# ===========================
+# 💾 BULK SKILL GAP UPSERT
+# ===========================
+
+def upsert_skill_gaps(db: Session, user_id: int, skills: Iterable[str]) -> List[str]:
+    """
+    Records one more sighting of each missing skill in a single statement:
+    INSERT ... ON CONFLICT (user_id, skill_name) DO UPDATE SET frequency = frequency + 1, last_seen = now()
+    Caller commits.
+    """
+    names = normalize_skills(skills)
+    if not names:
+        return []
+
+    insert = dialect_insert(db.get_bind())
+    if insert is None:
+        # Portable fallback: one SELECT + UPDATE/INSERT per skill
+        for name in names:
+            gap = db.query(SkillGap).filter(SkillGap.user_id == user_id, SkillGap.skill_name == name).first()
+            if gap:
+                gap.frequency = (gap.frequency or 0) + 1
+                gap.last_seen = func.now()
+            else:
+                db.add(SkillGap(user_id=user_id, skill_name=name, frequency=1))
+        return names
+
+    stmt = insert(SkillGap).values([
+        {"user_id": user_id, "skill_name": name, "frequency": 1} for name in names
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SkillGap.user_id, SkillGap.skill_name],
+        set_={"frequency": SkillGap.frequency + 1, "last_seen": func.now()}
+    )
+    db.execute(stmt)
+    return names
+
+# ===========================
+# 🧹 ONE-OFF: MERGE DUPLICATES
+# ===========================
+
+def merge_duplicate_skill_gaps(db: Session) -> int:
+    """
+    Re-normalizes every stored skill name and folds rows that collapse to the same
+    (user_id, skill_name) into one (frequencies summed, latest last_seen kept).
+    Returns the number of rows removed. Caller commits.
+    """
+    keepers = {}
+    duplicate_ids = []
+
+    rows = db.query(SkillGap.id, SkillGap.user_id, SkillGap.skill_name, SkillGap.frequency, SkillGap.last_seen)\
+        .order_by(SkillGap.user_id, SkillGap.id).yield_per(1000)
+
+    for gap_id, user_id, skill_name, frequency, last_seen in rows:
+        canonical = normalize_skill(skill_name) or skill_name
+        slot = (user_id, canonical)
+        keeper = keepers.get(slot)
+
+        if keeper is None:
+            keepers[slot] = {"id": gap_id, "skill_name": canonical, "frequency": frequency or 0,
+                             "last_seen": last_seen, "dirty": canonical != skill_name}
+            continue
+
+        keeper["frequency"] += frequency or 0
+        if last_seen and (not keeper["last_seen"] or last_seen > keeper["last_seen"]):
+            keeper["last_seen"] = last_seen
+        keeper["dirty"] = True
+        duplicate_ids.append(gap_id)
+
+    # Deletes first, so a renamed keeper never collides with a row that is about to go
+    for i in range(0, len(duplicate_ids), 1000):
+        db.query(SkillGap).filter(SkillGap.id.in_(duplicate_ids[i:i + 1000])).delete(synchronize_session=False)
+
+    updates = [{k: v for k, v in keeper.items() if k != "dirty"} for keeper in keepers.values() if keeper["dirty"]]
+    for i in range(0, len(updates), 1000):
+        db.execute(update(SkillGap), updates[i:i + 1000])
+
+    return len(duplicate_ids)
@@ -0,0 +1,118 @@
+# backend/static_files.py
+# Delivery of /static (local-storage resumes and profile images) + migration of legacy resume names.
+#
+# Starlette's StaticFiles already answers Range requests (206) and uses pathsend when the server offers it,
+# but sends no Cache-Control and an ETag built from mtime + size, so browsers re-validate every resume
+# download. CachedStaticFiles adds:
+# - content-addressed paths ("<sha[:2]>/<sha>[-<size>].<ext>", see backend/storage.py) never change:
+#   Cache-Control immutable for a year, and the hashed file name as a strong ETag, the same on every server
+# - everything else (legacy "user_7_1234.pdf" names): a short max-age, then If-None-Match revalidation
+# - STATIC_ACCEL_REDIRECT: when a front proxy (nginx) serves the static directory under an internal
+#   location, the worker only checks the path and hands the transfer off with X-Accel-Redirect; the
+#   proxy then does sendfile, ranges and slow clients without holding a Python worker
+#
+# Legacy resumes are moved to content-addressed keys with:
+#   python -m backend.static_files migrate-resumes [--dry-run] [--delete]
+import asyncio
+import hashlib
+import os
+import re
+import sys
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from backend.database import SessionLocal
+from backend.http_client import close_http_client
+from backend.models import User
+from backend.storage import RESUME_BUCKET, content_key, storage
+
+STATIC_IMMUTABLE_MAX_AGE = 31536000
+STATIC_DEFAULT_MAX_AGE = int(os.getenv("STATIC_DEFAULT_MAX_AGE", "3600"))
+# e.g. "/_static/" with nginx: location /_static/ { internal; alias /app/static/; }
+STATIC_ACCEL_REDIRECT = os.getenv("STATIC_ACCEL_REDIRECT", "")
+
+_CONTENT_ADDRESSED = re.compile(r"(?:^|/)([0-9a-f]{2})/(\1[0-9a-f]{62})(?:-\d+)?\.[a-z0-9]+$")
+
+def cache_headers(relative_path: str) -> dict:
+    match = _CONTENT_ADDRESSED.search(relative_path.replace(os.sep, "/"))
+    if match:
+        # Variants of one upload share the sha; the file name keeps their ETags distinct
+        name = os.path.basename(relative_path)
+        return {"cache-control": f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable", "etag": f'"{name}"'}
+    return {"cache-control": f"public, max-age={STATIC_DEFAULT_MAX_AGE}"}
+
+class CachedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        relative_path = os.path.relpath(full_path, self.directory)
+        headers = cache_headers(relative_path)
+
+        if STATIC_ACCEL_REDIRECT:
+            # Still answer revalidations here; they cost a stat, not a transfer
+            if "etag" in headers and self.is_not_modified(Headers(headers), request_headers):
+                return NotModifiedResponse(Headers(headers))
+            headers["x-accel-redirect"] = STATIC_ACCEL_REDIRECT.rstrip("/") + "/" + relative_path.replace(os.sep, "/")
+            # No content-type here: nginx sets it from the file it serves
+            return Response(status_code=status_code, headers=headers)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers.update(headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+# ===========================
+# 🚚 LEGACY RESUME MIGRATION
+# ===========================
+
+async def migrate_legacy_resumes(dry_run: bool = False, delete: bool = False) -> dict:
+    """
+    Re-stores every user's legacy static/resumes/<name> file under its content-addressed key (through
+    the configured storage backend) and points users.resume_filename at it. Idempotent: users already
+    on a URL or a content-addressed key are skipped. Legacy files are kept unless delete=True.
+    """
+    stats = {"migrated": 0, "deduplicated": 0, "skipped": 0, "missing": 0}
+    db = SessionLocal()
+    try:
+        users = db.query(User).filter(User.resume_filename.isnot(None), User.resume_filename != "").all()
+        for user in users:
+            name = user.resume_filename
+            if name.startswith(("http://", "https://")) or _CONTENT_ADDRESSED.search(name):
+                stats["skipped"] += 1
+                continue
+            path = os.path.join("static", "resumes", name)
+            if not os.path.isfile(path):
+                print(f"⚠️ Missing resume file for user {user.id}: {path}")
+                stats["missing"] += 1
+                continue
+
+            with open(path, "rb") as f:
+                data = f.read()
+            extension = name.rsplit(".", 1)[-1] if "." in name else ""
+            key = content_key(hashlib.sha256(data).hexdigest(), extension)
+            if dry_run:
+                print(f"🔎 user {user.id}: {name} -> {key}")
+                stats["migrated"] += 1
+                continue
+
+            stored = await storage.put(RESUME_BUCKET, key, data, "application/pdf" if extension.lower() == "pdf" else "application/octet-stream")
+            stats["deduplicated" if stored.deduplicated else "migrated"] += 1
+            user.resume_filename = stored.reference
+            db.commit()  # per user, so an interrupted run resumes where it stopped
+            if delete and os.path.abspath(path) != os.path.abspath(os.path.join("static", "resumes", key)):
+                os.remove(path)
+    finally:
+        db.close()
+    return stats
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate-resumes":
+        async def main():
+            try:
+                return await migrate_legacy_resumes(dry_run="--dry-run" in sys.argv, delete="--delete" in sys.argv)
+            finally:
+                await close_http_client()
+
+        print(asyncio.run(main()))
+    else:
+        print("usage: python -m backend.static_files migrate-resumes [--dry-run] [--delete]")
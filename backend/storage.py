@@ -0,0 +1,217 @@
+# backend/storage.py
+# File storage behind one async interface: put / get / delete / exists / signed_url / public_url.
+#
+#   STORAGE_BACKEND=supabase  (default when SUPABASE_URL is set) -> Supabase Storage REST API over the
+#                             shared async HTTP client, so uploads never block the event loop
+#   STORAGE_BACKEND=local                                        -> files under STORAGE_LOCAL_ROOT/<bucket>/,
+#                             served by the /static mount; for tests and offline dev
+#
+# Keys are content-addressed (content_key): "<sha256[:2]>/<sha256>.<ext>". The same file uploaded twice,
+# by anyone, is stored once; put() sees the object already exists and skips the upload.
+# Remote calls are retried on connection errors, timeouts, 429 and 5xx with backoff.
+import asyncio
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import quote
+import httpx
+from starlette.concurrency import run_in_threadpool
+from backend.http_client import get_http_client
+
+STORAGE_RETRIES = int(os.getenv("STORAGE_RETRIES", "3"))
+STORAGE_TIMEOUT = httpx.Timeout(60.0, connect=5.0)  # uploads of a few MB on a slow link
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "static")
+STORAGE_PUBLIC_BASE_URL = os.getenv("NEXT_PUBLIC_API_URL", "https://truthhire-api.onrender.com")
+RESUME_BUCKET = os.getenv("RESUME_BUCKET", "resumes")
+PROFILE_IMAGE_BUCKET = os.getenv("PROFILE_IMAGE_BUCKET", "profile_images")
+IMMUTABLE_CACHE_CONTROL = "max-age=31536000"  # content-addressed objects never change
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class StorageError(Exception):
+    pass
+
+@dataclass
+class StoredObject:
+    bucket: str
+    key: str
+    size: int
+    url: str  # public URL
+    reference: str  # what to save on the row (resume_filename / profile_image)
+    deduplicated: bool = False  # the object already existed, nothing was uploaded
+
+def content_key(sha256: str, extension: str = "") -> str:
+    extension = re.sub(r"[^a-z0-9]", "", (extension or "").lower())[:8]
+    return f"{sha256[:2]}/{sha256}" + (f".{extension}" if extension else "")
+
+class _KnownKeys:
+    """Keys this process has seen stored, so repeat puts skip even the existence check."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, item) -> bool:
+        with self._lock:
+            return item in self._items
+
+    def add(self, item):
+        with self._lock:
+            self._items[item] = True
+            self._items.move_to_end(item)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def discard(self, item):
+        with self._lock:
+            self._items.pop(item, None)
+
+# ===========================
+# ☁️ SUPABASE
+# ===========================
+
+class SupabaseStorage:
+    name = "supabase"
+
+    def __init__(self, url: str, service_key: str):
+        self.base = url.rstrip("/") + "/storage/v1"
+        self.headers = {"Authorization": f"Bearer {service_key}", "apikey": service_key}
+        self.known = _KnownKeys()
+
+    def _object_url(self, bucket: str, key: str, prefix: str = "object") -> str:
+        return f"{self.base}/{prefix}/{bucket}/{quote(key)}"
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        client = get_http_client()
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        for attempt in range(STORAGE_RETRIES + 1):
+            try:
+                response = await client.request(method, url, headers=headers, timeout=STORAGE_TIMEOUT, **kwargs)
+                if response.status_code not in _RETRY_STATUSES or attempt >= STORAGE_RETRIES:
+                    return response
+            except (httpx.TimeoutException, httpx.TransportError):
+                if attempt >= STORAGE_RETRIES:
+                    raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def exists(self, bucket: str, key: str) -> bool:
+        if (bucket, key) in self.known:
+            return True
+        response = await self._request("HEAD", self._object_url(bucket, key, "object/authenticated"))
+        return response.status_code == 200
+
+    async def put(self, bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream") -> StoredObject:
+        deduplicated = await self.exists(bucket, key)
+        if not deduplicated:
+            response = await self._request("POST", self._object_url(bucket, key), content=data, headers={
+                "Content-Type": content_type or "application/octet-stream",
+                "cache-control": IMMUTABLE_CACHE_CONTROL, "x-upsert": "false"})
+            # An upload that raced ours already stored the same bytes under this key
+            duplicate = response.status_code == 409 or (response.status_code == 400 and "Duplicate" in response.text)
+            if response.status_code >= 300 and not duplicate:
+                raise StorageError(f"Upload of {bucket}/{key} failed: {response.status_code} {response.text[:200]}")
+            deduplicated = duplicate
+        self.known.add((bucket, key))
+        url = self.public_url(bucket, key)
+        return StoredObject(bucket, key, len(data), url, url, deduplicated)
+
+    async def get(self, bucket: str, key: str) -> Optional[bytes]:
+        response = await self._request("GET", self._object_url(bucket, key))
+        if response.status_code in (400, 404):
+            return None
+        if response.status_code >= 300:
+            raise StorageError(f"Download of {bucket}/{key} failed: {response.status_code}")
+        return response.content
+
+    async def delete(self, bucket: str, key: str):
+        self.known.discard((bucket, key))
+        response = await self._request("DELETE", f"{self.base}/object/{bucket}", json={"prefixes": [key]})
+        if response.status_code >= 300:
+            raise StorageError(f"Delete of {bucket}/{key} failed: {response.status_code}")
+
+    async def signed_url(self, bucket: str, key: str, expires_in: int = 3600) -> str:
+        response = await self._request("POST", self._object_url(bucket, key, "object/sign"), json={"expiresIn": expires_in})
+        if response.status_code >= 300:
+            raise StorageError(f"Signing {bucket}/{key} failed: {response.status_code}")
+        return self.base + response.json()["signedURL"]
+
+    def public_url(self, bucket: str, key: str) -> str:
+        return self._object_url(bucket, key, "object/public")
+
+# ===========================
+# 💾 LOCAL DISK
+# ===========================
+
+class LocalStorage:
+    """Buckets are directories under root (default static/, i.e. the legacy static/resumes layout)."""
+    name = "local"
+
+    def __init__(self, root: str = STORAGE_LOCAL_ROOT, public_base_url: str = STORAGE_PUBLIC_BASE_URL):
+        self.root = root
+        self.public_base_url = public_base_url.rstrip("/")
+
+    def _path(self, bucket: str, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, bucket, key))
+        if not path.startswith(os.path.normpath(os.path.join(self.root, bucket)) + os.sep):
+            raise StorageError(f"Invalid key {key!r}")
+        return path
+
+    def _write(self, path: str, data: bytes) -> bool:
+        if os.path.exists(path):
+            return True
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "wb") as f:
+            f.write(data)
+        os.replace(temp, path)  # readers never see a half-written file
+        return False
+
+    async def exists(self, bucket: str, key: str) -> bool:
+        return os.path.exists(self._path(bucket, key))
+
+    async def put(self, bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream") -> StoredObject:
+        deduplicated = await run_in_threadpool(self._write, self._path(bucket, key), data)
+        # Rows keep the bare key, which the app already resolves under /static/<bucket>/
+        return StoredObject(bucket, key, len(data), self.public_url(bucket, key), key, deduplicated)
+
+    async def get(self, bucket: str, key: str) -> Optional[bytes]:
+        def read():
+            try:
+                with open(self._path(bucket, key), "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+        return await run_in_threadpool(read)
+
+    async def delete(self, bucket: str, key: str):
+        try:
+            await run_in_threadpool(os.remove, self._path(bucket, key))
+        except FileNotFoundError:
+            pass
+
+    async def signed_url(self, bucket: str, key: str, expires_in: int = 3600) -> str:
+        # Local files are served publicly by the /static mount; there is nothing to sign
+        return self.public_url(bucket, key)
+
+    def public_url(self, bucket: str, key: str) -> str:
+        return f"{self.public_base_url}/static/{bucket}/{quote(key)}"
+
+# ===========================
+# 🏭 FACTORY
+# ===========================
+
+def build_storage():
+    backend = os.getenv("STORAGE_BACKEND", "supabase" if os.getenv("SUPABASE_URL") else "local").lower()
+    if backend == "local":
+        return LocalStorage()
+    return SupabaseStorage(os.getenv("SUPABASE_URL", ""), os.getenv("SUPABASE_SERVICE_KEY", ""))
+
+storage = build_storage()
+
+async def put_content(bucket: str, data: bytes, sha256: str, extension: str = "",
+                      content_type: str = "application/octet-stream") -> StoredObject:
+    """Stores data under its content-addressed key (identical files are stored once)."""
+    return await storage.put(bucket, content_key(sha256, extension), data, content_type)
@@ -0,0 +1,123 @@
+# backend/uploads.py
+# Upload intake for resumes, profile images and job import files.
+#
+# Handlers used to `await file.read()` with no limit, after Starlette had already taken in the whole
+# multipart body, so one large (or endless chunked) upload could balloon a worker's memory. Now:
+# - UploadLimitMiddleware caps the request body per route while it streams in: a Content-Length over
+#   the cap is refused before anything is read, a chunked body is cut off at the cap (413)
+# - Starlette spools each file part in memory up to UPLOAD_SPOOL_BYTES, then to a temp file on disk
+# - receive_upload() makes one chunked pass over the spool: per-type size cap, sha256, and the first
+#   bytes for type sniffing, without holding the file in memory
+# - the ReceivedUpload is then shared by extraction (which only needs the bytes on a cache miss) and
+#   storage; ReceivedUpload.read() loads the file at most once for all of them. It is a blocking read
+#   of up to the route's cap, so async handlers call it with run_in_threadpool
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import BinaryIO, Optional
+from fastapi import HTTPException, UploadFile
+from starlette.formparsers import MultiPartParser
+from starlette.responses import JSONResponse
+
+RESUME_MAX_UPLOAD_BYTES = int(os.getenv("RESUME_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+IMPORT_MAX_UPLOAD_BYTES = int(os.getenv("IMPORT_MAX_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 256 * 1024
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # boundaries + part headers on top of the file itself
+HEAD_BYTES = 4096
+
+# Starlette's spool threshold for file parts (class attribute, read per request)
+MultiPartParser.spool_max_size = UPLOAD_SPOOL_BYTES
+
+# path -> body cap for the routes that take files
+UPLOAD_ROUTE_LIMITS = [
+    (re.compile(r"^/users/\d+/resume$"), RESUME_MAX_UPLOAD_BYTES),
+    (re.compile(r"^/parse-resume$"), RESUME_MAX_UPLOAD_BYTES),
+    (re.compile(r"^/users/\d+/profile-image$"), IMAGE_MAX_UPLOAD_BYTES),
+    (re.compile(r"^/admin/jobs/import$"), IMPORT_MAX_UPLOAD_BYTES),
+]
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File is too large (limit {max_bytes / (1024 * 1024):g} MB)")
+
+# ===========================
+# 🚧 BODY LIMIT (ASGI middleware)
+# ===========================
+
+class UploadLimitMiddleware:
+    def __init__(self, app, limits=UPLOAD_ROUTE_LIMITS):
+        self.app = app
+        self.limits = limits
+
+    def _limit_for(self, path: str) -> Optional[int]:
+        for pattern, max_bytes in self.limits:
+            if pattern.match(path):
+                return max_bytes
+        return None
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self._limit_for(scope["path"]) if scope["type"] == "http" else None
+        if max_bytes is None:
+            return await self.app(scope, receive, send)
+
+        body_cap = max_bytes + MULTIPART_OVERHEAD_BYTES
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared and declared.isdigit() and int(declared) > body_cap:
+            response = JSONResponse({"detail": _too_large(max_bytes).detail}, status_code=413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > body_cap:
+                    # Raised inside form parsing; FastAPI passes HTTPExceptions through as-is
+                    raise _too_large(max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+# ===========================
+# 📥 INTAKE
+# ===========================
+
+@dataclass
+class ReceivedUpload:
+    file: BinaryIO  # Starlette's spooled temp file, rewound
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    head: bytes  # first HEAD_BYTES, for sniffing the type
+    _content: Optional[bytes] = field(default=None, repr=False)
+
+    @property
+    def extension(self) -> str:
+        return self.filename.rsplit(".", 1)[-1].lower() if "." in self.filename else ""
+
+    def read(self) -> bytes:
+        """The whole file, loaded once and shared by every consumer (blocking: run it in the threadpool)."""
+        if self._content is None:
+            self.file.seek(0)
+            self._content = self.file.read()
+        return self._content
+
+async def receive_upload(file: UploadFile, max_bytes: int) -> ReceivedUpload:
+    """One chunked pass over the spooled upload: size cap (413), sha256 and head bytes."""
+    digest, size, head = hashlib.sha256(), 0, b""
+    await file.seek(0)
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large(max_bytes)
+        if len(head) < HEAD_BYTES:
+            head += chunk[:HEAD_BYTES - len(head)]
+        digest.update(chunk)
+    await file.seek(0)
+    return ReceivedUpload(file=file.file, filename=file.filename or "", content_type=file.content_type or "",
+                          size=size, sha256=digest.hexdigest(), head=head)